@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from backend.models import Customer
+
+MAX_BATCH = 1000
+MAX_N = 100
+
+# The only "<field>__<lookup>" keys a client may filter customers by.  Anything
+# else (related fields, regex/startswith oracles, ...) is rejected outright.
+DEFAULT_ALLOWED_FILTERS = frozenset(
+    {
+        "customer_name__icontains",
+        "customer_name__iexact",
+        "name__icontains",
+        "name__iexact",
+        "package__exact",
+    }
+)
+
+
+def allowed_filters():
+    """Whitelisted lookups (``RECOMMENDER_BATCH_FILTERS`` overrides) on concrete, non-relation fields."""
+    allowed = set()
+    for lookup in getattr(settings, "RECOMMENDER_BATCH_FILTERS", DEFAULT_ALLOWED_FILTERS):
+        name = lookup.split("__", 1)[0]
+        try:
+            field = Customer._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.is_relation:
+            allowed.add(lookup)
+    return frozenset(allowed)
+
+
+class BatchRecommendationSerializer(serializers.Serializer):
+    """Either ``customer_ids`` or a ``filter`` of whitelisted Customer lookups, not both."""
+
+    customer_ids = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False, allow_empty=False, max_length=MAX_BATCH
+    )
+    filter = serializers.DictField(child=serializers.CharField(max_length=100), required=False, allow_empty=False)
+    n = serializers.IntegerField(min_value=1, max_value=MAX_N, default=10)
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_BATCH, default=MAX_BATCH)
+    month = serializers.RegexField(r"^\d{4}-(0[1-9]|1[0-2])$", required=False)
+
+    def validate_filter(self, value):
+        allowed = allowed_filters()
+        rejected = sorted(lookup for lookup in value if lookup not in allowed)
+        if rejected:
+            raise serializers.ValidationError(
+                f"unsupported filter {', '.join(rejected)}; allowed: {', '.join(sorted(allowed)) or 'none'}"
+            )
+        return value
+
+    def validate(self, attrs):
+        if ("customer_ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError("send either customer_ids or filter")
+        return attrs
@@ -0,0 +1,16 @@
+"""Recommendation routes; mounted next to the api app's urls with
+``path("api/", include("api.recommendation_urls"))``.
+"""
+
+from django.urls import path
+
+from .recommendation_views import BatchRecommendationView, RecommendationCacheStatsView
+
+urlpatterns = [
+    path("recommendations/batch/", BatchRecommendationView.as_view(), name="recommendations-batch"),
+    path(
+        "recommendations/cache-stats/",
+        RecommendationCacheStatsView.as_view(),
+        name="recommendations-cache-stats",
+    ),
+]
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from backend.models import Customer
+from recommender.serving import cache_stats, get_holder, recommend_batch
+
+from .recommendation_serializers import BatchRecommendationSerializer
+
+
+def customer_id_field():
+    """Customer field holding the ids the recommender was trained on."""
+    name = getattr(settings, "RECOMMENDER_CUSTOMER_FIELD", "customer_id")
+    try:
+        Customer._meta.get_field(name)
+    except FieldDoesNotExist:
+        return "pk"
+    return name
+
+
+class BatchRecommendationView(APIView):
+    """POST /api/recommendations/batch/
+
+    Body: ``{"customer_ids": ["C001", "C002"], "n": 5}`` or
+    ``{"filter": {"customer_name__icontains": "ann"}, "limit": 200, "n": 5}``;
+    only the lookups in :func:`~.recommendation_serializers.allowed_filters`
+    are accepted.
+    ``month`` (``YYYY-MM``, default: this month) is part of the cache key.
+    Cached results are returned as they are. The rest are answered in one
+    call to :meth:`TopNRecommender.recommend_many`, which uses precomputed
+    rows where possible and a single batched scoring pass for the others.
+    ``model_version`` is the version of the model that scored this batch.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchRecommendationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if "filter" in data:
+            try:
+                ids = list(
+                    Customer.objects.filter(**data["filter"])
+                    .order_by(customer_id_field())
+                    .values_list(customer_id_field(), flat=True)[: data["limit"]]
+                )
+            except (FieldError, ValidationError, ValueError, TypeError) as exc:
+                return Response({"filter": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            ids = data["customer_ids"][: data["limit"]]
+
+        version, recommendations = recommend_batch(ids, data["n"], data.get("month"))
+        return Response(
+            {
+                "n": data["n"],
+                "model_version": version,
+                "count": len(recommendations),
+                "results": [
+                    {
+                        "customer_id": customer_id,
+                        "recommendations": [{"item": item, "score": round(score, 4)} for item, score in items],
+                    }
+                    for customer_id, items in recommendations.items()
+                ],
+            }
+        )
+
+
+class RecommendationCacheStatsView(APIView):
+    """GET /api/recommendations/cache-stats/ -- hit/miss/eviction counters of this worker."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        holder = get_holder()
+        return Response({"model_version": holder.version, "reloads": holder.reloads, "cache": cache_stats()})
@@ -1,3 +1,74 @@
-version https://git-lfs.github.com/spec/v1
-oid sha256:9ab6c6191360e63c1b4c9b5659aef348a743c9e078be68190917369e4e9563e8
-size 60
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.models import Customer
+
+from .recommendation_serializers import BatchRecommendationSerializer, allowed_filters
+from .recommendation_views import BatchRecommendationView
+
+
+def plain_field():
+    """Name of a concrete, non-relation Customer field to build lookups on."""
+    return next(f.name for f in Customer._meta.concrete_fields if not f.is_relation and not f.primary_key)
+
+
+class BatchFilterValidationTests(SimpleTestCase):
+    def test_rejects_lookups_outside_the_whitelist(self):
+        name = plain_field()
+        with override_settings(RECOMMENDER_BATCH_FILTERS={f"{name}__iexact"}):
+            for lookup in (f"{name}__regex", f"{name}__startswith", "pk__in", f"{name}__iexact__regex"):
+                serializer = BatchRecommendationSerializer(data={"filter": {lookup: "a"}})
+                self.assertFalse(serializer.is_valid(), lookup)
+                self.assertIn("filter", serializer.errors)
+
+    def test_rejects_related_field_lookups_even_if_configured(self):
+        relations = [f.name for f in Customer._meta.get_fields() if f.is_relation]
+        lookups = {f"{name}__id__exact" for name in relations} | {f"{name}__exact" for name in relations}
+        with override_settings(RECOMMENDER_BATCH_FILTERS=lookups):
+            self.assertEqual(allowed_filters(), frozenset())
+            for lookup in lookups:
+                self.assertFalse(BatchRecommendationSerializer(data={"filter": {lookup: "1"}}).is_valid())
+
+    def test_accepts_whitelisted_lookup(self):
+        lookup = f"{plain_field()}__iexact"
+        with override_settings(RECOMMENDER_BATCH_FILTERS={lookup}):
+            serializer = BatchRecommendationSerializer(data={"filter": {lookup: "ann"}, "n": 3})
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_rejects_non_string_values(self):
+        lookup = f"{plain_field()}__iexact"
+        with override_settings(RECOMMENDER_BATCH_FILTERS={lookup}):
+            self.assertFalse(BatchRecommendationSerializer(data={"filter": {lookup: {"nested": 1}}}).is_valid())
+
+
+class BatchRecommendationViewTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = BatchRecommendationView.as_view()
+
+    def post(self, body, user=None):
+        request = self.factory.post("/api/recommendations/batch/", body, format="json")
+        if user is not None:
+            force_authenticate(request, user=user)
+        return self.view(request)
+
+    def test_requires_authentication(self):
+        response = self.post({"customer_ids": ["C001"]}, user=AnonymousUser())
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_disallowed_filter_is_a_bad_request(self):
+        response = self.post({"filter": {"pk__regex": ".*"}}, user=User(username="staff"))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("filter", response.data)
+
+    def test_reports_version_of_the_scoring_snapshot(self):
+        results = {"C001": [("Duo", 0.5)]}
+        with mock.patch("api.recommendation_views.recommend_batch", return_value=("v7", results)) as batch:
+            response = self.post({"customer_ids": ["C001"], "n": 1}, user=User(username="staff"))
+        batch.assert_called_once_with(["C001"], 1, None)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["model_version"], "v7")
+        self.assertEqual(response.data["results"][0]["recommendations"], [{"item": "Duo", "score": 0.5}])
@@ -0,0 +1,19 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from recommender import topn
+
+
+class Command(BaseCommand):
+    help = "Precompute the top-N recommendation table from the trained recommender model."
+
+    def add_arguments(self, parser):
+        topn.build_parser(parser)
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        table = topn.run_from_options(options)
+        self.stdout.write(
+            self.style.SUCCESS(f"top-{table.n} table for {len(table.user_ids)} customers written to {options['out']}")
+        )
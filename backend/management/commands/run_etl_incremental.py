@@ -0,0 +1,29 @@
+import logging
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[3] / "etl" / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import incremental  # noqa: E402
+
+
+class Command(BaseCommand):
+    help = "Transform and upsert only new or changed bookings into the staging tables."
+
+    def add_arguments(self, parser):
+        incremental.build_parser(parser)
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        summary = incremental.run_from_options(options)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{summary.rows_loaded} rows loaded "
+                f"({summary.rows_new} new, {summary.rows_changed} changed, "
+                f"{summary.rows_skipped} unchanged skipped of {summary.rows_seen})"
+            )
+        )
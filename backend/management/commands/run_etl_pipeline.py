@@ -0,0 +1,32 @@
+import logging
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[3] / "etl" / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import pipeline  # noqa: E402
+
+
+class Command(BaseCommand):
+    help = "Run the staged ETL pipeline (extract, transform, load, recommender refresh)."
+
+    def add_arguments(self, parser):
+        pipeline.build_parser(parser)
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        recorder = pipeline.make_recorder(options)
+        try:
+            pipeline.run_from_options(options, recorder)
+        except Exception as exc:
+            self.stdout.write(recorder.summary_table())
+            raise CommandError(f"ETL pipeline failed: {exc}. Re-run with --resume to continue.") from exc
+        self.stdout.write(recorder.summary_table())
+        self.stdout.write(f"Stage metrics appended to {recorder.metrics_file}")
+        if recorder.profile_dir:
+            self.stdout.write(f"cProfile stats written to {recorder.profile_dir}")
+        self.stdout.write(self.style.SUCCESS("ETL pipeline finished."))
@@ -0,0 +1,65 @@
+// Batch recommendations: one POST per page of customers instead of one
+// request per customer.  Both recommendation endpoints require an
+// authenticated user, so requests carry the Django session cookie
+// (credentials: "include") and, because DRF's SessionAuthentication enforces
+// CSRF on POST, the X-CSRFToken header.  The token is taken from
+// options.csrfToken, window.CSRF_TOKEN or the "csrftoken" cookie, in that
+// order.  For token-based DRF auth pass options.authorization instead
+// (e.g. "Token abc123"); it is sent as the Authorization header.  Usage:
+//   const recs = await fetchRecommendationsBatch(["C001", "C002"], { n: 5 });
+//   const recs = await fetchRecommendationsBatch(ids, { n: 5, authorization: `Token ${token}` });
+//   recs["C001"] -> [{ item: "Package A", score: 4.21 }, ...]
+
+const RECOMMENDATION_BATCH_LIMIT = 1000;
+
+function readCookie(name) {
+  if (typeof document === "undefined" || !document.cookie) {
+    return null;
+  }
+  const prefix = `${name}=`;
+  const match = document.cookie.split(";").map((part) => part.trim()).find((part) => part.startsWith(prefix));
+  return match ? decodeURIComponent(match.slice(prefix.length)) : null;
+}
+
+function authHeaders(options) {
+  const authorization = options.authorization || (typeof window !== "undefined" && window.API_AUTHORIZATION);
+  if (authorization) {
+    return { Authorization: authorization };
+  }
+  const csrfToken =
+    options.csrfToken || (typeof window !== "undefined" && window.CSRF_TOKEN) || readCookie("csrftoken");
+  return csrfToken ? { "X-CSRFToken": csrfToken } : {};
+}
+
+async function fetchRecommendationsBatch(customerIds, options = {}) {
+  const apiBase = options.apiBase || window.API_BASE_URL || "http://127.0.0.1:8000/api";
+  const n = options.n || 5;
+  const ids = [...new Set(customerIds.map(String))];
+  const results = {};
+
+  for (let start = 0; start < ids.length; start += RECOMMENDATION_BATCH_LIMIT) {
+    const response = await fetch(`${apiBase}/recommendations/batch/`, {
+      method: "POST",
+      credentials: options.credentials || "include",
+      headers: { "Content-Type": "application/json", ...authHeaders(options), ...(options.headers || {}) },
+      body: JSON.stringify({ customer_ids: ids.slice(start, start + RECOMMENDATION_BATCH_LIMIT), n }),
+    });
+    if (response.status === 401 || response.status === 403) {
+      throw new Error(`recommendations batch needs a signed-in user: ${response.status}`);
+    }
+    if (!response.ok) {
+      throw new Error(`recommendations batch failed: ${response.status}`);
+    }
+    const payload = await response.json();
+    for (const row of payload.results) {
+      results[row.customer_id] = row.recommendations;
+    }
+  }
+  return results;
+}
+
+if (typeof module !== "undefined" && module.exports) {
+  module.exports = { fetchRecommendationsBatch };
+} else {
+  window.fetchRecommendationsBatch = fetchRecommendationsBatch;
+}
@@ -0,0 +1,91 @@
+"""Benchmark: ORM ``bulk_create`` upsert vs. the PostgreSQL COPY backend.
+
+Extracts and transforms the bookings once (the configured hooks, as the
+pipeline would), then times :func:`bulk_load.load_staging` with each backend
+on the same frame.  Every load runs inside a transaction that is rolled
+back, so both backends start from the same tables and the database is left
+as it was.  Reports the best-of-``--repeat`` seconds and rows/s per backend.
+
+The COPY backend needs PostgreSQL with psycopg2; on any other database only
+the ORM backend is measured.
+
+Usage::
+
+    python etl/scripts/bench_load.py --transform plan --repeat 3
+    python etl/scripts/bench_load.py --path exports/ --extract parallel --rows 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from bulk_load import DEFAULT_BATCH_SIZE, DEFAULT_COPY_BATCH_SIZE, load_staging, setup_django, supports_copy
+from etl_hooks import resolve
+from extract_stream import DEFAULT_WORKBOOK
+
+logger = logging.getLogger(__name__)
+
+
+def timed_load(frame: pd.DataFrame, backend: str, batch_size: int, using: str = "default") -> tuple:
+    """``(seconds, rows per model)`` of one load, rolled back afterwards."""
+    from django.db import transaction
+
+    with transaction.atomic(using=using):
+        started = time.perf_counter()
+        counts = load_staging(frame, batch_size=batch_size, backend=backend, using=using)
+        seconds = time.perf_counter() - started
+        transaction.set_rollback(True, using=using)
+    return seconds, counts
+
+
+def run(frame: pd.DataFrame, repeat: int = 3, using: str = "default") -> List[Dict[str, object]]:
+    backends = {"orm": DEFAULT_BATCH_SIZE}
+    if supports_copy(using):
+        backends["copy"] = DEFAULT_COPY_BATCH_SIZE
+    else:
+        logger.warning("database %r is not PostgreSQL with psycopg2; COPY was NOT measured", using)
+    rows = []
+    for backend, batch_size in backends.items():
+        runs = [timed_load(frame, backend, batch_size, using) for _ in range(max(repeat, 1))]
+        best, counts = min(runs, key=lambda run: run[0])
+        sent = sum(counts.values())
+        rows.append({"backend": backend, "seconds": best, "rows": sent, "rows_per_sec": sent / best if best else 0.0})
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=str(DEFAULT_WORKBOOK))
+    parser.add_argument("--sheet", default=None)
+    parser.add_argument("--extract", default=None, help="Extract hook (module:function or a short name).")
+    parser.add_argument("--transform", default=None, help="Transform hook (module:function or a short name).")
+    parser.add_argument("--rows", type=int, default=None, help="Load only the first ROWS transformed rows.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database", default="default", help="Django database alias.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    setup_django()
+    frame = resolve("transform", args.transform)(resolve("extract", args.extract)(args.path, sheet_name=args.sheet))
+    if args.rows:
+        frame = frame.head(args.rows)
+    logger.info("transformed frame: %d rows x %d columns", *frame.shape)
+
+    results = run(frame, args.repeat, args.database)
+    from django.db import connections
+
+    connection = connections[args.database]
+    # pg_version is e.g. 160002 for PostgreSQL 16.2; other backends have no such attribute.
+    logger.info("database: %s %s", connection.vendor, getattr(connection, "pg_version", ""))
+    logger.info("%-8s %10s %10s %12s", "backend", "seconds", "rows", "rows/s")
+    for row in results:
+        logger.info("%-8s %10.3f %10d %12.0f", row["backend"], row["seconds"], row["rows"], row["rows_per_sec"])
+
+
+if __name__ == "__main__":
+    main()
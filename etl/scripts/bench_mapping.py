@@ -0,0 +1,159 @@
+"""Micro-benchmark: compiled mapping plan vs. the current transform.
+
+Builds a synthetic booking frame (500k rows by default) shaped after the
+mapping's source columns and times:
+
+* ``plan``      -- ``MappingPlan.apply`` (compiled once, vectorised);
+* ``per-row``   -- the same rules interpreted row by row, as a reference
+                   for what per-row/per-column re-interpretation costs;
+* ``transform`` -- the configured transform hook (``ETL_TRANSFORM``), when
+                   it accepts the synthetic frame.  When it does not, the
+                   row is reported as ``skipped`` with the reason and a
+                   warning says which baselines were actually measured.
+
+Usage::
+
+    python etl/scripts/bench_mapping.py --rows 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from mapping_plan import DEFAULT_MAPPING, MappingError, MappingPlan, compile_mapping, load_plan
+
+logger = logging.getLogger(__name__)
+
+# Used when column_mapping.yaml is missing or not compilable in this checkout.
+DEMO_MAPPING = {
+    "columns": {
+        "Customer Name": {"name": "customer_name", "dtype": "str"},
+        "Package": {
+            "name": "package",
+            "values": {"Solo": "SOLO", "Duo": "DUO", "Group": "GROUP", "Family": "FAMILY"},
+        },
+        "Add-ons": {"name": "addons", "dtype": "category"},
+        "Price": {"name": "price", "dtype": "float", "default": 0},
+        "Pax": {"name": "pax", "dtype": "int"},
+        "Booking Date": {"name": "booking_date", "dtype": "date", "date_format": "%m/%d/%Y"},
+        "Branch": "branch",
+    }
+}
+
+
+def synthetic_frame(plan: MappingPlan, rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for rule in plan.rules:
+        if rule.values:
+            pool = np.array(list(rule.values) + ["Other"], dtype=object)
+            columns[rule.source] = pool[rng.integers(0, len(pool), rows)]
+        elif rule.dtype in ("date", "datetime"):
+            days = pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 2500, rows), unit="D")
+            columns[rule.source] = days.strftime(rule.date_format or "%Y-%m-%d").to_numpy(dtype=object)
+        elif rule.dtype in ("Int64", "float64"):
+            values = rng.integers(1, 5000, rows).astype(object)
+            values[rng.random(rows) < 0.01] = None
+            columns[rule.source] = values
+        else:
+            pool = np.array([f"{rule.source} {i}" for i in range(2000)], dtype=object)
+            columns[rule.source] = pool[rng.integers(0, len(pool), rows)]
+    return pd.DataFrame(columns)
+
+
+def per_row(plan: MappingPlan, frame: pd.DataFrame) -> pd.DataFrame:
+    """Reference implementation that walks the rules for every row."""
+    records = []
+    for row in frame.to_dict("records"):
+        out = {}
+        for rule in plan.rules:
+            value = row.get(rule.source)
+            if rule.values:
+                value = rule.values.get(value, value)
+            if value is not None and rule.dtype in ("date", "datetime"):
+                value = pd.to_datetime(value, format=rule.date_format, errors="coerce")
+            elif value is not None and rule.dtype in ("Int64", "float64"):
+                value = float(value)
+            if value is None and rule.default is not None:
+                value = rule.default
+            out[rule.target] = value
+        records.append(out)
+    return pd.DataFrame.from_records(records)
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mapping", default=str(DEFAULT_MAPPING))
+    parser.add_argument(
+        "--per-row-rows",
+        type=int,
+        default=50_000,
+        help="Rows for the per-row reference (scaled up to --rows in the report).",
+    )
+    parser.add_argument("--skip-transform", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        plan = load_plan(args.mapping)
+    except (OSError, MappingError) as exc:
+        logger.info("using the demo mapping (%s)", exc)
+        plan = compile_mapping(DEMO_MAPPING)
+
+    frame = synthetic_frame(plan, args.rows)
+    logger.info("synthetic frame: %d rows x %d columns", *frame.shape)
+
+    results = {}
+    skipped = {}
+    results["plan"] = best_of(lambda: plan.apply(frame, copy=True), args.repeat)
+
+    sample = frame.head(args.per_row_rows)
+    scale = len(frame) / max(len(sample), 1)
+    results["per-row"] = best_of(lambda: per_row(plan, sample), 1) * scale
+
+    if args.skip_transform:
+        skipped["transform"] = "--skip-transform"
+    else:
+        try:
+            from etl_hooks import hook_spec, resolve
+
+            transform = resolve("transform")
+            results["transform"] = best_of(lambda: transform(frame.copy()), args.repeat)
+        except Exception as exc:  # the legacy transform expects the real workbook layout
+            skipped["transform"] = f"{type(exc).__name__}: {exc}"
+            logger.warning(
+                "current transform (%s) could not run on the synthetic frame and was NOT measured: %s",
+                hook_spec("transform"),
+                skipped["transform"],
+            )
+
+    baseline = results["plan"]
+    logger.info("%-10s %10s %10s", "variant", "seconds", "vs plan")
+    for name, seconds in results.items():
+        logger.info("%-10s %10.3f %9.1fx", name, seconds, seconds / baseline)
+    for name, reason in skipped.items():
+        logger.info("%-10s %10s %10s  (%s)", name, "skipped", "-", reason)
+    compared = [name for name in results if name != "plan"]
+    logger.info("plan measured against: %s", ", ".join(compared))
+    if "transform" in skipped:
+        logger.warning("no comparison against the current transform; 'per-row' is a reference implementation only")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Set-based upserts of transformed frames into the backend models.
+
+Frame columns are matched to model fields by field name or attname
+(``customer`` or ``customer_id``); columns without a matching field are
+ignored.  Rows are upserted on the model's unique fields, so re-loading the
+same rows is idempotent.
+
+Two backends share that contract:
+
+* ``orm``  -- ``bulk_create(update_conflicts=True)``, works on any database;
+* ``copy`` -- PostgreSQL only: each batch is streamed into a temp table with
+  ``COPY ... FROM STDIN`` and merged with one ``INSERT ... ON CONFLICT``.
+
+``auto`` picks ``copy`` on PostgreSQL with psycopg2 and ``orm`` otherwise.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_COPY_BATCH_SIZE = 100_000
+BACKENDS = ("auto", "orm", "copy")
+_COPY_NULL = "\\N"
+
+
+@dataclass
+class LoadStats:
+    model: str
+    rows: int
+    seconds: float
+    backend: str
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+def setup_django() -> None:
+    """Configure Django when running as a plain script (no-op under manage.py)."""
+    from django.conf import settings
+
+    if settings.configured:
+        return
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Snaplytics.settings")
+    import django
+
+    django.setup()
+
+
+def staging_models() -> list:
+    """Models an ETL load writes to, parents before children."""
+    setup_django()
+    from backend.models import Customer, StagingBooking
+
+    return [Customer, StagingBooking]
+
+
+def field_columns(model, columns: Iterable[str]) -> Dict[str, object]:
+    """Map frame column -> concrete model field for the columns the model knows."""
+    by_name = {}
+    for field in model._meta.concrete_fields:
+        by_name[field.name] = field
+        by_name[field.attname] = field
+    matched: Dict[str, object] = {}
+    seen = set()
+    for column in columns:
+        field = by_name.get(column)
+        if field is not None and field.attname not in seen:
+            matched[column] = field
+            seen.add(field.attname)
+    return matched
+
+
+def unique_fields(model, fields: Iterable[object]) -> List[str]:
+    """Pick the conflict target for an upsert among the ``fields`` present.
+
+    Prefers a single unique field (the primary key only if the frame carries
+    it), then a unique_together / UniqueConstraint fully covered by the frame.
+    """
+    present = {field.name for field in fields}
+    pk = model._meta.pk.name
+    singles = [
+        field.name
+        for field in model._meta.concrete_fields
+        if field.unique and field.name in present and field.name != pk
+    ]
+    if singles:
+        return singles[:1]
+    if pk in present:
+        return [pk]
+    groups = [tuple(group) for group in model._meta.unique_together]
+    groups += [
+        tuple(constraint.fields)
+        for constraint in model._meta.constraints
+        if getattr(constraint, "fields", None) and getattr(constraint, "condition", None) is None
+    ]
+    for group in groups:
+        if set(group) <= present:
+            return list(group)
+    raise ValueError(
+        f"cannot upsert {model.__name__}: the frame has none of its unique fields "
+        f"(columns matched: {sorted(present)})"
+    )
+
+
+def _records(frame: pd.DataFrame) -> Iterable[tuple]:
+    # NaN/NaT -> None so nullable fields store NULL instead of failing.
+    cleaned = frame.astype(object).where(frame.notna(), None)
+    return cleaned.itertuples(index=False, name=None)
+
+
+def _prepare(model, frame: pd.DataFrame, conflict_fields: Optional[Sequence[str]]):
+    """Return ``(subset, fields, conflict, update)`` for an upsert of ``frame``."""
+    matched = field_columns(model, frame.columns)
+    if not matched:
+        return frame.iloc[0:0, 0:0], [], [], []
+    fields = list(matched.values())
+    conflict = list(conflict_fields) if conflict_fields else unique_fields(model, fields)
+    pk = model._meta.pk.name
+    update = [field.name for field in fields if field.name not in conflict and field.name != pk]
+
+    subset = frame[list(matched)]
+    key_columns = [column for column, field in matched.items() if field.name in conflict]
+    if key_columns:
+        # Postgres refuses to update the same row twice in one statement.
+        subset = subset.drop_duplicates(key_columns, keep="last")
+    return subset, fields, conflict, update
+
+
+def orm_upsert(
+    model,
+    frame: pd.DataFrame,
+    conflict_fields: Optional[Sequence[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Insert-or-update ``frame`` into ``model`` with ``bulk_create``; return rows sent."""
+    subset, fields, conflict, update = _prepare(model, frame, conflict_fields)
+    if subset.empty:
+        return 0
+
+    attnames = [field.attname for field in fields]
+    objects = [model(**dict(zip(attnames, row))) for row in _records(subset)]
+    options = (
+        {"update_conflicts": True, "update_fields": update, "unique_fields": conflict}
+        if update
+        else {"ignore_conflicts": True}
+    )
+    model.objects.bulk_create(objects, batch_size=batch_size, **options)
+    return len(objects)
+
+
+def supports_copy(using: str = "default") -> bool:
+    """True when ``using`` is PostgreSQL through a driver with ``copy_expert``."""
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, "copy_expert")
+
+
+def _copy_payload(frame: pd.DataFrame, fields: list, connection) -> io.StringIO:
+    buffer = io.StringIO()
+    values = frame.copy(deep=False)
+    for column, field in zip(frame.columns, fields):
+        db_type = (field.db_type(connection) or "").lower()
+        if db_type.startswith("bool"):
+            values[column] = values[column].map({True: "t", False: "f"})
+        elif db_type.startswith(("integer", "bigint", "smallint", "serial", "bigserial")):
+            # A NaN turns an int column into float ("3.0"), which COPY rejects.
+            if pd.api.types.is_float_dtype(values[column]):
+                values[column] = values[column].astype("Int64")
+    values.to_csv(buffer, header=False, index=False, na_rep=_COPY_NULL, quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+    return buffer
+
+
+def copy_upsert(
+    model,
+    frame: pd.DataFrame,
+    conflict_fields: Optional[Sequence[str]] = None,
+    batch_size: int = DEFAULT_COPY_BATCH_SIZE,
+    using: str = "default",
+) -> int:
+    """Upsert ``frame`` into ``model`` via COPY into a temp table; return rows sent.
+
+    Must run inside a transaction (the temp table is ``ON COMMIT DROP``);
+    :func:`load_staging` provides one.  The staging table is always named
+    through ``pg_temp`` so no statement can reach a permanent table that
+    happens to share its name.  Each batch costs one COPY and one
+    ``INSERT ... SELECT ... ON CONFLICT`` round trip regardless of its size.
+    """
+    from django.db import connections
+
+    subset, fields, conflict, update = _prepare(model, frame, conflict_fields)
+    if subset.empty:
+        return 0
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    stage = "pg_temp." + quote(f"etl_stage_{model._meta.db_table}")
+    by_name = {field.name: field for field in model._meta.concrete_fields}
+    columns = ", ".join(quote(field.column) for field in fields)
+    conflict_sql = ", ".join(quote(by_name[name].column) for name in conflict)
+    if update:
+        assignments = ", ".join(
+            f"{quote(by_name[name].column)} = EXCLUDED.{quote(by_name[name].column)}"
+            for name in update
+        )
+        on_conflict = f"ON CONFLICT ({conflict_sql}) DO UPDATE SET {assignments}"
+    else:
+        on_conflict = f"ON CONFLICT ({conflict_sql}) DO NOTHING"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+        cursor.execute(
+            f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+            f"SELECT {columns} FROM {table} WITH NO DATA"
+        )
+        for start in range(0, len(subset), batch_size):
+            batch = subset.iloc[start : start + batch_size]
+            cursor.execute(f"TRUNCATE {stage}")
+            cursor.cursor.copy_expert(
+                f"COPY {stage} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')",
+                _copy_payload(batch, fields, connection),
+            )
+            cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {stage} {on_conflict}")
+    return len(subset)
+
+
+def _resolve_backend(backend: str, using: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown load backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "auto":
+        return "copy" if supports_copy(using) else "orm"
+    if backend == "copy" and not supports_copy(using):
+        logger.warning("COPY loader needs PostgreSQL with psycopg2; falling back to the ORM")
+        return "orm"
+    return backend
+
+
+def load_staging(
+    frame: pd.DataFrame,
+    batch_size: Optional[int] = None,
+    model_columns: Optional[Dict[str, Sequence[str]]] = None,
+    backend: str = "auto",
+    using: str = "default",
+) -> Dict[str, int]:
+    """Upsert a transformed bookings frame into Customer and StagingBooking.
+
+    Every model receives the columns it has fields for, or only the columns
+    listed for it in ``model_columns`` (keyed by model name) when two models
+    share a column name that means different things.  One atomic transaction
+    covers both so a failure leaves the tables unchanged.
+    """
+    from django.db import transaction
+
+    models = staging_models()
+    backend = _resolve_backend(backend, using)
+    counts: Dict[str, int] = {}
+    stats = []
+    with transaction.atomic(using=using):
+        for model in models:
+            part = frame
+            if model_columns and model.__name__ in model_columns:
+                part = frame[list(model_columns[model.__name__])]
+            started = time.perf_counter()
+            if backend == "copy":
+                rows = copy_upsert(
+                    model, part, batch_size=batch_size or DEFAULT_COPY_BATCH_SIZE, using=using
+                )
+            else:
+                rows = orm_upsert(model, part, batch_size=batch_size or DEFAULT_BATCH_SIZE)
+            stats.append(LoadStats(model.__name__, rows, time.perf_counter() - started, backend))
+            counts[model.__name__] = rows
+    for stat in stats:
+        logger.info(
+            "%s: %d rows via %s in %.2fs (%.0f rows/s)",
+            stat.model,
+            stat.rows,
+            stat.backend,
+            stat.seconds,
+            stat.rows_per_sec,
+        )
+    return counts
@@ -0,0 +1,78 @@
+"""Lazy lookup of the stage functions of the original ETL scripts.
+
+The newer ETL modules call into ``extract.py`` / ``transform.py`` /
+``load.py`` through these hooks instead of importing them directly, so a stage
+can be swapped per run (``--transform mymodule:func``) or per environment
+(``ETL_TRANSFORM=mymodule:func``) without touching the callers.  The
+implementations in :data:`NAMED_HOOKS` can be selected by short name
+(``--transform plan`` runs the compiled column_mapping.yaml plan).
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parents[1]
+
+# The original scripts stay selectable, e.g. ETL_EXTRACT=extract:extract_data
+# or ETL_LOAD=load:load_data.
+DEFAULT_HOOKS = {
+    "extract": "extract_cache:extract_cached",
+    "transform": "transform:transform_data",
+    "load": "bulk_load:load_staging",
+    "refresh": "recommender.popularity_builder:main",
+}
+
+
+def ensure_scripts_on_path() -> None:
+    """Make the sibling ETL scripts (and the repo packages) importable."""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.append(str(REPO_ROOT))
+
+
+# Short names for the alternative implementations shipped next to the
+# defaults, e.g. ``--transform plan`` or ``ETL_EXTRACT=parallel``.
+NAMED_HOOKS = {
+    "extract": {
+        "cached": "extract_cache:extract_cached",
+        "legacy": "extract:extract_data",
+        "parallel": "extract_parallel:extract",
+    },
+    "transform": {
+        "legacy": "transform:transform_data",
+        "plan": "mapping_plan:transform",
+    },
+}
+
+
+def hook_spec(stage: str, override: Optional[str] = None) -> str:
+    spec = override or os.environ.get(f"ETL_{stage.upper()}")
+    if spec:
+        return NAMED_HOOKS.get(stage, {}).get(spec, spec)
+    try:
+        return DEFAULT_HOOKS[stage]
+    except KeyError:
+        raise KeyError(f"no default hook for ETL stage {stage!r}") from None
+
+
+def resolve(stage: str, override: Optional[str] = None) -> Callable:
+    """Return the callable configured for ``stage`` as ``module:attribute``."""
+    spec = hook_spec(stage, override)
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"hook for {stage!r} must look like 'module:function', got {spec!r}")
+    ensure_scripts_on_path()
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, attr)
+    except AttributeError:
+        raise AttributeError(
+            f"{module_name} has no {attr!r}; set ETL_{stage.upper()} to the right 'module:function'"
+        ) from None
@@ -0,0 +1,258 @@
+"""Content-addressed cache of parsed workbook sheets.
+
+An ``.xlsx`` file is a zip archive with one XML part per worksheet.  Each
+sheet is keyed by a hash of its own XML part plus the workbook-wide parts that
+affect how its cells decode (shared strings, styles, the 1904 date flag), so:
+
+* an unchanged workbook loads every sheet from the columnar cache without
+  opening it in openpyxl at all;
+* a changed workbook re-parses only the sheets whose key changed.
+
+Because Excel appends to the shared strings table whenever text is edited, a
+text edit invalidates every sheet; numeric/date edits stay local to a sheet.
+
+Usage::
+
+    python etl/scripts/extract_cache.py            # warm or refresh the cache
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import posixpath
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from xml.etree import ElementTree
+
+import pandas as pd
+
+from extract_stream import DEFAULT_WORKBOOK, ETL_DIR
+from frame_store import delete_frame, find_frame, read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ETL_DIR / "cache" / "workbook"
+MANIFEST_NAME = "manifest.json"
+# Bump when the parse step changes in a way that makes old cache entries wrong.
+CACHE_VERSION = 1
+
+_SHARED_PARTS = ("xl/sharedStrings.xml", "xl/styles.xml")
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_BLOCK = 1 << 20
+
+
+def _hash_member(archive: zipfile.ZipFile, name: str, digest) -> None:
+    with archive.open(name) as fh:
+        for block in iter(lambda: fh.read(_BLOCK), b""):
+            digest.update(block)
+
+
+def _sheet_parts(archive: zipfile.ZipFile, workbook: ElementTree.Element) -> Dict[str, str]:
+    """Map sheet name -> zip member holding its XML, in workbook order."""
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{_NS_PKG_REL}Relationship")}
+
+    parts: Dict[str, str] = {}
+    for sheet in workbook.iter(f"{_NS_MAIN}sheet"):
+        target = targets.get(sheet.get(f"{_NS_REL}id"))
+        if target is None:
+            continue
+        member = target.lstrip("/") if target.startswith("/") else posixpath.join("xl", target)
+        parts[sheet.get("name")] = posixpath.normpath(member)
+    return parts
+
+
+def sheet_names(path: Path | str) -> List[str]:
+    """Sheet names in workbook order, read from the archive without openpyxl."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+            return list(_sheet_parts(archive, workbook))
+    except zipfile.BadZipFile:
+        return pd.ExcelFile(path).sheet_names
+
+
+def sheet_keys(path: Path | str, read_kwargs: Optional[dict] = None) -> Dict[str, str]:
+    """Return a cache key for every sheet of the workbook at ``path``.
+
+    The key covers the sheet bytes, the shared workbook parts and the
+    ``read_excel`` options, so a different parse of the same bytes never
+    collides with a cached one.
+    """
+    options = json.dumps(
+        {"version": CACHE_VERSION, "read_kwargs": read_kwargs or {}},
+        sort_keys=True,
+        default=str,
+    ).encode()
+    path = Path(path)
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        # Legacy .xls: no per-sheet parts, so the whole file is the key.
+        digest = hashlib.sha256(options)
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(_BLOCK), b""):
+                digest.update(block)
+        whole = digest.hexdigest()
+        names = pd.ExcelFile(path).sheet_names
+        return {name: hashlib.sha256(f"{whole}:{name}".encode()).hexdigest() for name in names}
+
+    with archive:
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        properties = workbook.find(f"{_NS_MAIN}workbookPr")
+        date1904 = properties.get("date1904", "0") if properties is not None else "0"
+
+        shared = hashlib.sha256(options)
+        shared.update(f"date1904={date1904}".encode())
+        members = set(archive.namelist())
+        for name in _SHARED_PARTS:
+            if name in members:
+                shared.update(name.encode())
+                _hash_member(archive, name, shared)
+        shared_digest = shared.digest()
+
+        keys: Dict[str, str] = {}
+        for sheet, member in _sheet_parts(archive, workbook).items():
+            digest = hashlib.sha256(shared_digest)
+            digest.update(sheet.encode())
+            if member in members:
+                _hash_member(archive, member, digest)
+            keys[sheet] = digest.hexdigest()
+        return keys
+
+
+def _load_manifest(cache_dir: Path) -> dict:
+    manifest = cache_dir / MANIFEST_NAME
+    if not manifest.exists():
+        return {}
+    try:
+        return json.loads(manifest.read_text())
+    except ValueError:
+        logger.warning("ignoring unreadable cache manifest %s", manifest)
+        return {}
+
+
+def _save_manifest(cache_dir: Path, manifest: dict) -> None:
+    target = cache_dir / MANIFEST_NAME
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(target)
+
+
+def load_workbook_cached(
+    path: Path | str = DEFAULT_WORKBOOK,
+    sheets: Optional[Sequence[str]] = None,
+    cache_dir: Path | str = DEFAULT_CACHE_DIR,
+    read_kwargs: Optional[dict] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Return ``{sheet name: DataFrame}`` for ``sheets`` (default: all sheets).
+
+    Only sheets without a cache entry for their current key are parsed, in a
+    single ``read_excel`` call.  Entries superseded by a newer version of the
+    same workbook sheet are deleted so the cache does not grow without bound.
+    """
+    path = Path(path)
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    read_kwargs = dict(read_kwargs or {})
+
+    keys = sheet_keys(path, read_kwargs)
+    wanted: List[str] = list(keys) if sheets is None else list(sheets)
+    missing_sheets = [name for name in wanted if name not in keys]
+    if missing_sheets:
+        raise KeyError(f"sheets not found in {path.name}: {missing_sheets}")
+
+    frames: Dict[str, pd.DataFrame] = {}
+    stale: List[str] = []
+    for name in wanted:
+        stem = cache_dir / keys[name]
+        if find_frame(stem) is not None:
+            frames[name] = read_frame(stem)
+        else:
+            stale.append(name)
+
+    if stale:
+        started = time.perf_counter()
+        parsed = pd.read_excel(path, sheet_name=stale, **read_kwargs)
+        logger.info(
+            "parsed %d/%d sheet(s) of %s in %.2fs: %s",
+            len(stale),
+            len(wanted),
+            path.name,
+            time.perf_counter() - started,
+            ", ".join(stale),
+        )
+        for name in stale:
+            write_frame(parsed[name], cache_dir / keys[name])
+            frames[name] = parsed[name]
+    else:
+        logger.info("all %d sheet(s) of %s served from cache", len(wanted), path.name)
+
+    manifest = _load_manifest(cache_dir)
+    entries = manifest.setdefault(str(path.resolve()), {})
+    superseded = set()
+    for name in wanted:
+        previous = entries.get(name)
+        if previous and previous != keys[name]:
+            superseded.add(previous)
+        entries[name] = keys[name]
+    # An old key may still be live for another workbook with identical bytes.
+    live = {key for workbook in manifest.values() for key in workbook.values()}
+    for key in superseded - live:
+        delete_frame(cache_dir / key)
+    _save_manifest(cache_dir, manifest)
+
+    return {name: frames[name] for name in wanted}
+
+
+def extract_cached(
+    path: Path | str = DEFAULT_WORKBOOK,
+    sheet_name: Optional[str] = None,
+    cache_dir: Path | str = DEFAULT_CACHE_DIR,
+    **read_kwargs,
+) -> pd.DataFrame:
+    """Cached equivalent of ``pd.read_excel(path, sheet_name=...)`` for one sheet.
+
+    With no ``sheet_name`` the first sheet is returned, like ``read_excel``.
+    """
+    if sheet_name is None:
+        sheet_name = next(iter(sheet_keys(path, read_kwargs)))
+    return load_workbook_cached(path, [sheet_name], cache_dir, read_kwargs)[sheet_name]
+
+
+def clear_cache(cache_dir: Path | str = DEFAULT_CACHE_DIR) -> int:
+    """Delete every cached sheet and the manifest; return the number of files removed."""
+    cache_dir = Path(cache_dir)
+    removed = 0
+    for entry in cache_dir.glob("*"):
+        if entry.is_file():
+            entry.unlink()
+            removed += 1
+    return removed
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Warm the parsed-workbook cache.")
+    parser.add_argument("--path", default=str(DEFAULT_WORKBOOK))
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--sheet", action="append", dest="sheets", help="Repeat for several sheets.")
+    parser.add_argument("--clear", action="store_true", help="Drop all cache entries first.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.clear:
+        logger.info("removed %d cache entries", clear_cache(args.cache_dir))
+    frames = load_workbook_cached(args.path, args.sheets, args.cache_dir)
+    for name, frame in frames.items():
+        logger.info("%s: %d rows x %d columns", name, *frame.shape)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Parallel extraction of several export workbooks (or sheets).
+
+Each (file, sheet) pair is parsed in its own worker process, so monthly
+exports dropped into ``etl/processed/`` use every core.  Results come back in
+a deterministic order -- sorted file path, then workbook sheet order --
+whatever order the workers finish in.  A file that fails to parse produces a
+failed :class:`ExtractResult` instead of aborting the run.
+
+:func:`extract` is the stage hook for the pipeline and incremental runners
+(``--extract parallel`` / ``ETL_EXTRACT=parallel``): it combines every
+workbook into one frame and raises :class:`ExtractError` naming the files
+that failed, unless partial extracts are allowed.
+
+Usage::
+
+    python etl/scripts/extract_parallel.py --workers 4 --all-sheets
+    python etl/scripts/pipeline.py --extract parallel --path etl/processed
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from extract_cache import sheet_keys, sheet_names
+from extract_stream import ETL_DIR
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_DIR = ETL_DIR / "processed"
+DEFAULT_PATTERN = "*.xlsx"
+
+Sheets = Union[str, Sequence[str], None]
+
+
+class ExtractError(RuntimeError):
+    """Raised by :func:`extract` when workbooks failed to parse."""
+
+
+@dataclass
+class ExtractResult:
+    path: str
+    sheet: Optional[str]
+    frame: Optional[pd.DataFrame] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def discover_workbooks(directory: Path | str = PROCESSED_DIR, pattern: str = DEFAULT_PATTERN) -> List[Path]:
+    """Workbooks in ``directory`` in a stable order, skipping Excel lock files."""
+    return sorted(
+        path for path in Path(directory).glob(pattern) if path.is_file() and not path.name.startswith("~$")
+    )
+
+
+def _plan(paths: Iterable[Path], sheets: Sheets) -> Tuple[List[Tuple[str, Optional[str]]], List[ExtractResult]]:
+    tasks: List[Tuple[str, Optional[str]]] = []
+    failures: List[ExtractResult] = []
+    if isinstance(sheets, str) and sheets not in ("all", "first"):
+        sheets = [sheets]  # one sheet name, not a sequence of one-letter names
+    for path in paths:
+        if sheets == "all":
+            try:
+                names = sheet_names(path)
+            except Exception as exc:  # corrupt archive: report it, keep going
+                failures.append(ExtractResult(str(path), None, error=f"{type(exc).__name__}: {exc}"))
+                continue
+            tasks.extend((str(path), name) for name in names)
+        elif sheets is None or sheets == "first":
+            tasks.append((str(path), None))
+        else:
+            tasks.extend((str(path), name) for name in sheets)
+    return tasks, failures
+
+
+def _read_task(path: str, sheet: Optional[str], read_kwargs: dict) -> ExtractResult:
+    # Runs in a worker process; every error is returned, never raised, so one
+    # bad workbook cannot take the pool down with it.
+    started = time.perf_counter()
+    try:
+        frame = pd.read_excel(path, sheet_name=sheet if sheet is not None else 0, **read_kwargs)
+    except Exception as exc:
+        return ExtractResult(
+            path,
+            sheet,
+            error=f"{type(exc).__name__}: {exc}\n{traceback.format_exc(limit=3)}",
+            seconds=time.perf_counter() - started,
+        )
+    return ExtractResult(path, sheet, frame=frame, seconds=time.perf_counter() - started)
+
+
+def extract_parallel(
+    paths: Optional[Iterable[Path | str]] = None,
+    sheets: Sheets = "first",
+    workers: Optional[int] = None,
+    read_kwargs: Optional[dict] = None,
+) -> List[ExtractResult]:
+    """Parse every (file, sheet) in a process pool; results in deterministic order.
+
+    ``sheets`` is ``"first"`` (default), ``"all"``, a sheet name or a list of
+    sheet names read from every file.  ``workers=1`` parses in-process, which is handy
+    under a debugger.
+    """
+    paths = discover_workbooks() if paths is None else sorted(Path(p) for p in paths)
+    tasks, failures = _plan(paths, sheets)
+    read_kwargs = dict(read_kwargs or {})
+    workers = workers or min(len(tasks), os.cpu_count() or 1) or 1
+
+    results: List[Optional[ExtractResult]] = [None] * len(tasks)
+    if workers == 1 or len(tasks) <= 1:
+        for index, (path, sheet) in enumerate(tasks):
+            results[index] = _read_task(path, sheet, read_kwargs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_read_task, path, sheet, read_kwargs) for path, sheet in tasks]
+            for index, future in enumerate(futures):
+                path, sheet = tasks[index]
+                try:
+                    results[index] = future.result()
+                except Exception as exc:  # worker died (BrokenProcessPool, MemoryError, ...)
+                    results[index] = ExtractResult(path, sheet, error=f"{type(exc).__name__}: {exc}")
+
+    ordered = failures + [result for result in results if result is not None]
+    ordered.sort(key=lambda result: result.path)  # stable: keeps sheet order within a file
+    for result in ordered:
+        if result.ok:
+            logger.info(
+                "%s [%s]: %d rows in %.2fs",
+                Path(result.path).name,
+                result.sheet or "first sheet",
+                len(result.frame),
+                result.seconds,
+            )
+        else:
+            logger.error("%s [%s] failed: %s", Path(result.path).name, result.sheet, result.error)
+    return ordered
+
+
+def combine(results: Sequence[ExtractResult], add_source: bool = True) -> pd.DataFrame:
+    """Concatenate the successful results, tagging rows with their origin."""
+    frames = []
+    for result in results:
+        if not result.ok:
+            continue
+        frame = result.frame
+        if add_source:
+            frame = frame.assign(source_file=Path(result.path).name, source_sheet=result.sheet)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def _workbooks(path: Optional[Path | str]) -> List[Path]:
+    if path is None:
+        return discover_workbooks()
+    path = Path(path)
+    return discover_workbooks(path) if path.is_dir() else [path]
+
+
+def extract(
+    path: Optional[Path | str] = None,
+    sheet_name: Optional[str] = None,
+    workers: Optional[int] = None,
+    allow_partial: Optional[bool] = None,
+) -> pd.DataFrame:
+    """Extract hook: every workbook in ``path`` (a directory, a file, default
+    ``etl/processed/``) parsed in parallel and combined into one frame.
+
+    ``sheet_name`` is one sheet read from every file, ``"all"``, or ``None``
+    for the first sheet.  Failed files are logged by :func:`extract_parallel`;
+    unless ``allow_partial`` (or ``ETL_EXTRACT_ALLOW_PARTIAL=1``) they also
+    abort the stage, so a broken monthly export is never loaded as "no rows".
+    """
+    if allow_partial is None:
+        allow_partial = os.environ.get("ETL_EXTRACT_ALLOW_PARTIAL", "") not in ("", "0")
+    if workers is None and os.environ.get("ETL_EXTRACT_WORKERS"):
+        workers = int(os.environ["ETL_EXTRACT_WORKERS"])
+    paths = _workbooks(path)
+    if not paths:
+        raise ExtractError(f"no workbooks found in {path or PROCESSED_DIR}")
+    results = extract_parallel(paths, sheet_name or "first", workers)
+    failed = [result for result in results if not result.ok]
+    if failed and (not allow_partial or len(failed) == len(results)):
+        names = ", ".join(f"{Path(result.path).name} [{result.sheet or 'first sheet'}]" for result in failed)
+        raise ExtractError(f"{len(failed)} of {len(results)} sheet(s) failed to parse: {names}")
+    return combine(results)
+
+
+def source_key(path: Optional[Path | str] = None, sheet_name: Optional[str] = None) -> dict:
+    """Per-sheet content keys of every workbook :func:`extract` would read (for pipeline checkpoints)."""
+    keys = {}
+    for workbook in _workbooks(path):
+        sheets = sheet_keys(workbook)
+        keys[workbook.name] = {sheet_name: sheets.get(sheet_name)} if sheet_name not in (None, "all") else sheets
+    return keys
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Extract all workbooks in parallel.")
+    parser.add_argument("--dir", default=str(PROCESSED_DIR))
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN)
+    parser.add_argument("--workers", type=int, default=None, help="Defaults to one per CPU.")
+    parser.add_argument("--all-sheets", action="store_true", help="Parse every sheet, not just the first.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    started = time.perf_counter()
+    results = extract_parallel(
+        discover_workbooks(args.dir, args.pattern),
+        sheets="all" if args.all_sheets else "first",
+        workers=args.workers,
+    )
+    failed = [result for result in results if not result.ok]
+    logger.info(
+        "%d sheet(s) extracted, %d failed, %.2fs wall time",
+        len(results) - len(failed),
+        len(failed),
+        time.perf_counter() - started,
+    )
+    if failed and len(failed) == len(results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
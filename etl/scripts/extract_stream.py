@@ -0,0 +1,188 @@
+"""Streaming extraction of the bookings workbook.
+
+``extract.py`` materialises the whole workbook as one DataFrame.  This module
+reads it with openpyxl in read-only mode instead and yields bounded DataFrame
+chunks, so peak memory depends on ``chunk_size`` rather than on the length of
+the booking history.
+
+Usage::
+
+    python etl/scripts/extract_stream.py --chunk-size 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+ETL_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_WORKBOOK = ETL_DIR / "processed" / "Heigen Bookings Final.xlsx"
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+@dataclass
+class ChunkTiming:
+    """Extraction cost of one chunk (consumer time is not included)."""
+
+    index: int
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+def _log_chunk(timing: ChunkTiming) -> None:
+    logger.info(
+        "chunk %d: %d rows in %.3fs (%.0f rows/s)",
+        timing.index,
+        timing.rows,
+        timing.seconds,
+        timing.rows_per_sec,
+    )
+
+
+def _column_names(header: Sequence[object]) -> List[str]:
+    # Same naming as pandas.read_excel for blank header cells.
+    return [
+        f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value).strip()
+        for i, value in enumerate(header)
+    ]
+
+
+def _fit(row: Sequence[object], width: int) -> tuple:
+    if len(row) == width:
+        return tuple(row)
+    if len(row) > width:
+        return tuple(row[:width])
+    return tuple(row) + (None,) * (width - len(row))
+
+
+def iter_booking_chunks(
+    path: Path | str = DEFAULT_WORKBOOK,
+    sheet_name: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    header_row: int = 1,
+    on_chunk: Optional[Callable[[ChunkTiming], None]] = _log_chunk,
+) -> Iterator[pd.DataFrame]:
+    """Yield the rows of ``sheet_name`` as DataFrames of at most ``chunk_size`` rows.
+
+    ``header_row`` is the 1-based worksheet row holding the column names.
+    Fully blank rows are skipped, like ``pandas.read_excel`` does.  Each chunk
+    keeps a continuous RangeIndex so concatenating the chunks gives the same
+    index as a full read.  ``on_chunk`` receives a :class:`ChunkTiming` for
+    every chunk before it is yielded; pass ``None`` to disable reporting.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        # Exported workbooks often carry stale <dimension> metadata, which
+        # would make read-only iteration stop early.
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(min_row=header_row, values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _column_names(header)
+        width = len(columns)
+
+        index = 0
+        offset = 0
+        buffer: List[tuple] = []
+        started = time.perf_counter()
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            buffer.append(_fit(row, width))
+            if len(buffer) < chunk_size:
+                continue
+
+            chunk = _to_frame(buffer, columns, offset)
+            if on_chunk is not None:
+                on_chunk(ChunkTiming(index, len(chunk), time.perf_counter() - started))
+            yield chunk
+            index += 1
+            offset += len(buffer)
+            buffer = []
+            started = time.perf_counter()
+
+        if buffer:
+            chunk = _to_frame(buffer, columns, offset)
+            if on_chunk is not None:
+                on_chunk(ChunkTiming(index, len(chunk), time.perf_counter() - started))
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def _to_frame(rows: List[tuple], columns: List[str], offset: int) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    frame.index = pd.RangeIndex(offset, offset + len(rows))
+    # Cells arrive as Python objects; let pandas pick numeric/datetime dtypes
+    # the way read_excel would.
+    return frame.infer_objects()
+
+
+def stream_transform(
+    transform: Callable[[pd.DataFrame], pd.DataFrame],
+    chunks: Optional[Iterable[pd.DataFrame]] = None,
+    **extract_kwargs,
+) -> Iterator[pd.DataFrame]:
+    """Apply ``transform`` to each extracted chunk as soon as it is read.
+
+    ``transform`` must be row-local (it must not need to see the whole
+    history at once); aggregate steps belong after the chunks are loaded.
+    """
+    if chunks is None:
+        chunks = iter_booking_chunks(**extract_kwargs)
+    for chunk in chunks:
+        yield transform(chunk)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream the bookings workbook in chunks.")
+    parser.add_argument("--path", default=str(DEFAULT_WORKBOOK))
+    parser.add_argument("--sheet", default=None, help="Sheet name (defaults to the first sheet).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--header-row", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    timings: List[ChunkTiming] = []
+
+    def record(timing: ChunkTiming) -> None:
+        timings.append(timing)
+        _log_chunk(timing)
+
+    for _ in iter_booking_chunks(
+        args.path,
+        sheet_name=args.sheet,
+        chunk_size=args.chunk_size,
+        header_row=args.header_row,
+        on_chunk=record,
+    ):
+        pass
+
+    total_rows = sum(t.rows for t in timings)
+    total_seconds = sum(t.seconds for t in timings)
+    logger.info(
+        "%d rows in %d chunks, %.3fs extraction time", total_rows, len(timings), total_seconds
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""On-disk storage for intermediate ETL DataFrames.
+
+Frames are written as Parquet when pyarrow is installed and as pandas pickles
+otherwise; both keep dtypes and load without re-parsing.  Callers pass a path
+*stem* and never deal with the suffix.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAS_PYARROW = False
+
+PARQUET = ".parquet"
+PICKLE = ".pkl"
+
+
+def write_frame(frame: pd.DataFrame, stem: Path | str) -> Path:
+    """Write ``frame`` next to ``stem`` and return the file actually written.
+
+    Writes go through a temporary file so a crashed run never leaves a
+    truncated artifact behind.  Frames pyarrow cannot represent (for example
+    object columns mixing ints and strings, common in hand-edited sheets) fall
+    back to pickle.
+    """
+    stem = Path(stem)
+    stem.parent.mkdir(parents=True, exist_ok=True)
+
+    if HAS_PYARROW:
+        final = stem.with_suffix(PARQUET)
+        tmp = final.with_name(final.name + ".tmp")
+        try:
+            frame.to_parquet(tmp, index=True)
+        except (TypeError, ValueError, ImportError) as exc:
+            tmp.unlink(missing_ok=True)
+            logger.debug("parquet write failed for %s (%s), using pickle", stem, exc)
+        else:
+            os.replace(tmp, final)
+            stem.with_suffix(PICKLE).unlink(missing_ok=True)
+            return final
+
+    final = stem.with_suffix(PICKLE)
+    tmp = final.with_name(final.name + ".tmp")
+    frame.to_pickle(tmp)
+    os.replace(tmp, final)
+    stem.with_suffix(PARQUET).unlink(missing_ok=True)
+    return final
+
+
+def find_frame(stem: Path | str) -> Optional[Path]:
+    """Return the stored file for ``stem``, or ``None`` if nothing was written."""
+    stem = Path(stem)
+    for suffix in (PARQUET, PICKLE):
+        path = stem.with_suffix(suffix)
+        if path.exists():
+            if suffix == PARQUET and not HAS_PYARROW:
+                continue
+            return path
+    return None
+
+
+def read_frame(stem: Path | str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Load the frame stored under ``stem``, optionally only some ``columns``."""
+    path = find_frame(stem)
+    if path is None:
+        raise FileNotFoundError(f"no stored frame for {stem}")
+    if path.suffix == PARQUET:
+        return pd.read_parquet(path, columns=list(columns) if columns is not None else None)
+    frame = pd.read_pickle(path)
+    return frame[list(columns)] if columns is not None else frame
+
+
+def delete_frame(stem: Path | str) -> None:
+    stem = Path(stem)
+    for suffix in (PARQUET, PICKLE):
+        stem.with_suffix(suffix).unlink(missing_ok=True)
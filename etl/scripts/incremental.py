@@ -0,0 +1,326 @@
+"""Incremental (delta) ETL keyed on booking identity.
+
+Every source booking row gets two 64-bit fingerprints:
+
+* ``booking_key`` -- hash of the identity columns (``key_columns``);
+* ``row_hash``    -- hash of the whole row.
+
+The watermark table stores both for every row already loaded.  A run only
+transforms and upserts rows whose key is unknown (new) or whose row hash moved
+(changed), then records them in the watermark.  Without ``key_columns`` the
+row hash doubles as the key: new and edited rows are both loaded, they are
+just not told apart in the summary.
+
+Usage::
+
+    python etl/scripts/incremental.py --key "Booking ID"
+    python manage.py run_etl_incremental --key "Booking ID"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from extract_stream import DEFAULT_WORKBOOK, ETL_DIR
+from frame_store import find_frame, read_frame, write_frame
+from lean_dtypes import optimise_dtypes
+from memtrack import RssWindow, mib, rss_window
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = ETL_DIR / "cache" / "state"
+WATERMARK_NAME = "booking_watermark"
+RUN_LOG_NAME = "booking_watermark_runs.json"
+WATERMARK_COLUMNS = ["booking_key", "row_hash", "first_loaded", "last_loaded"]
+
+Frames = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+
+@dataclass
+class DeltaSummary:
+    rows_seen: int = 0
+    rows_new: int = 0
+    rows_changed: int = 0
+    rows_loaded: int = 0
+    rows_rejected: int = 0  # delta rows the transform dropped (e.g. quarantined by validation)
+    seconds: float = 0.0
+    # Current RSS around transform + dtype pass: before the first chunk, after
+    # the last, and the largest rise within any one chunk.
+    transform_rss_before: int = 0
+    transform_rss_after: int = 0
+    transform_peak_delta: int = 0
+
+    def add_transform_window(self, window: RssWindow) -> None:
+        if not self.transform_rss_before:
+            self.transform_rss_before = window.before
+        self.transform_rss_after = window.after
+        self.transform_peak_delta = max(self.transform_peak_delta, window.peak_delta)
+
+    @property
+    def rows_skipped(self) -> int:
+        return self.rows_seen - self.rows_new - self.rows_changed
+
+
+def _hashable(frame: pd.DataFrame) -> pd.DataFrame:
+    """Normalise dtypes so a value hashes the same whichever way it was parsed.
+
+    Chunked reads may see a column as int in one chunk and float in the next
+    (a blank cell is enough), which would otherwise look like an edit.
+    """
+    out = {}
+    for column in frame.columns:
+        series = frame[column]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            out[column] = series.astype("float64")
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            out[column] = series.astype("int64").where(series.notna(), np.iinfo("int64").min)
+        else:
+            out[column] = series.astype(str).where(series.notna(), "\x00")
+    return pd.DataFrame(out, index=frame.index)
+
+
+def fingerprint(frame: pd.DataFrame, key_columns: Sequence[str] = ()) -> pd.DataFrame:
+    """Return ``booking_key`` and ``row_hash`` (uint64) for every row of ``frame``."""
+    missing = [column for column in key_columns if column not in frame.columns]
+    if missing:
+        raise KeyError(f"identity columns not in source: {missing}")
+    normalised = _hashable(frame)
+    row_hash = pd.util.hash_pandas_object(normalised, index=False)
+    if key_columns:
+        key = pd.util.hash_pandas_object(normalised[list(key_columns)], index=False)
+    else:
+        key = row_hash
+    return pd.DataFrame(
+        {"booking_key": key.to_numpy(), "row_hash": row_hash.to_numpy()}, index=frame.index
+    )
+
+
+class Watermark:
+    """Persisted table of booking fingerprints already loaded."""
+
+    def __init__(self, state_dir: Path | str = DEFAULT_STATE_DIR):
+        self.state_dir = Path(state_dir)
+        self.stem = self.state_dir / WATERMARK_NAME
+        if find_frame(self.stem) is not None:
+            table = read_frame(self.stem)
+        else:
+            table = pd.DataFrame(
+                {
+                    "booking_key": pd.Series(dtype="uint64"),
+                    "row_hash": pd.Series(dtype="uint64"),
+                    "first_loaded": pd.Series(dtype="datetime64[ns, UTC]"),
+                    "last_loaded": pd.Series(dtype="datetime64[ns, UTC]"),
+                }
+            )
+        self.table = table.set_index("booking_key")
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def classify(self, prints: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Return boolean masks ``(new, changed)`` aligned with ``prints``."""
+        known = prints["booking_key"].isin(self.table.index).to_numpy()
+        changed = np.zeros(len(prints), dtype=bool)
+        if known.any():
+            stored = self.table["row_hash"].reindex(prints["booking_key"][known]).to_numpy()
+            changed[known] = stored != prints["row_hash"][known].to_numpy()
+        return ~known, changed
+
+    def record(self, prints: pd.DataFrame, loaded_at: pd.Timestamp) -> None:
+        latest = prints.drop_duplicates("booking_key", keep="last").set_index("booking_key")
+        first = self.table["first_loaded"].reindex(latest.index)
+        update = pd.DataFrame(
+            {
+                "row_hash": latest["row_hash"].astype("uint64"),
+                "first_loaded": first.fillna(loaded_at),
+                "last_loaded": loaded_at,
+            },
+            index=latest.index,
+        )
+        rest = self.table[~self.table.index.isin(update.index)]
+        self.table = pd.concat([rest, update]) if len(rest) else update
+
+    def save(self) -> None:
+        write_frame(self.table.reset_index()[WATERMARK_COLUMNS], self.stem)
+
+    def reset(self) -> None:
+        # In memory only: the file is replaced on the next save(), so a
+        # failed or dry run keeps the previous watermark.
+        self.table = self.table.iloc[0:0]
+
+
+def _append_run_log(state_dir: Path, entry: dict) -> None:
+    path = state_dir / RUN_LOG_NAME
+    runs = json.loads(path.read_text()) if path.exists() else []
+    runs.append(entry)
+    path.write_text(json.dumps(runs[-100:], indent=2))
+
+
+def run_incremental(
+    source: Frames,
+    transform: Callable[[pd.DataFrame], pd.DataFrame],
+    load: Callable[[pd.DataFrame], object],
+    key_columns: Sequence[str] = (),
+    state_dir: Path | str = DEFAULT_STATE_DIR,
+    full_refresh: bool = False,
+    dry_run: bool = False,
+    optimise: bool = True,
+) -> DeltaSummary:
+    """Transform and load only the new/changed rows of ``source``.
+
+    ``source`` is a DataFrame or an iterable of chunks (see
+    ``extract_stream.iter_booking_chunks``).  The watermark is written only
+    after every chunk loaded, so a failed run is retried in full next time;
+    the upsert keeps that retry idempotent.  With ``optimise`` the
+    transformed delta goes through the dtype pass before it is loaded.
+    ``transform`` must keep the source index: rows it drops (validation
+    quarantines them) are left out of the watermark and retried next run.
+    """
+    started = time.perf_counter()
+    summary = DeltaSummary()
+    watermark = Watermark(state_dir)
+    if full_refresh:
+        watermark.reset()
+    loaded_at = pd.Timestamp(datetime.now(timezone.utc))
+    chunks = [source] if isinstance(source, pd.DataFrame) else source
+
+    for chunk in chunks:
+        prints = fingerprint(chunk, key_columns)
+        new, changed = watermark.classify(prints)
+        delta = new | changed
+        summary.rows_seen += len(chunk)
+        summary.rows_new += int(new.sum())
+        summary.rows_changed += int(changed.sum())
+        if not delta.any() or dry_run:
+            continue
+
+        with rss_window() as rss:
+            transformed = transform(chunk[delta])
+            if optimise:
+                optimise_dtypes(transformed)
+        summary.add_transform_window(rss)
+        load(transformed)
+        summary.rows_loaded += len(transformed)
+        # Only rows that reached the loader are marked as loaded: rows the
+        # transform dropped come back as new once the data or mapping is fixed.
+        attempted = prints[delta]
+        if transformed.index.isin(attempted.index).all():
+            loaded = attempted[attempted.index.isin(transformed.index)]
+        else:
+            logger.warning("transform did not keep the source index; recording the whole delta as loaded")
+            loaded = attempted
+        summary.rows_rejected += len(attempted) - len(loaded)
+        watermark.record(loaded, loaded_at)
+
+    summary.seconds = time.perf_counter() - started
+    if not dry_run:
+        watermark.save()
+        _append_run_log(
+            watermark.state_dir,
+            {"loaded_at": loaded_at.isoformat(), "key_columns": list(key_columns), **asdict(summary)},
+        )
+    logger.info(
+        "incremental ETL: %d rows seen, %d new, %d changed, %d unchanged skipped, "
+        "%d loaded, %d rejected in %.2fs; transform RSS %s -> %s, peak +%s%s",
+        summary.rows_seen,
+        summary.rows_new,
+        summary.rows_changed,
+        summary.rows_skipped,
+        summary.rows_loaded,
+        summary.rows_rejected,
+        summary.seconds,
+        mib(summary.transform_rss_before),
+        mib(summary.transform_rss_after),
+        mib(summary.transform_peak_delta),
+        " (dry run)" if dry_run else "",
+    )
+    return summary
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Load only new or changed bookings.")
+    parser.add_argument(
+        "--path", default=str(DEFAULT_WORKBOOK), help="Workbook, or a directory of exports with --extract parallel."
+    )
+    parser.add_argument("--sheet", default=None)
+    parser.add_argument(
+        "--key",
+        action="append",
+        dest="key_columns",
+        default=[],
+        help="Source column identifying a booking; repeat for composite keys.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Stream the workbook in chunks of this many rows instead of using the sheet cache.",
+    )
+    parser.add_argument("--state-dir", default=str(DEFAULT_STATE_DIR))
+    parser.add_argument(
+        "--extract", default=None, help="Extract hook as module:function, or 'parallel' for a directory of exports."
+    )
+    parser.add_argument(
+        "--transform", default=None, help="Transform hook as module:function, or 'plan' for the compiled mapping."
+    )
+    parser.add_argument(
+        "--load-backend",
+        choices=("auto", "orm", "copy"),
+        default="auto",
+        help="copy streams batches through PostgreSQL COPY; orm uses bulk_create.",
+    )
+    parser.add_argument("--full-refresh", action="store_true", help="Forget the watermark first.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the delta size.")
+    parser.add_argument(
+        "--keep-dtypes", action="store_true", help="Skip the dtype optimisation pass before load."
+    )
+    return parser
+
+
+def run_from_options(options: dict) -> DeltaSummary:
+    """Shared by the CLI below and ``manage.py run_etl_incremental``."""
+    from functools import partial
+
+    from bulk_load import load_staging
+    from etl_hooks import resolve
+
+    if options.get("chunk_size"):
+        from extract_stream import iter_booking_chunks
+
+        source: Frames = iter_booking_chunks(
+            options["path"], sheet_name=options.get("sheet"), chunk_size=options["chunk_size"]
+        )
+    else:
+        extract = resolve("extract", options.get("extract"))
+        source = extract(options["path"], sheet_name=options.get("sheet"))
+
+    return run_incremental(
+        source,
+        transform=resolve("transform", options.get("transform")),
+        load=partial(load_staging, backend=options.get("load_backend") or "auto"),
+        key_columns=options.get("key_columns") or (),
+        state_dir=options.get("state_dir") or DEFAULT_STATE_DIR,
+        full_refresh=options.get("full_refresh", False),
+        dry_run=options.get("dry_run", False),
+        optimise=not options.get("keep_dtypes", False),
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Dtype optimisation pass for transformed booking frames.
+
+Booking frames are mostly object columns of repeated strings (package,
+add-on, branch, month) plus float64/int64 numerics.  :func:`optimise_dtypes`
+rewrites them in place:
+
+* low-cardinality text -> ``category`` (one int code per row);
+* numerics -> the smallest integer type, or float32 when that is lossless;
+* date-like text -> ``datetime64``.
+
+:func:`with_dtype_pass` wraps a transform hook so its output goes through
+the pass before the pipeline checkpoints or loads it.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from memtrack import mib, rss_window
+
+logger = logging.getLogger(__name__)
+
+# Column-name fragments that are always low-cardinality in our bookings.
+CATEGORICAL_HINTS = ("package", "add-on", "addon", "add_on", "branch", "month", "status", "category")
+DATE_HINTS = ("date", "_at", "time")
+DEFAULT_MAX_UNIQUE_RATIO = 0.5
+# Below this share of parseable values a "date" column is left as text.
+MIN_DATE_PARSE_RATIO = 0.9
+
+
+def _matches(column: object, hints: Iterable[str]) -> bool:
+    name = str(column).lower()
+    return any(hint in name for hint in hints)
+
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or pd.api.types.is_string_dtype(series)
+
+
+def _downcast_numeric(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        if values.size and not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+            return pd.to_numeric(series, downcast="integer")
+        narrow = values.astype(np.float32)
+        # Only when every value survives the round trip (money must not drift).
+        if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+            return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def _parse_dates(series: pd.Series) -> pd.Series:
+    parsed = pd.to_datetime(series, errors="coerce", format="mixed")
+    present = series.notna().sum()
+    if present and parsed.notna().sum() / present >= MIN_DATE_PARSE_RATIO:
+        return parsed
+    return series
+
+
+def optimise_dtypes(
+    frame: pd.DataFrame,
+    categorical: Optional[Iterable[str]] = None,
+    date_columns: Optional[Iterable[str]] = None,
+    max_unique_ratio: float = DEFAULT_MAX_UNIQUE_RATIO,
+    report: bool = True,
+    parse_dates: bool = True,
+) -> pd.DataFrame:
+    """Shrink ``frame``'s dtypes in place and return it.
+
+    ``categorical`` / ``date_columns`` force those columns; otherwise text
+    columns are converted when their name matches :data:`CATEGORICAL_HINTS`
+    or :data:`DATE_HINTS`, or when distinct values are at most
+    ``max_unique_ratio`` of the rows.  ``parse_dates=False`` leaves date
+    text alone, for frames that still go through validation (a coerced
+    ``NaT`` would hide an unparseable date from it).
+    """
+    before = int(frame.memory_usage(deep=True).sum()) if report else 0
+    forced_categories = set(categorical or ())
+    forced_dates = set(date_columns or ())
+    rows = len(frame)
+
+    for column in frame.columns:
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(series):
+            continue
+        if column in forced_dates or (
+            column not in forced_categories and _is_text(series) and _matches(column, DATE_HINTS)
+        ):
+            if parse_dates:
+                frame[column] = _parse_dates(series)
+        elif _is_text(series):
+            if column in forced_categories or _matches(column, CATEGORICAL_HINTS):
+                frame[column] = series.astype("category")
+            elif rows and series.nunique(dropna=True) <= max_unique_ratio * rows:
+                frame[column] = series.astype("category")
+        elif pd.api.types.is_numeric_dtype(series):
+            frame[column] = _downcast_numeric(series)
+
+    if report:
+        after = int(frame.memory_usage(deep=True).sum())
+        logger.info("dtype pass: %s -> %s", mib(before), mib(after))
+    return frame
+
+
+def with_dtype_pass(
+    transform: Callable[[pd.DataFrame], pd.DataFrame], **options
+) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """``transform`` followed by :func:`optimise_dtypes` on its output.
+
+    Current RSS is logged before and after the pair, with the peak rise in
+    between, so the saving shows up for the transform stage itself.
+    """
+
+    @functools.wraps(transform)
+    def run(frame: pd.DataFrame) -> pd.DataFrame:
+        with rss_window() as rss:
+            out = optimise_dtypes(transform(frame), **options)
+        logger.info("transform + dtype pass: %d rows, %s", len(out), rss.describe())
+        return out
+
+    return run
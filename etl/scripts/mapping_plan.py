@@ -0,0 +1,309 @@
+"""Compiled column-mapping plan for the transform stage.
+
+``column_mapping.yaml`` is parsed and validated once into a
+:class:`MappingPlan`; applying the plan runs one vectorised operation per
+column (value map, date parse, dtype cast) and a single rename, never a
+per-row loop.  :func:`load_plan` caches the compiled plan per file and only
+recompiles when the YAML content changes.  :func:`transform` is the
+stage hook the pipeline and incremental runners select with
+``--transform plan``.
+
+Accepted YAML shapes (under a top-level ``columns:`` key or at the top
+level)::
+
+    columns:
+      "Customer Name": customer_name        # rename only
+      "Package":
+        name: package                       # alias: target, rename, to
+        values: {"Pkg A": A, "Pkg B": B}    # alias: map, value_map
+      "Booking Date":
+        name: booking_date
+        dtype: date                         # alias: type
+        date_format: "%m/%d/%Y"             # alias: format
+      "Price": {name: price, dtype: float, default: 0, min: 0}
+
+or a list of ``{source: ..., target: ..., ...}`` entries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from extract_stream import ETL_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPING = ETL_DIR / "config" / "column_mapping.yaml"
+
+_DTYPES = {
+    "str": "string",
+    "string": "string",
+    "text": "string",
+    "int": "Int64",
+    "integer": "Int64",
+    "float": "float64",
+    "number": "float64",
+    "decimal": "float64",
+    "bool": "boolean",
+    "boolean": "boolean",
+    "category": "category",
+    "categorical": "category",
+    "date": "date",
+    "datetime": "datetime",
+}
+_ALIASES = {
+    "target": ("name", "target", "rename", "to"),
+    "dtype": ("dtype", "type"),
+    "values": ("values", "map", "value_map", "mapping"),
+    "date_format": ("date_format", "format"),
+    "default": ("default", "fillna"),
+    "allowed": ("allowed", "choices"),
+}
+_TRUE = {"true", "yes", "y", "1", "t"}
+_FALSE = {"false", "no", "n", "0", "f"}
+
+
+class MappingError(ValueError):
+    """Raised when column_mapping.yaml cannot be compiled."""
+
+
+@dataclass(frozen=True)
+class ColumnRule:
+    source: str
+    target: str
+    dtype: Optional[str] = None
+    values: Optional[Mapping[Any, Any]] = None
+    date_format: Optional[str] = None
+    default: Any = None
+    # Constraints, checked by validate.py rather than applied here.
+    required: bool = False
+    allowed: Optional[tuple] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+@dataclass
+class MappingPlan:
+    rules: List[ColumnRule]
+    digest: str = ""
+    renames: Dict[str, str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.renames = {rule.source: rule.target for rule in self.rules if rule.source != rule.target}
+
+    @property
+    def source_columns(self) -> List[str]:
+        return [rule.source for rule in self.rules]
+
+    def apply(self, frame: pd.DataFrame, copy: bool = False) -> pd.DataFrame:
+        """Apply every rule to ``frame`` column by column, then rename once.
+
+        With ``copy=False`` the input frame is modified in place and
+        returned, so the transform stage does not hold two copies of a wide
+        booking frame.  Rules whose source column is absent are skipped.
+        """
+        if copy:
+            frame = frame.copy()
+        missing = []
+        for rule in self.rules:
+            if rule.source not in frame.columns:
+                missing.append(rule.source)
+                continue
+            frame[rule.source] = _apply_rule(frame[rule.source], rule)
+        if missing:
+            logger.debug("mapping columns absent from frame: %s", missing)
+        if self.renames:
+            frame.rename(columns=self.renames, inplace=True)
+        return frame
+
+
+def _map_values(series: pd.Series, values: Mapping[Any, Any]) -> pd.Series:
+    # Factorize first so the dict lookup runs once per distinct value rather
+    # than once per row; unmapped values pass through unchanged.
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = np.array([values.get(value, value) for value in uniques], dtype=object)
+    out = np.empty(len(series), dtype=object)
+    valid = codes >= 0
+    out[valid] = mapped[codes[valid]]
+    out[~valid] = None
+    return pd.Series(out, index=series.index, name=series.name).infer_objects()
+
+
+def _to_bool(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype("boolean")
+    text = series.astype("string").str.strip().str.lower()
+    out = pd.Series(pd.NA, index=series.index, dtype="boolean")
+    out[text.isin(_TRUE).fillna(False)] = True
+    out[text.isin(_FALSE).fillna(False)] = False
+    return out
+
+
+def _apply_rule(series: pd.Series, rule: ColumnRule) -> pd.Series:
+    if rule.values:
+        series = _map_values(series, rule.values)
+    dtype = rule.dtype
+    if dtype in ("date", "datetime"):
+        if not pd.api.types.is_datetime64_any_dtype(series):
+            series = pd.to_datetime(series, format=rule.date_format, errors="coerce", cache=True)
+        if dtype == "date":
+            series = series.dt.normalize()
+    elif dtype in ("Int64", "float64"):
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors="coerce")
+        if dtype == "Int64":
+            series = series.round().astype("Int64")
+        else:
+            series = series.astype("float64")
+    elif dtype == "boolean":
+        series = _to_bool(series)
+    elif dtype == "string":
+        series = series.astype("string").str.strip()
+    elif dtype == "category":
+        series = series.astype("category")
+    if rule.default is not None:
+        if isinstance(series.dtype, pd.CategoricalDtype) and rule.default not in series.cat.categories:
+            series = series.cat.add_categories([rule.default])
+        series = series.fillna(rule.default)
+    return series
+
+
+def _pick(spec: Mapping[str, Any], key: str) -> Any:
+    for alias in _ALIASES[key]:
+        if alias in spec:
+            return spec[alias]
+    return None
+
+
+def _rule(source: Any, spec: Any) -> ColumnRule:
+    source = str(source)
+    if spec is None:
+        return ColumnRule(source, source)
+    if isinstance(spec, str):
+        return ColumnRule(source, spec)
+    if not isinstance(spec, Mapping):
+        raise MappingError(f"{source!r}: expected a column name or a mapping, got {spec!r}")
+
+    target = _pick(spec, "target") or source
+    raw_dtype = _pick(spec, "dtype")
+    dtype = None
+    if raw_dtype is not None:
+        dtype = _DTYPES.get(str(raw_dtype).lower())
+        if dtype is None:
+            raise MappingError(f"{source!r}: unknown dtype {raw_dtype!r}")
+    values = _pick(spec, "values")
+    if values is not None and not isinstance(values, Mapping):
+        raise MappingError(f"{source!r}: values must be a mapping, got {type(values).__name__}")
+    date_format = _pick(spec, "date_format")
+    if date_format is not None:
+        if not isinstance(date_format, str):
+            raise MappingError(f"{source!r}: date_format must be a string")
+        dtype = dtype or "datetime"
+    allowed = _pick(spec, "allowed")
+    if allowed is not None and not isinstance(allowed, (list, tuple)):
+        raise MappingError(f"{source!r}: allowed must be a list")
+    bounds = {}
+    for bound in ("min", "max"):
+        value = spec.get(bound)
+        if value is not None and not isinstance(value, (int, float)):
+            raise MappingError(f"{source!r}: {bound} must be a number, got {value!r}")
+        bounds[bound] = value
+    return ColumnRule(
+        source=source,
+        target=str(target),
+        dtype=dtype,
+        values=dict(values) if values else None,
+        date_format=date_format,
+        default=_pick(spec, "default"),
+        required=bool(spec.get("required", False)),
+        allowed=tuple(allowed) if allowed is not None else None,
+        **bounds,
+    )
+
+
+def compile_mapping(config: Any, digest: str = "") -> MappingPlan:
+    """Validate a parsed mapping document and return its plan."""
+    if isinstance(config, Mapping) and "columns" in config:
+        config = config["columns"]
+
+    rules: List[ColumnRule] = []
+    if isinstance(config, Mapping):
+        rules = [_rule(source, spec) for source, spec in config.items()]
+    elif isinstance(config, list):
+        for entry in config:
+            if not isinstance(entry, Mapping) or "source" not in entry:
+                raise MappingError(f"list entries need a 'source' key, got {entry!r}")
+            rules.append(_rule(entry["source"], {k: v for k, v in entry.items() if k != "source"}))
+    else:
+        raise MappingError(f"expected a mapping or list of columns, got {type(config).__name__}")
+
+    targets = [rule.target for rule in rules]
+    duplicates = sorted({t for t in targets if targets.count(t) > 1})
+    if duplicates:
+        raise MappingError(f"several columns map to {duplicates}")
+    return MappingPlan(rules, digest)
+
+
+_cache: Dict[str, Tuple[Tuple[int, int], str, MappingPlan]] = {}
+_cache_lock = threading.Lock()
+
+
+def load_plan(path: Path | str = DEFAULT_MAPPING) -> MappingPlan:
+    """Return the compiled plan for ``path``, recompiling only when it changed.
+
+    A stat check avoids reading the file on the hot path; when mtime/size
+    moved the file is hashed and recompiled only if its content differs.
+    """
+    path = Path(path)
+    key = str(path.resolve())
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[2]
+
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached and cached[1] == digest:
+            _cache[key] = (signature, digest, cached[2])
+            return cached[2]
+
+        try:
+            document = yaml.safe_load(raw)
+        except yaml.YAMLError as exc:
+            raise MappingError(f"{path.name}: {exc}") from exc
+        plan = compile_mapping(document, digest)
+        _cache[key] = (signature, digest, plan)
+        logger.info("compiled %s: %d column rules", path.name, len(plan.rules))
+        return plan
+
+
+def apply_mapping(frame: pd.DataFrame, path: Path | str = DEFAULT_MAPPING, copy: bool = False) -> pd.DataFrame:
+    """Apply the (cached) plan of ``path`` to ``frame``."""
+    return load_plan(path).apply(frame, copy=copy)
+
+
+def mapping_path() -> Path:
+    """``ETL_MAPPING`` if set, else ``etl/config/column_mapping.yaml``."""
+    return Path(os.environ.get("ETL_MAPPING") or DEFAULT_MAPPING)
+
+
+def transform(frame: pd.DataFrame) -> pd.DataFrame:
+    """Transform hook: apply the compiled plan to the extracted frame in place.
+
+    Select it with ``--transform plan`` (or ``ETL_TRANSFORM=plan``); see
+    :data:`etl_hooks.NAMED_HOOKS`.
+    """
+    return apply_mapping(frame, mapping_path(), copy=False)
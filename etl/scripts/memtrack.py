@@ -0,0 +1,119 @@
+"""Process memory readings for ETL run summaries (no psutil needed).
+
+:func:`peak_rss` is the process-lifetime high-water mark, so it cannot show
+what one step cost once an earlier step went higher.  :func:`rss_window`
+measures a block instead: current RSS before and after it, and the highest
+RSS sampled while it ran.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Iterator
+
+MIB = 1024 * 1024
+SAMPLE_INTERVAL = 0.05
+
+
+def _windows_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+    )
+    return counters
+
+
+def peak_rss() -> int:
+    """Highest resident set size of this process so far, in bytes."""
+    if sys.platform == "win32":
+        return int(_windows_counters().PeakWorkingSetSize)
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def current_rss() -> int:
+    """Current resident set size in bytes (falls back to the peak)."""
+    if sys.platform == "win32":
+        return int(_windows_counters().WorkingSetSize)
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def mib(value: int) -> str:
+    return f"{value / MIB:.1f} MiB"
+
+
+class RssSampler(threading.Thread):
+    """Track the highest current RSS seen until :meth:`stop`."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, current_rss())
+
+
+@dataclass
+class RssWindow:
+    before: int = 0
+    after: int = 0
+    peak: int = 0
+
+    @property
+    def peak_delta(self) -> int:
+        """How far RSS rose above its starting point while the block ran."""
+        return max(self.peak - self.before, 0)
+
+    def describe(self) -> str:
+        return f"RSS {mib(self.before)} -> {mib(self.after)}, peak +{mib(self.peak_delta)}"
+
+
+@contextlib.contextmanager
+def rss_window(interval: float = SAMPLE_INTERVAL) -> Iterator[RssWindow]:
+    """Measure current RSS around the block; the window is filled in when it exits."""
+    window = RssWindow(before=current_rss())
+    sampler = RssSampler(interval)
+    sampler.start()
+    try:
+        yield window
+    finally:
+        window.peak = sampler.stop()
+        window.after = current_rss()
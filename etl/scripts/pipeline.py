@@ -0,0 +1,460 @@
+"""Staged, resumable ETL runner: extract -> transform -> validate -> load -> refresh.
+
+Every stage has an *input key*: a hash of the upstream stage's key, the
+source code of the stage function and its options.  The extract stage keys
+on the workbook's per-sheet content hashes.  When a stage finishes, its
+output is checkpointed under ``etl/cache/pipeline/`` together with that key.
+
+With ``resume=True`` a stage is skipped when its recorded key matches the
+current one and its checkpoint is still on disk; downstream stages then read
+the checkpoint instead of recomputing.  A run that died during ``load``
+therefore restarts at ``load`` with the transformed frame from disk.
+
+The transform hook's output goes through the dtype pass of lean_dtypes.py
+(categoricals, downcast numerics) before it is checkpointed, unless
+``--keep-dtypes``; the stage metrics show current RSS around each stage.
+
+The ``validate`` stage (see validate.py) drops rows that break the mapping
+or model constraints and writes them to ``etl/quarantine/`` before load.
+
+Usage::
+
+    python etl/scripts/pipeline.py --resume
+    python manage.py run_etl_pipeline --resume
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from extract_stream import DEFAULT_WORKBOOK, ETL_DIR
+from frame_store import find_frame, read_frame, write_frame
+from stage_metrics import DEFAULT_METRICS_FILE, DEFAULT_PROFILE_DIR, MetricsRecorder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = ETL_DIR / "cache" / "pipeline"
+STATE_NAME = "state.json"
+STAGE_ORDER = ("extract", "transform", "load", "refresh")
+DEFAULT_MAPPING = ETL_DIR / "config" / "column_mapping.yaml"
+
+
+def code_digest(fn: Callable) -> str:
+    """Hash of the source file defining ``fn`` (so code edits invalidate checkpoints)."""
+    while isinstance(fn, partial):
+        fn = fn.func
+    try:
+        source = inspect.getsourcefile(fn)
+        if source:
+            return hashlib.sha256(Path(source).read_bytes()).hexdigest()
+    except (TypeError, OSError):
+        pass
+    return getattr(fn, "__module__", "") + "." + getattr(fn, "__qualname__", repr(fn))
+
+
+def _key(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass
+class Stage:
+    """One pipeline step.
+
+    ``run`` receives the upstream output (``None`` for the first stage).
+    ``output`` is ``"frame"`` for DataFrame outputs checkpointed through
+    frame_store, ``"json"`` for small JSON-able results, ``None`` for side
+    effects only.  ``config`` is anything besides code and upstream data that
+    changes the result (paths, flags); ``code`` lists the functions whose
+    source is hashed into the key when ``run`` is only a wrapper around them.
+    """
+
+    name: str
+    run: Callable[[Any], Any]
+    output: Optional[str] = "frame"
+    config: Dict[str, Any] = field(default_factory=dict)
+    source_key: Optional[Callable[[], Any]] = None
+    code: Sequence[Callable] = ()
+
+
+@dataclass
+class StageReport:
+    name: str
+    status: str  # "ran" | "skipped" | "failed"
+    seconds: float = 0.0
+    rows_out: Optional[int] = None
+    input_key: str = ""
+    error: Optional[str] = None
+
+
+def _rows(value: Any) -> Optional[int]:
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, dict) and all(isinstance(v, int) for v in value.values()):
+        return sum(value.values())
+    return None
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        checkpoint_dir: Path | str = DEFAULT_CHECKPOINT_DIR,
+        resume: bool = False,
+        recorder: Optional[MetricsRecorder] = None,
+    ):
+        self.stages = list(stages)
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.resume = resume
+        self.recorder = recorder
+        self.state_path = self.checkpoint_dir / STATE_NAME
+        self.state: Dict[str, dict] = self._load_state()
+
+    def _load_state(self) -> Dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text())
+        except ValueError:
+            logger.warning("ignoring unreadable pipeline state %s", self.state_path)
+            return {}
+
+    def _save_state(self) -> None:
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2, sort_keys=True))
+        tmp.replace(self.state_path)
+
+    def _has_checkpoint(self, stage: Stage) -> bool:
+        if stage.output == "frame":
+            return find_frame(self.checkpoint_dir / stage.name) is not None
+        if stage.output == "json":
+            return (self.checkpoint_dir / f"{stage.name}.json").exists()
+        return True
+
+    def _read_checkpoint(self, stage: Stage) -> Any:
+        if stage.output == "frame":
+            return read_frame(self.checkpoint_dir / stage.name)
+        if stage.output == "json":
+            return json.loads((self.checkpoint_dir / f"{stage.name}.json").read_text())
+        return None
+
+    def _write_checkpoint(self, stage: Stage, value: Any) -> None:
+        if stage.output == "frame":
+            if not isinstance(value, pd.DataFrame):
+                raise TypeError(f"stage {stage.name!r} must return a DataFrame, got {type(value).__name__}")
+            write_frame(value, self.checkpoint_dir / stage.name)
+        elif stage.output == "json":
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+            (self.checkpoint_dir / f"{stage.name}.json").write_text(json.dumps(value, default=str))
+
+    def input_key(self, stage: Stage, upstream_key: str) -> str:
+        source = stage.source_key() if stage.source_key else None
+        code = [code_digest(fn) for fn in (stage.code or [stage.run])]
+        return _key(stage.name, upstream_key, code, stage.config, source)
+
+    def can_skip(self, stage: Stage, key: str) -> bool:
+        recorded = self.state.get(stage.name, {})
+        return (
+            self.resume
+            and recorded.get("status") == "completed"
+            and recorded.get("input_key") == key
+            and self._has_checkpoint(stage)
+        )
+
+    def execute(self, stage: Stage, value: Any) -> Any:
+        """Run one stage on ``value``, measured when a recorder is attached."""
+        if self.recorder is None:
+            return stage.run(value)
+        with self.recorder.measure(stage.name, rows_in=_rows(value)) as metrics:
+            result = stage.run(value)
+            metrics.rows_out = _rows(result)
+        return result
+
+    def run(self) -> List[StageReport]:
+        reports: List[StageReport] = []
+        upstream_key = ""
+        value: Any = None
+        loaded = True  # whether ``value`` holds the upstream output in memory
+
+        for index, stage in enumerate(self.stages):
+            key = self.input_key(stage, upstream_key)
+            if self.can_skip(stage, key):
+                logger.info("%s: inputs unchanged, reusing checkpoint", stage.name)
+                reports.append(StageReport(stage.name, "skipped", input_key=key))
+                if self.recorder is not None:
+                    self.recorder.skipped(stage.name)
+                upstream_key, loaded = key, False
+                continue
+
+            if not loaded:
+                value = self._read_checkpoint(self.stages[index - 1])
+
+            self.state[stage.name] = {"status": "running", "input_key": key}
+            self._save_state()
+            started = time.perf_counter()
+            try:
+                value = self.execute(stage, value)
+            except Exception as exc:
+                self.state[stage.name] = {"status": "failed", "input_key": key, "error": repr(exc)}
+                self._save_state()
+                reports.append(
+                    StageReport(stage.name, "failed", time.perf_counter() - started, input_key=key, error=repr(exc))
+                )
+                logger.error("%s failed; rerun with --resume to continue from here", stage.name)
+                raise
+            seconds = time.perf_counter() - started
+            self._write_checkpoint(stage, value)
+            self.state[stage.name] = {
+                "status": "completed",
+                "input_key": key,
+                "completed_at": datetime.now(timezone.utc).isoformat(),
+                "seconds": round(seconds, 3),
+                "rows_out": _rows(value),
+            }
+            self._save_state()
+            reports.append(StageReport(stage.name, "ran", seconds, _rows(value), key))
+            logger.info("%s: done in %.2fs", stage.name, seconds)
+            upstream_key, loaded = key, True
+
+        return reports
+
+
+def _workbook_key(path: Optional[str], sheet: Optional[str]) -> Any:
+    from extract_cache import sheet_keys
+
+    workbook = Path(path) if path else DEFAULT_WORKBOOK
+    keys = sheet_keys(workbook)
+    return {sheet: keys.get(sheet)} if sheet else keys
+
+
+def build_stages(options: dict) -> List[Stage]:
+    """Stage list for the options accepted by :func:`build_parser`."""
+    from etl_hooks import resolve
+
+    path, sheet = options.get("path"), options.get("sheet")
+    extract = resolve("extract", options.get("extract"))
+    extract_args = (path,) if path else ()
+    extract_kwargs = {"sheet_name": sheet} if sheet else {}
+
+    def run_extract(_: Any) -> pd.DataFrame:
+        return extract(*extract_args, **extract_kwargs)
+
+    import extract_parallel
+
+    # The parallel extractor reads a directory of workbooks; key on all of them.
+    if extract is extract_parallel.extract:
+        source_key = partial(extract_parallel.source_key, path, sheet)
+    else:
+        source_key = partial(_workbook_key, path, sheet)
+    stages = [
+        Stage(
+            "extract",
+            run_extract,
+            config={"hook": options.get("extract"), "path": path, "sheet": sheet},
+            source_key=source_key,
+            code=[extract],
+        )
+    ]
+    backend = options.get("load_backend") or "auto"
+    mapping = Path(options.get("mapping") or DEFAULT_MAPPING)
+    transform = resolve("transform", options.get("transform"))
+    if options.get("mapping"):
+        import mapping_plan
+
+        if transform is mapping_plan.transform:
+            # --mapping applies to the plan-based transform too, not only to validation.
+            transform = partial(mapping_plan.apply_mapping, path=mapping, copy=False)
+    validate = _validation(options)
+
+    if options.get("incremental"):
+        from bulk_load import load_staging
+        from incremental import run_incremental
+
+        def transform_valid(frame: pd.DataFrame) -> pd.DataFrame:
+            return validate(transform(frame)) if validate else transform(frame)
+
+        def run_delta(frame: pd.DataFrame) -> dict:
+            summary = run_incremental(
+                frame,
+                transform=transform_valid,
+                load=partial(load_staging, backend=backend),
+                key_columns=options.get("key_columns") or (),
+                optimise=not options.get("keep_dtypes"),
+            )
+            return {"rows_loaded": summary.rows_loaded, "rows_rejected": summary.rows_rejected}
+
+        stages.append(
+            Stage(
+                "load",
+                run_delta,
+                output="json",
+                config={
+                    "incremental": True,
+                    "backend": backend,
+                    "key": options.get("key_columns"),
+                    "validate": bool(validate),
+                    "dtype_pass": not options.get("keep_dtypes"),
+                },
+                code=[run_incremental, transform, load_staging, transform_valid],
+            )
+        )
+    else:
+        load = resolve("load", options.get("load"))
+        run_transform, transform_code = transform, [transform]
+        if not options.get("keep_dtypes"):
+            from lean_dtypes import optimise_dtypes, with_dtype_pass
+
+            # Dates stay text when validation follows, so it can still quarantine unparseable ones.
+            run_transform = with_dtype_pass(transform, parse_dates=validate is None)
+            transform_code = [transform, optimise_dtypes]
+        stages.append(
+            Stage(
+                "transform",
+                run_transform,
+                config={"hook": options.get("transform"), "dtype_pass": not options.get("keep_dtypes")},
+                source_key=partial(_file_digest, mapping),
+                code=transform_code,
+            )
+        )
+        if validate:
+            from validate import validate_frame
+
+            stages.append(
+                Stage(
+                    "validate",
+                    validate,
+                    config={"quarantine_dir": options.get("quarantine_dir")},
+                    source_key=partial(_file_digest, options.get("mapping") or DEFAULT_MAPPING),
+                    code=[validate_frame],
+                )
+            )
+        stages.append(
+            Stage(
+                "load",
+                partial(load, backend=backend) if _accepts(load, "backend") else load,
+                output="json",
+                config={"hook": options.get("load"), "backend": backend},
+            )
+        )
+
+    if not options.get("skip_refresh"):
+        refresh = resolve("refresh", options.get("refresh"))
+
+        def run_refresh(_: Any) -> None:
+            refresh()
+
+        stages.append(
+            Stage("refresh", run_refresh, output=None, config={"hook": options.get("refresh")}, code=[refresh])
+        )
+    return stages
+
+
+def _validation(options: dict) -> Optional[Callable[[pd.DataFrame], pd.DataFrame]]:
+    if options.get("skip_validation"):
+        return None
+    from validate import DEFAULT_QUARANTINE_DIR, validation_stage
+
+    mapping = Path(options.get("mapping") or DEFAULT_MAPPING)
+    return validation_stage(
+        plan_path=mapping if mapping.exists() else None,
+        quarantine_dir=options.get("quarantine_dir") or DEFAULT_QUARANTINE_DIR,
+    )
+
+
+def _file_digest(path: Path | str) -> Optional[str]:
+    path = Path(path)
+    return hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else None
+
+
+def _accepts(fn: Callable, name: str) -> bool:
+    try:
+        return name in inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Run the staged ETL pipeline.")
+    parser.add_argument("--resume", action="store_true", help="Skip completed stages whose inputs are unchanged.")
+    parser.add_argument("--incremental", action="store_true", help="Load only new or changed bookings.")
+    parser.add_argument("--key", action="append", dest="key_columns", default=[], help="Booking identity column.")
+    parser.add_argument(
+        "--path", default=None, help="Workbook (or directory for --extract parallel); default: the hook's own."
+    )
+    parser.add_argument("--sheet", default=None)
+    parser.add_argument("--load-backend", choices=("auto", "orm", "copy"), default="auto")
+    parser.add_argument("--skip-refresh", action="store_true", help="Do not rebuild recommender artifacts.")
+    parser.add_argument("--skip-validation", action="store_true", help="Load transformed rows unchecked.")
+    parser.add_argument(
+        "--keep-dtypes", action="store_true", help="Skip the dtype optimisation pass after transform."
+    )
+    parser.add_argument("--mapping", default=None, help="column_mapping.yaml with validation constraints.")
+    parser.add_argument("--quarantine-dir", default=None, help="Where rejected rows go (default etl/quarantine).")
+    parser.add_argument("--checkpoint-dir", default=str(DEFAULT_CHECKPOINT_DIR))
+    parser.add_argument("--metrics-file", default=str(DEFAULT_METRICS_FILE), help="JSON lines, one per stage.")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=str(DEFAULT_PROFILE_DIR),
+        default=None,
+        metavar="DIR",
+        help="Dump cProfile stats per stage (default dir: etl/logs/profiles).",
+    )
+    for stage in STAGE_ORDER:
+        parser.add_argument(
+            f"--{stage}",
+            default=None,
+            metavar="MODULE:FUNCTION",
+            help=f"{stage} hook override (or a name from etl_hooks.NAMED_HOOKS, e.g. --transform plan).",
+        )
+    return parser
+
+
+def run_from_options(options: dict, recorder: Optional[MetricsRecorder] = None) -> List[StageReport]:
+    if recorder is None:
+        recorder = make_recorder(options)
+    pipeline = Pipeline(
+        build_stages(options),
+        options.get("checkpoint_dir") or DEFAULT_CHECKPOINT_DIR,
+        resume=options.get("resume", False),
+        recorder=recorder,
+    )
+    return pipeline.run()
+
+
+def make_recorder(options: dict) -> MetricsRecorder:
+    profile = options.get("profile")
+    return MetricsRecorder(
+        metrics_file=Path(options.get("metrics_file") or DEFAULT_METRICS_FILE),
+        profile_dir=Path(profile) if profile else None,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    recorder = make_recorder(vars(args))
+    try:
+        run_from_options(vars(args), recorder)
+    finally:
+        logger.info("\n%s", recorder.summary_table())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Per-stage metrics for ETL runs.
+
+:class:`MetricsRecorder` measures each stage's wall time, CPU time, rows in
+and out, current RSS when the stage started and ended, peak RSS while it
+ran (sampled by a background thread) and Django DB round trips (queries
+through the ORM or ``connection.cursor()``; raw ``copy_expert`` calls are
+not counted).  Every stage is appended as one
+JSON line to the metrics file; with ``profile_dir`` each stage also runs
+under cProfile and dumps ``<run>-<stage>.prof`` plus a text summary.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from extract_stream import ETL_DIR
+from memtrack import MIB, RssSampler, current_rss, peak_rss
+
+DEFAULT_METRICS_FILE = ETL_DIR / "logs" / "etl_metrics.jsonl"
+DEFAULT_PROFILE_DIR = ETL_DIR / "logs" / "profiles"
+
+
+def _new_run_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+@dataclass
+class StageMetrics:
+    run_id: str
+    stage: str
+    status: str = "running"
+    started_at: str = ""
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    peak_rss_mib: float = 0.0
+    rss_start_mib: float = 0.0
+    rss_end_mib: float = 0.0
+    db_queries: Optional[int] = None
+    profile: Optional[str] = None
+    error: Optional[str] = None
+
+
+@contextlib.contextmanager
+def _count_queries(counter: List[int]) -> Iterator[None]:
+    """Count DB round trips on every configured Django connection."""
+    try:
+        from django.conf import settings
+        from django.db import connections
+
+        enabled = settings.configured
+    except ImportError:
+        enabled = False
+    if not enabled:
+        counter.append(-1)
+        yield
+        return
+
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    counter.append(0)
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+@dataclass
+class MetricsRecorder:
+    metrics_file: Optional[Path] = DEFAULT_METRICS_FILE
+    profile_dir: Optional[Path] = None
+    run_id: str = field(default_factory=_new_run_id)
+    stages: List[StageMetrics] = field(default_factory=list)
+
+    def _emit(self, metrics: StageMetrics) -> None:
+        self.stages.append(metrics)
+        if self.metrics_file is None:
+            return
+        path = Path(self.metrics_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(asdict(metrics)) + "\n")
+
+    def skipped(self, stage: str) -> None:
+        self._emit(
+            StageMetrics(self.run_id, stage, status="skipped", started_at=datetime.now(timezone.utc).isoformat())
+        )
+
+    @contextlib.contextmanager
+    def measure(self, stage: str, rows_in: Optional[int] = None) -> Iterator[StageMetrics]:
+        """Measure the block; set ``rows_out`` on the yielded object inside it."""
+        metrics = StageMetrics(
+            self.run_id, stage, started_at=datetime.now(timezone.utc).isoformat(), rows_in=rows_in
+        )
+        metrics.rss_start_mib = round(current_rss() / MIB, 1)
+        sampler = RssSampler()
+        sampler.start()
+        profiler = cProfile.Profile() if self.profile_dir else None
+        queries: List[int] = []
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            with _count_queries(queries):
+                if profiler:
+                    profiler.enable()
+                try:
+                    yield metrics
+                finally:
+                    if profiler:
+                        profiler.disable()
+            metrics.status = "completed"
+        except BaseException as exc:
+            metrics.status = "failed"
+            metrics.error = repr(exc)
+            raise
+        finally:
+            metrics.wall_seconds = round(time.perf_counter() - wall, 4)
+            metrics.cpu_seconds = round(time.process_time() - cpu, 4)
+            metrics.peak_rss_mib = round(sampler.stop() / MIB, 1)
+            metrics.rss_end_mib = round(current_rss() / MIB, 1)
+            metrics.db_queries = queries[0] if queries and queries[0] >= 0 else None
+            if profiler:
+                metrics.profile = str(self._dump_profile(stage, profiler))
+            self._emit(metrics)
+
+    def _dump_profile(self, stage: str, profiler: cProfile.Profile) -> Path:
+        directory = Path(self.profile_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"{self.run_id}-{stage}.prof"
+        profiler.dump_stats(target)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(25)
+        target.with_suffix(".txt").write_text(text.getvalue())
+        return target
+
+    def summary_table(self) -> str:
+        header = (
+            f"{'stage':<10} {'status':<9} {'wall s':>8} {'cpu s':>8} {'rows in':>9} {'rows out':>9} "
+            f"{'RSS start':>9} {'RSS end':>9} {'peak MiB':>9} {'queries':>8}"
+        )
+        lines = [header, "-" * len(header)]
+        for m in self.stages:
+            lines.append(
+                f"{m.stage:<10} {m.status:<9} {m.wall_seconds:>8.2f} {m.cpu_seconds:>8.2f} "
+                f"{_fmt(m.rows_in):>9} {_fmt(m.rows_out):>9} {m.rss_start_mib:>9.1f} {m.rss_end_mib:>9.1f} "
+                f"{m.peak_rss_mib:>9.1f} {_fmt(m.db_queries):>8}"
+            )
+        lines.append(f"process peak RSS: {peak_rss() / MIB:.1f} MiB")
+        return "\n".join(lines)
+
+
+def _fmt(value: Optional[int]) -> str:
+    return "-" if value is None else str(value)
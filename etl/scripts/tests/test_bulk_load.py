@@ -0,0 +1,77 @@
+import io
+import re
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import bulk_load  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self):
+        self.statements = []
+        self.cursor = self  # copy_expert lives on the driver cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, payload):
+        self.statements.append(sql)
+
+
+class CopyUpsertTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import django
+            from django.conf import settings
+        except ImportError:  # pragma: no cover - depends on the environment
+            raise unittest.SkipTest("Django is not installed")
+        if not settings.configured:
+            settings.configure(INSTALLED_APPS=[], DATABASES={})
+            django.setup()
+        from django.db import models
+
+        class Booking(models.Model):
+            booking_id = models.CharField(max_length=20, unique=True)
+            customer_name = models.CharField(max_length=50)
+
+            class Meta:
+                app_label = "etl_bulk_load_tests"
+                db_table = "bookings"
+
+        cls.model = Booking
+
+    def test_staging_table_is_always_addressed_through_pg_temp(self):
+        cursor = FakeCursor()
+        connection = mock.Mock()
+        connection.ops.quote_name = lambda name: f'"{name}"'
+        connection.cursor.return_value = cursor
+        frame = pd.DataFrame({"booking_id": ["B1", "B2", "B3"], "customer_name": ["Ann", "Ben", "Cy"]})
+        with mock.patch("django.db.connections", {"default": connection}), mock.patch.object(
+            bulk_load, "_copy_payload", return_value=io.StringIO()
+        ):
+            self.assertEqual(bulk_load.copy_upsert(self.model, frame, batch_size=2), 3)
+
+        staging = [sql for sql in cursor.statements if "etl_stage_bookings" in sql]
+        self.assertEqual(len(staging), 1 + 1 + 2 * 3)  # drop, create, then truncate/copy/insert per batch
+        for sql in staging:
+            names = re.findall(r'([\w.]*)"etl_stage_bookings"', sql)
+            self.assertEqual(names, ["pg_temp."], sql)
+        self.assertTrue(staging[1].startswith('CREATE TEMP TABLE pg_temp."etl_stage_bookings" ON COMMIT DROP'))
+        self.assertIn('ON CONFLICT ("booking_id") DO UPDATE', staging[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from extract_parallel import ExtractError, _plan, extract, extract_parallel  # noqa: E402
+
+
+class ExtractParallelTests(unittest.TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = Path(scratch.name)
+        self.paths = []
+        for month, count in (("2025-01", 2), ("2025-02", 3)):
+            path = self.root / f"{month}.xlsx"
+            with pd.ExcelWriter(path) as writer:
+                pd.DataFrame({"Notes": ["cover"]}).to_excel(writer, sheet_name="Summary", index=False)
+                bookings = pd.DataFrame({"Booking ID": [f"{month}-{n}" for n in range(count)]})
+                bookings.to_excel(writer, sheet_name="Bookings", index=False)
+            self.paths.append(path)
+
+    def test_a_plain_sheet_name_is_one_sheet(self):
+        tasks, failures = _plan(self.paths, "Bookings")
+        self.assertEqual(tasks, [(str(path), "Bookings") for path in self.paths])
+        self.assertEqual(failures, [])
+
+    def test_reads_the_named_sheet_from_every_file(self):
+        results = extract_parallel(self.paths, "Bookings", workers=1)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([len(result.frame) for result in results], [2, 3])
+
+    def test_first_and_all_sheets(self):
+        first = extract_parallel(self.paths, "first", workers=1)
+        self.assertEqual([list(result.frame.columns) for result in first], [["Notes"], ["Notes"]])
+        self.assertEqual(len(extract_parallel(self.paths, "all", workers=1)), 4)
+
+    def test_extract_hook_combines_and_refuses_partial_input(self):
+        frame = extract(self.root, sheet_name="Bookings", workers=1)
+        self.assertEqual(len(frame), 5)
+        self.assertEqual(set(frame["source_sheet"]), {"Bookings"})
+
+        (self.root / "2025-03.xlsx").write_bytes(b"not a workbook")
+        with self.assertRaises(ExtractError):
+            extract(self.root, sheet_name="Bookings", workers=1, allow_partial=False)
+        self.assertEqual(len(extract(self.root, sheet_name="Bookings", workers=1, allow_partial=True)), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
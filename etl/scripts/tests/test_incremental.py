@@ -0,0 +1,97 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from incremental import Watermark, fingerprint, run_incremental  # noqa: E402
+from validate import Rule, validate_frame  # noqa: E402
+
+KEY = ["Booking ID"]
+
+
+def bookings():
+    return pd.DataFrame(
+        {
+            "Booking ID": [101, 102, 103, 104],
+            "Customer": ["Ann", "Ben", "Cy", "Dee"],
+            "Package": ["Solo", "Duo", "Solo", "Family"],
+            "Amount": [500.0, 900.0, 500.0, None],
+        }
+    )
+
+
+class WatermarkClassifyTests(unittest.TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.state_dir = Path(scratch.name)
+
+    def test_new_changed_and_unchanged_rows(self):
+        watermark = Watermark(self.state_dir)
+        first = bookings()
+        watermark.record(fingerprint(first, KEY), pd.Timestamp("2026-01-01", tz="UTC"))
+
+        second = pd.concat(
+            [first.iloc[:3], pd.DataFrame({"Booking ID": [105], "Customer": ["Eve"], "Package": ["Duo"]})],
+            ignore_index=True,
+        )
+        second.loc[1, "Package"] = "Family"  # 102 edited; 101 and 103 untouched; 105 new
+        new, changed = watermark.classify(fingerprint(second, KEY))
+        self.assertEqual(second["Booking ID"][new].tolist(), [105])
+        self.assertEqual(second["Booking ID"][changed].tolist(), [102])
+        self.assertEqual(second["Booking ID"][~(new | changed)].tolist(), [101, 103])
+
+    def test_dtype_drift_between_reads_is_not_an_edit(self):
+        watermark = Watermark(self.state_dir)
+        watermark.record(fingerprint(bookings(), KEY), pd.Timestamp("2026-01-01", tz="UTC"))
+        reread = bookings().astype({"Booking ID": "float64"})
+        new, changed = watermark.classify(fingerprint(reread, KEY))
+        self.assertFalse(new.any())
+        self.assertFalse(changed.any())
+
+    def test_runs_load_only_the_delta_and_persist_the_watermark(self):
+        loaded = []
+        options = dict(
+            transform=lambda frame: frame.copy(),
+            load=loaded.append,
+            key_columns=KEY,
+            state_dir=self.state_dir,
+            optimise=False,
+        )
+        first = run_incremental(bookings(), **options)
+        self.assertEqual((first.rows_new, first.rows_changed, first.rows_loaded), (4, 0, 4))
+
+        edited = bookings()
+        edited.loc[2, "Amount"] = 650.0
+        second = run_incremental(edited, **options)
+        self.assertEqual((second.rows_new, second.rows_changed, second.rows_skipped), (0, 1, 3))
+        self.assertEqual(loaded[-1]["Booking ID"].tolist(), [103])
+
+        third = run_incremental(edited, **options)
+        self.assertEqual((third.rows_new, third.rows_changed, third.rows_loaded), (0, 0, 0))
+        self.assertEqual(len(loaded), 2)
+
+    def test_rows_dropped_by_the_transform_are_retried_as_new(self):
+        loaded = []
+        rule = Rule("Amount:required", "Amount", lambda series: series.isna().to_numpy())
+
+        def strict(frame):
+            return validate_frame(frame, [rule], quarantine_dir=None).valid
+
+        options = dict(load=loaded.append, key_columns=KEY, state_dir=self.state_dir, optimise=False)
+        first = run_incremental(bookings(), transform=strict, **options)
+        self.assertEqual((first.rows_new, first.rows_loaded, first.rows_rejected), (4, 3, 1))
+        self.assertEqual(len(Watermark(self.state_dir)), 3)
+
+        # Same source once the rule (or the data) is fixed: only the rejected booking is new.
+        second = run_incremental(bookings(), transform=lambda frame: frame.copy(), **options)
+        self.assertEqual((second.rows_new, second.rows_changed, second.rows_loaded), (1, 0, 1))
+        self.assertEqual(loaded[-1]["Booking ID"].tolist(), [104])
+
+
+if __name__ == "__main__":
+    unittest.main()
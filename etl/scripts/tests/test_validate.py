@@ -0,0 +1,174 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mapping_plan import compile_mapping  # noqa: E402
+from validate import default_rules, hint_rules, mapping_rules, model_rules, validate_frame  # noqa: E402
+
+MAPPING = {
+    "columns": {
+        "Customer": {"name": "customer_name", "required": True},
+        "Date": {"name": "booking_date", "dtype": "date"},
+        "Pax": {"name": "pax", "dtype": "int", "min": 1, "max": 20},
+        "Status": {"name": "status", "allowed": ["Booked", "Cancelled"]},
+        "Package": {"name": "package", "values": {"Pkg A": "A", "Pkg B": "B"}},
+    }
+}
+
+
+def frame():
+    return pd.DataFrame(
+        {
+            "customer_name": ["Ann", " ", "Cy", "Dee", "Eve", "Fay"],
+            "booking_date": ["2025-01-02", "2025-01-03", "not a date", "2025-01-05", None, "2025-01-07"],
+            "pax": ["2", "3", "4", "0", "x", "21"],
+            "status": ["Booked", "Booked", "Cancelled", "Pending", "Booked", None],
+            "package": ["A", "Pkg B", "B", "C", None, "A"],
+            "total_price": [100.0, 200.0, -5.0, 150.0, 90.0, 80.0],
+        }
+    )
+
+
+def failing(rule, data):
+    return data.index[np.asarray(rule.check(data[rule.column]), dtype=bool)].tolist()
+
+
+class MappingRuleTests(unittest.TestCase):
+    def setUp(self):
+        self.rules = {rule.name: rule for rule in mapping_rules(compile_mapping(MAPPING))}
+        self.frame = frame()
+
+    def test_rule_names(self):
+        self.assertEqual(
+            sorted(self.rules),
+            [
+                "booking_date:unparseable_date",
+                "customer_name:required",
+                "package:unknown_code",
+                "pax:above_max",
+                "pax:below_min",
+                "pax:not_a_number",
+                "status:unknown_value",
+            ],
+        )
+
+    def test_required_treats_blank_strings_as_missing(self):
+        self.assertEqual(failing(self.rules["customer_name:required"], self.frame), [1])
+
+    def test_unparseable_date_ignores_missing_dates(self):
+        self.assertEqual(failing(self.rules["booking_date:unparseable_date"], self.frame), [2])
+
+    def test_numbers_and_bounds(self):
+        self.assertEqual(failing(self.rules["pax:not_a_number"], self.frame), [4])
+        self.assertEqual(failing(self.rules["pax:below_min"], self.frame), [3])
+        self.assertEqual(failing(self.rules["pax:above_max"], self.frame), [5])
+
+    def test_allowed_values_skip_missing(self):
+        self.assertEqual(failing(self.rules["status:unknown_value"], self.frame), [3])
+
+    def test_value_map_keys_and_targets_are_known_codes(self):
+        # "A"/"B" are canonical targets, "Pkg B" a mapped key; only "C" is unknown.
+        self.assertEqual(failing(self.rules["package:unknown_code"], self.frame), [3])
+
+    def test_hint_rules_reject_negative_money(self):
+        (rule,) = hint_rules(["customer_name", "total_price"])
+        self.assertEqual(rule.name, "total_price:negative")
+        self.assertEqual(failing(rule, self.frame), [2])
+
+
+class ModelRuleTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import django
+            from django.conf import settings
+        except ImportError:  # pragma: no cover - depends on the environment
+            raise unittest.SkipTest("Django is not installed")
+        if not settings.configured:
+            settings.configure(INSTALLED_APPS=[], DATABASES={})
+            django.setup()
+        from django.core.validators import MinValueValidator
+        from django.db import models
+
+        class Booking(models.Model):
+            name = models.CharField(max_length=3)
+            status = models.CharField(max_length=10, choices=[("B", "Booked"), ("C", "Cancelled")], null=True)
+            when = models.DateField(null=True)
+            pax = models.PositiveIntegerField(null=True)
+            price = models.FloatField(null=True, validators=[MinValueValidator(10)])
+
+            class Meta:
+                app_label = "etl_validate_tests"
+
+        cls.model = Booking
+
+    def test_field_types_choices_and_validators(self):
+        data = pd.DataFrame(
+            {
+                "name": ["Ann", "Benedict", None],
+                "status": ["B", "X", None],
+                "when": ["2025-01-01", "soon", None],
+                "pax": [1, -2, None],
+                "price": [12.0, 5.0, None],
+            }
+        )
+        rules = {rule.name: rule for rule in model_rules([self.model], data.columns)}
+        expected = {
+            "Booking.name:not_null": [2],
+            "Booking.name:too_long": [1],
+            "Booking.status:too_long": [],
+            "Booking.status:invalid_choice": [1],
+            "Booking.when:unparseable_date": [1],
+            "Booking.pax:not_a_number": [],
+            "Booking.pax:negative": [1],
+            "Booking.pax:below_min": [1],  # PositiveIntegerField also carries MinValueValidator(0)
+            "Booking.price:not_a_number": [],
+            "Booking.price:below_min": [1],
+        }
+        self.assertEqual({name: failing(rule, data) for name, rule in rules.items()}, expected)
+
+
+class ValidateFrameTests(unittest.TestCase):
+    def test_quarantine_csv_holds_rejected_rows_and_reasons(self):
+        data = frame()
+        rules = default_rules(data, compile_mapping(MAPPING))
+        with tempfile.TemporaryDirectory() as scratch:
+            result = validate_frame(data, rules, quarantine_dir=scratch, run_label="run1")
+            self.assertEqual(result.quarantine_file, Path(scratch) / "run1_rejected.csv")
+            quarantined = pd.read_csv(result.quarantine_file, keep_default_na=False)
+
+        self.assertEqual(result.valid.index.tolist(), [0])
+        self.assertEqual(result.rejected.index.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(list(quarantined.columns), list(data.columns) + ["_rejected_reasons"])
+        self.assertEqual(quarantined["customer_name"].tolist(), [" ", "Cy", "Dee", "Eve", "Fay"])
+        reasons = [set(r.split(";")) for r in quarantined["_rejected_reasons"]]
+        self.assertEqual(
+            reasons,
+            [
+                {"customer_name:required"},
+                {"total_price:negative", "booking_date:unparseable_date"},
+                {"pax:below_min", "status:unknown_value", "package:unknown_code"},
+                {"pax:not_a_number"},
+                {"pax:above_max"},
+            ],
+        )
+        self.assertEqual(result.counts["pax:below_min"], 1)
+        self.assertEqual(sum(result.counts.values()), 8)
+
+    def test_clean_frame_writes_no_quarantine_file(self):
+        data = frame().iloc[[0]]
+        with tempfile.TemporaryDirectory() as scratch:
+            result = validate_frame(data, default_rules(data, compile_mapping(MAPPING)), quarantine_dir=scratch)
+            self.assertEqual(list(Path(scratch).iterdir()), [])
+        self.assertIsNone(result.quarantine_file)
+        self.assertEqual(len(result.valid), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,247 @@
+"""Vectorised data-quality checks between transform and load.
+
+Rules come from two places:
+
+* ``column_mapping.yaml`` -- ``required``, ``allowed``, ``min``/``max`` and
+  the declared dtype (values that do not parse as that dtype) of every
+  mapped column, plus ``values`` maps, whose targets become the set of
+  known codes;
+* the backend models -- NOT NULL fields, ``max_length``, ``choices``,
+  positive/min-value fields and date/numeric field types.
+
+Money and count columns (see :data:`NON_NEGATIVE_HINTS`) must not be
+negative.  Each rule is one boolean mask over the whole frame; rows failing
+any rule are written to a quarantine CSV with the failed rule names, and only
+the clean rows go on to the loader, so one bad record can no longer roll
+back a whole batch.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from extract_stream import ETL_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUARANTINE_DIR = ETL_DIR / "quarantine"
+NON_NEGATIVE_HINTS = ("price", "amount", "total", "fee", "cost", "pax", "qty", "quantity")
+
+
+@dataclass
+class Rule:
+    name: str
+    column: str
+    check: Callable[[pd.Series], np.ndarray]  # True where the row is INVALID
+
+
+@dataclass
+class ValidationResult:
+    valid: pd.DataFrame
+    rejected: pd.DataFrame
+    counts: Dict[str, int] = field(default_factory=dict)
+    quarantine_file: Optional[Path] = None
+
+
+def _present(series: pd.Series) -> np.ndarray:
+    present = series.notna()
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        present &= series.astype("string").str.strip().ne("").fillna(False)
+    return present.to_numpy(dtype=bool)
+
+
+def _missing(series: pd.Series) -> np.ndarray:
+    return ~_present(series)
+
+
+def _bad_dates(series: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return np.zeros(len(series), dtype=bool)
+    parsed = pd.to_datetime(series, errors="coerce", format="mixed")
+    return _present(series) & parsed.isna().to_numpy()
+
+
+def _bad_numbers(series: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(series):
+        return np.zeros(len(series), dtype=bool)
+    parsed = pd.to_numeric(series, errors="coerce")
+    return _present(series) & parsed.isna().to_numpy()
+
+
+def _numeric(series: pd.Series) -> pd.Series:
+    return series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors="coerce")
+
+
+def _below(limit: float) -> Callable[[pd.Series], np.ndarray]:
+    return lambda series: (_numeric(series) < limit).fillna(False).to_numpy(dtype=bool)
+
+
+def _above(limit: float) -> Callable[[pd.Series], np.ndarray]:
+    return lambda series: (_numeric(series) > limit).fillna(False).to_numpy(dtype=bool)
+
+
+def _not_in(allowed) -> Callable[[pd.Series], np.ndarray]:
+    allowed = list(allowed)
+    return lambda series: _present(series) & ~series.isin(allowed).to_numpy()
+
+
+def _too_long(limit: int) -> Callable[[pd.Series], np.ndarray]:
+    return lambda series: (series.astype("string").str.len() > limit).fillna(False).to_numpy(dtype=bool)
+
+
+def mapping_rules(plan) -> List[Rule]:
+    """Rules declared in the compiled column mapping (by target column)."""
+    rules: List[Rule] = []
+    for rule in plan.rules:
+        column = rule.target
+        if rule.required:
+            rules.append(Rule(f"{column}:required", column, _missing))
+        if rule.dtype in ("date", "datetime"):
+            rules.append(Rule(f"{column}:unparseable_date", column, _bad_dates))
+        elif rule.dtype in ("Int64", "float64"):
+            rules.append(Rule(f"{column}:not_a_number", column, _bad_numbers))
+        if rule.allowed is not None:
+            rules.append(Rule(f"{column}:unknown_value", column, _not_in(rule.allowed)))
+        elif rule.values:
+            # Values already spelled canonically need no mapping entry, so the
+            # map's keys count as known as well as its targets.
+            known = set(rule.values) | set(rule.values.values())
+            rules.append(Rule(f"{column}:unknown_code", column, _not_in(known)))
+        if rule.min is not None:
+            rules.append(Rule(f"{column}:below_min", column, _below(rule.min)))
+        if rule.max is not None:
+            rules.append(Rule(f"{column}:above_max", column, _above(rule.max)))
+    return rules
+
+
+def model_rules(models, columns) -> List[Rule]:
+    """Rules implied by the Django model fields the frame's columns map to."""
+    from django.core.validators import MinValueValidator
+
+    from bulk_load import field_columns
+
+    rules: List[Rule] = []
+    for model in models:
+        for column, model_field in field_columns(model, columns).items():
+            label = f"{model.__name__}.{model_field.name}"
+            internal = model_field.get_internal_type()
+            if not model_field.null and not model_field.has_default() and not model_field.primary_key:
+                rules.append(Rule(f"{label}:not_null", column, _missing))
+            if getattr(model_field, "max_length", None) and internal in ("CharField", "SlugField", "EmailField"):
+                rules.append(Rule(f"{label}:too_long", column, _too_long(model_field.max_length)))
+            if model_field.choices:
+                keys = [key for key, _ in model_field.flatchoices]
+                rules.append(Rule(f"{label}:invalid_choice", column, _not_in(keys)))
+            if internal in ("DateField", "DateTimeField"):
+                rules.append(Rule(f"{label}:unparseable_date", column, _bad_dates))
+            if internal.endswith(("IntegerField", "FloatField", "DecimalField")):
+                rules.append(Rule(f"{label}:not_a_number", column, _bad_numbers))
+            if internal.startswith("Positive"):
+                rules.append(Rule(f"{label}:negative", column, _below(0)))
+            for validator in model_field.validators:
+                if isinstance(validator, MinValueValidator) and isinstance(validator.limit_value, (int, float)):
+                    rules.append(Rule(f"{label}:below_min", column, _below(validator.limit_value)))
+    return rules
+
+
+def hint_rules(columns) -> List[Rule]:
+    return [
+        Rule(f"{column}:negative", column, _below(0))
+        for column in columns
+        if any(hint in str(column).lower() for hint in NON_NEGATIVE_HINTS)
+    ]
+
+
+def default_rules(frame: pd.DataFrame, plan=None, models=None) -> List[Rule]:
+    rules = hint_rules(frame.columns)
+    if plan is not None:
+        rules += mapping_rules(plan)
+    if models:
+        rules += model_rules(models, frame.columns)
+    # Identical checks from several sources would only repeat reasons.
+    unique: Dict[str, Rule] = {}
+    for rule in rules:
+        if rule.column in frame.columns:
+            unique.setdefault(rule.name, rule)
+    return list(unique.values())
+
+
+def validate_frame(
+    frame: pd.DataFrame,
+    rules: Optional[List[Rule]] = None,
+    quarantine_dir: Optional[Path | str] = DEFAULT_QUARANTINE_DIR,
+    run_label: Optional[str] = None,
+) -> ValidationResult:
+    """Split ``frame`` into loadable and rejected rows.
+
+    Rejected rows keep all their columns plus ``_rejected_reasons`` and are
+    written to ``<quarantine_dir>/<run_label>_rejected.csv``.
+    """
+    if rules is None:
+        rules = default_rules(frame)
+    if not rules or frame.empty:
+        return ValidationResult(frame, frame.iloc[0:0])
+
+    masks = np.column_stack([np.asarray(rule.check(frame[rule.column]), dtype=bool) for rule in rules])
+    bad = masks.any(axis=1)
+    counts = {rule.name: int(n) for rule, n in zip(rules, masks.sum(axis=0)) if n}
+
+    if not bad.any():
+        logger.info("validation: %d rows, all passed %d rules", len(frame), len(rules))
+        return ValidationResult(frame, frame.iloc[0:0], counts)
+
+    names = np.array([rule.name + ";" for rule in rules], dtype=object)
+    reasons = pd.DataFrame(masks[bad], columns=range(len(rules))).dot(names).str.rstrip(";")
+    rejected = frame[bad].copy()
+    rejected["_rejected_reasons"] = reasons.to_numpy()
+    valid = frame[~bad]
+
+    target = None
+    if quarantine_dir is not None:
+        label = run_label or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        target = Path(quarantine_dir) / f"{label}_rejected.csv"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        rejected.to_csv(target, index=False)
+
+    logger.warning(
+        "validation: %d of %d rows quarantined%s (%s)",
+        len(rejected),
+        len(frame),
+        f" to {target}" if target else "",
+        ", ".join(f"{name}={n}" for name, n in sorted(counts.items())),
+    )
+    return ValidationResult(valid, rejected, counts, target)
+
+
+def validation_stage(
+    plan_path: Optional[Path | str] = None,
+    quarantine_dir: Optional[Path | str] = DEFAULT_QUARANTINE_DIR,
+    use_models: bool = True,
+) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """Return ``frame -> valid rows`` using the mapping and model rules."""
+
+    def run(frame: pd.DataFrame) -> pd.DataFrame:
+        plan = None
+        if plan_path is not None:
+            from mapping_plan import MappingError, load_plan
+
+            try:
+                plan = load_plan(plan_path)
+            except (OSError, MappingError) as exc:
+                logger.warning("validation without mapping rules: %s", exc)
+        models = None
+        if use_models:
+            from bulk_load import staging_models
+
+            models = staging_models()
+        rules = default_rules(frame, plan, models)
+        return validate_frame(frame, rules, quarantine_dir).valid
+
+    return run
@@ -0,0 +1,156 @@
+"""Benchmark: Surprise ``SVD`` vs. :class:`recommender.sgd.NumbaSVD`.
+
+Splits the ratings CSV once (80/20 by default) and fits each trainer with the
+same hyperparameters and seed, reporting fit time, speed-up over Surprise
+and test RMSE/MAE, so a speed-up never hides a change in accuracy.  The
+first fit of each NumbaSVD kernel includes JIT compilation (cached on disk
+afterwards), so it is timed separately as ``compile``.
+
+With ``--negative-ratio`` it also times training with sampled negatives
+both ways: materialising ``train_ratings_with_neg.csv`` (sample, write,
+re-read, build the trainset, fit) against ``NumbaSVD(negative_ratio=...)``
+drawing them per epoch.  Both are scored on the held-out positives, and the
+global means they trained with are reported next to the times.
+
+Usage::
+
+    python -m recommender.bench_sgd --data recommender/data/train_ratings.csv --epochs 20 --factors 100
+    python -m recommender.bench_sgd --negative-ratio 4 --epochs 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import pandas as pd
+
+from recommender.negative_sampling import augment
+from recommender.ratings import TRAIN_RATINGS, load_ratings
+from recommender.sgd import NumbaSVD
+
+logger = logging.getLogger(__name__)
+
+
+def _fit(name: str, algo, trainset, testset) -> dict:
+    from surprise import accuracy
+
+    started = time.perf_counter()
+    algo.fit(trainset)
+    seconds = time.perf_counter() - started
+    predictions = algo.test(testset)
+    return {
+        "trainer": name,
+        "fit_seconds": seconds,
+        "rmse": accuracy.rmse(predictions, verbose=False),
+        "mae": accuracy.mae(predictions, verbose=False),
+    }
+
+
+def _negative_rows(
+    ratings: pd.DataFrame, params: dict, ratio: float, negative_rating: float, test_size: float, seed: int
+) -> List[dict]:
+    """Materialised negatives file vs. per-epoch sampling, both scored on held-out positives."""
+    from surprise import Dataset, Reader
+
+    test = ratings.sample(frac=test_size, random_state=seed)
+    train = ratings.drop(test.index)
+    low, high = float(ratings["rating"].min()), float(ratings["rating"].max())
+    reader = Reader(rating_scale=(min(low, negative_rating), max(high, negative_rating)))
+    testset = list(test[["user", "item", "rating"]].itertuples(index=False, name=None))
+    rows = []
+
+    with tempfile.TemporaryDirectory() as scratch:
+        started = time.perf_counter()
+        path = Path(scratch) / "train_ratings_with_neg.csv"
+        augment(train, ratio=ratio, seed=seed, negative_rating=negative_rating).to_csv(path, index=False)
+        reread = pd.read_csv(path, dtype={"user": str, "item": str})
+        trainset = Dataset.load_from_df(reread, reader).build_full_trainset()
+        row = _fit("NumbaSVD + negatives CSV", NumbaSVD(**params), trainset, testset)
+        row["fit_seconds"] = time.perf_counter() - started
+        row["global_mean"] = trainset.global_mean
+        rows.append(row)
+
+    started = time.perf_counter()
+    trainset = Dataset.load_from_df(train, reader).build_full_trainset()
+    algo = NumbaSVD(negative_ratio=ratio, negative_rating=negative_rating, **params)
+    row = _fit("NumbaSVD per-epoch negatives", algo, trainset, testset)
+    row["fit_seconds"] = time.perf_counter() - started
+    row["global_mean"] = algo.global_mean
+    rows.append(row)
+    return rows
+
+
+def run(
+    ratings: pd.DataFrame,
+    n_factors: int,
+    n_epochs: int,
+    test_size: float,
+    seed: int,
+    negative_ratio: float = 0.0,
+    negative_rating: float = 0.0,
+) -> pd.DataFrame:
+    from surprise import SVD, Dataset, Reader
+    from surprise.model_selection import train_test_split
+
+    scale = (float(ratings["rating"].min()), float(ratings["rating"].max()))
+    data = Dataset.load_from_df(ratings, Reader(rating_scale=scale))
+    trainset, testset = train_test_split(data, test_size=test_size, random_state=seed)
+    params = {"n_factors": n_factors, "n_epochs": n_epochs, "random_state": seed}
+
+    started = time.perf_counter()
+    for hogwild in (False, True):
+        NumbaSVD(hogwild=hogwild, **{**params, "n_epochs": 1}).fit(trainset)
+    rows: List[dict] = [{"trainer": "compile", "fit_seconds": time.perf_counter() - started}]
+    rows.append(_fit("surprise SVD", SVD(**params), trainset, testset))
+    rows.append(_fit("NumbaSVD", NumbaSVD(**params), trainset, testset))
+    rows.append(_fit("NumbaSVD hogwild", NumbaSVD(hogwild=True, **params), trainset, testset))
+    if negative_ratio:
+        rows += _negative_rows(ratings, params, negative_ratio, negative_rating, test_size, seed)
+
+    frame = pd.DataFrame(rows)
+    baseline = frame.loc[frame["trainer"] == "surprise SVD", "fit_seconds"].iloc[0]
+    frame["speedup"] = (baseline / frame["fit_seconds"]).where(frame["trainer"] != "compile")
+    return frame
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Time Surprise SVD against the numba SGD trainer.")
+    parser.add_argument("--data", default=str(TRAIN_RATINGS))
+    parser.add_argument("--columns", nargs=3, default=None, metavar=("USER", "ITEM", "RATING"))
+    parser.add_argument("--factors", type=int, default=100)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--negative-ratio", type=float, default=0.0, help="Also time training with negatives.")
+    parser.add_argument("--negative-rating", type=float, default=0.0)
+    return parser
+
+
+def run_from_options(options: dict) -> pd.DataFrame:
+    ratings = load_ratings(options.get("data") or TRAIN_RATINGS, options.get("columns"))
+    logger.info("%d ratings, %d users, %d items", len(ratings), ratings["user"].nunique(), ratings["item"].nunique())
+    frame = run(
+        ratings,
+        options.get("factors") or 100,
+        options.get("epochs") or 20,
+        options.get("test_size") or 0.2,
+        options.get("seed") or 0,
+        options.get("negative_ratio") or 0.0,
+        options.get("negative_rating") or 0.0,
+    )
+    logger.info("\n%s", frame.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    return frame
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark: CSV vs. the columnar formats of :mod:`recommender.storage`.
+
+Copies each table into a scratch directory, stores it in every available
+format (Parquet and Feather need pyarrow, pickle always works) and reports
+the size on disk and the best-of-``--repeat`` time of a full load and of a
+projected load (``--columns``, by default the first three columns, which is
+what the ratings stages read).  The CSV loads use ``usecols`` for the
+projection, so the comparison is against the best the CSV path can do.
+The ``projects`` column says whether a format reads only those columns:
+pickle does not, so its projected time is a full load plus a selection.
+
+Usage::
+
+    python -m recommender.bench_storage recommender/data/merged_bookings.csv recommender/data/train_ratings.csv
+    python -m recommender.bench_storage --repeat 5 --columns booking_id package
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import pandas as pd
+
+from recommender import storage
+
+logger = logging.getLogger(__name__)
+
+
+def _best(load: Callable[[], pd.DataFrame], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def formats() -> List[str]:
+    return ["parquet", "feather", "pickle"] if storage.HAS_PYARROW else ["pickle"]
+
+
+def run(csv_path: Path | str, columns: Optional[Sequence[str]] = None, repeat: int = 3) -> pd.DataFrame:
+    csv_path = Path(csv_path)
+    with tempfile.TemporaryDirectory() as scratch:
+        source = Path(scratch) / csv_path.name
+        shutil.copyfile(csv_path, source)
+        header = storage.columns_of(source)
+        projected = [name for name in columns if name in header] if columns else header[:3]
+        rows = [
+            {
+                "format": "csv",
+                "bytes": source.stat().st_size,
+                "full_seconds": _best(lambda: pd.read_csv(source), repeat),
+                "projected_seconds": _best(lambda: pd.read_csv(source, usecols=projected), repeat),
+                "projects": True,
+            }
+        ]
+        frame = pd.read_csv(source)
+        typed = frame.astype(storage.infer_dtypes(frame))
+        for fmt in formats():
+            stored = storage.write_table(typed, source, fmt, source=source)
+            rows.append(
+                {
+                    "format": fmt,
+                    "bytes": stored.stat().st_size,
+                    "full_seconds": _best(lambda: storage.read_table(stored), repeat),
+                    "projected_seconds": _best(lambda: storage.read_table(stored, projected), repeat),
+                    "projects": stored.suffix in storage.PROJECTING,
+                }
+            )
+    result = pd.DataFrame(rows)
+    result.insert(0, "table", csv_path.stem)
+    csv_row = result.iloc[0]
+    result["size_ratio"] = result["bytes"] / csv_row["bytes"]
+    result["full_speedup"] = csv_row["full_seconds"] / result["full_seconds"]
+    result["projected_speedup"] = csv_row["full_seconds"] / result["projected_seconds"]
+    logger.info("%s: %d rows, projection %s", csv_path.name, len(frame), projected)
+    return result
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Time CSV loads against the columnar table formats.")
+    parser.add_argument("paths", nargs="*", help="CSV tables (default: every CSV under data/ and artifacts/).")
+    parser.add_argument("--columns", nargs="+", default=None, help="Projection to time (default: first three).")
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser
+
+
+def run_from_options(options: dict) -> pd.DataFrame:
+    paths = [Path(p) for p in options.get("paths") or []] or storage.discover()
+    frame = pd.concat(
+        [run(path, options.get("columns"), options.get("repeat") or 3) for path in paths], ignore_index=True
+    )
+    # projected_speedup is relative to a full CSV load: what each stage paid before.
+    logger.info("\n%s", frame.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    if not frame["projects"].all():
+        formats_read_in_full = ", ".join(sorted(set(frame.loc[~frame["projects"], "format"])))
+        logger.info(
+            "note: %s loads the whole table before selecting columns (no projection); "
+            "Parquet and Feather need pyarrow",
+            formats_read_in_full,
+        )
+    return frame
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
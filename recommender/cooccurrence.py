@@ -0,0 +1,317 @@
+"""Package x add-on co-occurrence per month as one sparse matrix.
+
+Grouping long-form booking/add-on rows and self-joining them grows with the
+square of the add-ons per booking.  Here each booking becomes one row of two
+sparse incidence matrices:
+
+* ``K`` -- bookings x (month, package), a one-hot of the booking's month and
+  package;
+* ``A`` -- bookings x add-ons, 1 where the booking has the add-on.
+
+``C = K.T @ A`` counts, for every (month, package), the bookings that also
+took each add-on, in one sparse product whose cost is linear in the
+booking/add-on rows.  ``C`` is stored as a single CSR whose rows are
+``month_index * n_packages + package_index``, so one month is a contiguous
+block of rows and "top add-ons for a package in a month" is a row slice::
+
+    recommender/artifacts/month_package_addon_cooccurrence.npz
+
+The ``.npz`` holds the CSR arrays under the names :func:`scipy.sparse.load_npz`
+expects, plus the month, package and add-on labels.  ``--csv`` also writes
+the long form (``month, package, addon, count``) as
+``month_package_addon_cooccurrence_counts.csv``; the existing
+``month_package_addon_cooccurrence.csv`` has another layout and is never
+overwritten.
+
+Usage::
+
+    python -m recommender.cooccurrence --bookings recommender/data/merged_bookings.csv \\
+        --addons recommender/data/booking_addons.csv --csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender.model_io import ARTIFACTS_DIR, DATA_DIR
+from recommender.storage import read_present, read_table
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BOOKINGS = DATA_DIR / "merged_bookings.csv"
+DEFAULT_ADDONS = DATA_DIR / "booking_addons.csv"
+DEFAULT_PATH = ARTIFACTS_DIR / "month_package_addon_cooccurrence.npz"
+LONG_CSV_SUFFIX = "_counts.csv"
+ALL_MONTHS = None
+
+
+def same_id_dtype(left: pd.Series, right: pd.Series) -> bool:
+    """Whether two id columns can be matched as they are (integer widths may differ)."""
+    integers = pd.api.types.is_integer_dtype
+    return left.dtype == right.dtype or (integers(left) and integers(right))
+
+
+def month_labels(bookings: pd.DataFrame, month_column: str = "month", date_column: str = "booking_date") -> pd.Series:
+    """``YYYY-MM`` per booking, from a month column if present, else from the booking date."""
+    if month_column in bookings:
+        values = bookings[month_column]
+        return values.astype(str).str.slice(0, 7).where(values.notna())
+    dates = pd.to_datetime(bookings[date_column], errors="coerce")
+    # Format each distinct month once; strftime over every row dominates the build otherwise.
+    codes, uniques = pd.factorize(dates.dt.year * 100 + dates.dt.month)
+    labels = np.array([f"{int(k) // 100:04d}-{int(k) % 100:02d}" for k in uniques] + [None], dtype=object)
+    return pd.Series(labels[codes], index=bookings.index)
+
+
+@dataclass
+class Cooccurrence:
+    matrix: sparse.csr_matrix  # int32 [(months * packages), addons]
+    months: np.ndarray  # sorted "YYYY-MM" labels
+    packages: np.ndarray  # sorted package labels
+    addons: np.ndarray  # sorted add-on labels
+
+    def __post_init__(self) -> None:
+        self._package_index = {str(p): n for n, p in enumerate(self.packages)}
+        self._month_index = {str(m): n for n, m in enumerate(self.months)}
+        self._totals: Optional[sparse.csr_matrix] = None
+
+    @property
+    def n_packages(self) -> int:
+        return len(self.packages)
+
+    def month(self, month: str) -> sparse.csr_matrix:
+        """packages x add-ons counts for one month (a contiguous row slice)."""
+        m = self._month_index[str(month)]
+        return self.matrix[m * self.n_packages : (m + 1) * self.n_packages]
+
+    def totals(self) -> sparse.csr_matrix:
+        """packages x add-ons counts over all months."""
+        if self._totals is None:
+            coo = self.matrix.tocoo()
+            totals = sparse.csr_matrix(
+                (coo.data.astype(np.int64), (coo.row % max(self.n_packages, 1), coo.col)),
+                shape=(self.n_packages, len(self.addons)),
+            )
+            totals.sum_duplicates()
+            self._totals = totals
+        return self._totals
+
+    def row(self, package, month: Optional[str] = ALL_MONTHS) -> Tuple[np.ndarray, np.ndarray]:
+        """``(addon indices, counts)`` of one package row; empty if package or month is unknown."""
+        p = self._package_index.get(str(package))
+        if p is None or (month is not None and str(month) not in self._month_index):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        if month is None:
+            matrix, r = self.totals(), p
+        else:
+            matrix, r = self.matrix, self._month_index[str(month)] * self.n_packages + p
+        start, end = matrix.indptr[r], matrix.indptr[r + 1]
+        return matrix.indices[start:end], matrix.data[start:end]
+
+    def top_addons(self, package, k: int = 5, month: Optional[str] = ALL_MONTHS) -> List[Tuple[str, int]]:
+        """The ``k`` add-ons most often booked with ``package`` (in ``month``, or overall), best first."""
+        indices, counts = self.row(package, month)
+        if not len(indices) or k <= 0:
+            return []
+        if len(indices) > k:
+            best = np.argpartition(-counts, k - 1)[:k]
+            indices, counts = indices[best], counts[best]
+        # Ties broken by add-on label so results are stable across rebuilds.
+        order = np.lexsort((self.addons[indices], -counts))
+        return [(str(self.addons[indices[i]]), int(counts[i])) for i in order]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long form ``month, package, addon, count`` (the old CSV layout)."""
+        coo = self.matrix.tocoo()
+        month, package = np.divmod(coo.row, max(self.n_packages, 1))
+        return pd.DataFrame(
+            {
+                "month": self.months[month],
+                "package": self.packages[package],
+                "addon": self.addons[coo.col],
+                "count": coo.data,
+            }
+        ).sort_values(["month", "package", "count", "addon"], ascending=[True, True, False, True], ignore_index=True)
+
+
+def build_cooccurrence(
+    bookings: pd.DataFrame,
+    addons: pd.DataFrame,
+    booking_column: str = "booking_id",
+    package_column: str = "package",
+    addon_column: str = "addon",
+    month_column: str = "month",
+    date_column: str = "booking_date",
+) -> Cooccurrence:
+    """Count bookings per (month, package, add-on) with one sparse incidence product."""
+    booking_ids, addon_booking_ids = bookings[booking_column], addons[booking_column]
+    if not same_id_dtype(booking_ids, addon_booking_ids):
+        booking_ids, addon_booking_ids = booking_ids.astype(str), addon_booking_ids.astype(str)
+    frame = pd.DataFrame(
+        {
+            "booking": booking_ids,
+            "package": bookings[package_column].astype(str),
+            "month": month_labels(bookings, month_column, date_column),
+        }
+    ).dropna()
+    frame = frame.drop_duplicates()
+    booking_index = pd.Index(frame["booking"].unique())
+    month_codes, months = pd.factorize(frame["month"], sort=True)
+    package_codes, packages = pd.factorize(frame["package"], sort=True)
+    n_packages = len(packages)
+
+    # K: one row per (booking, month, package) row of the bookings table.
+    rows = booking_index.get_indexer(frame["booking"])
+    keys = month_codes.astype(np.int64) * n_packages + package_codes
+    incidence_k = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, keys)), shape=(len(booking_index), len(months) * n_packages)
+    )
+
+    addon_rows = pd.DataFrame({"booking": addon_booking_ids, "addon": addons[addon_column].astype(str)})
+    addon_rows = addon_rows[addons[addon_column].notna() & addon_rows["booking"].isin(booking_index)]
+    addon_rows = addon_rows.drop_duplicates()
+    addon_codes, addon_labels = pd.factorize(addon_rows["addon"], sort=True)
+    incidence_a = sparse.csr_matrix(
+        (np.ones(len(addon_rows), dtype=np.int32), (booking_index.get_indexer(addon_rows["booking"]), addon_codes)),
+        shape=(len(booking_index), len(addon_labels)),
+    )
+
+    matrix = (incidence_k.T.tocsr() @ incidence_a).tocsr()
+    matrix.sum_duplicates()
+    matrix.sort_indices()
+    matrix.eliminate_zeros()
+    return Cooccurrence(
+        matrix.astype(np.int32),
+        np.asarray(months, dtype=str),
+        np.asarray(packages, dtype=str),
+        np.asarray(addon_labels, dtype=str),
+    )
+
+
+def save(cooccurrence: Cooccurrence, path: Path | str = DEFAULT_PATH) -> Path:
+    """Write atomically (temp file + rename) so readers never load a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    matrix = cooccurrence.matrix
+    tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(
+        tmp,
+        format=np.array("csr"),
+        shape=np.array(matrix.shape),
+        data=matrix.data,
+        indices=matrix.indices,
+        indptr=matrix.indptr,
+        months=cooccurrence.months,
+        packages=cooccurrence.packages,
+        addons=cooccurrence.addons,
+    )
+    os.replace(tmp, path)
+    return path
+
+
+def load(path: Path | str = DEFAULT_PATH) -> Cooccurrence:
+    with np.load(path, allow_pickle=False) as stored:
+        matrix = sparse.csr_matrix(
+            (stored["data"], stored["indices"], stored["indptr"]), shape=tuple(stored["shape"])
+        )
+        return Cooccurrence(matrix, stored["months"], stored["packages"], stored["addons"])
+
+
+_cached: Dict[str, Tuple[tuple, Cooccurrence]] = {}
+_cache_lock = threading.Lock()
+
+
+def load_cached(path: Path | str = DEFAULT_PATH) -> Cooccurrence:
+    """:func:`load`, reused until the file's mtime or size changes."""
+    path = str(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    entry = _cached.get(path)
+    if entry is None or entry[0] != signature:
+        with _cache_lock:
+            entry = _cached.get(path)
+            if entry is None or entry[0] != signature:
+                entry = _cached[path] = (signature, load(path))
+    return entry[1]
+
+
+def long_csv_path(path: Path | str) -> Path:
+    """Where ``--csv`` writes the long form: beside the ``.npz``, not over the old ``<stem>.csv`` artifact."""
+    path = Path(path)
+    return path.with_name(path.stem + LONG_CSV_SUFFIX)
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Build the sparse package x add-on co-occurrence.")
+    parser.add_argument("--bookings", default=str(DEFAULT_BOOKINGS))
+    parser.add_argument("--addons", default=str(DEFAULT_ADDONS), help="Long-form booking/add-on rows.")
+    parser.add_argument("--booking-column", default="booking_id")
+    parser.add_argument("--package-column", default="package")
+    parser.add_argument("--addon-column", default="addon")
+    parser.add_argument("--month-column", default="month")
+    parser.add_argument("--date-column", default="booking_date")
+    parser.add_argument("--out", default=str(DEFAULT_PATH))
+    parser.add_argument(
+        "--csv", action="store_true", help=f"Also write the long-form CSV next to the .npz (<stem>{LONG_CSV_SUFFIX})."
+    )
+    return parser
+
+
+def run_from_options(options: dict) -> Path:
+    started = time.perf_counter()
+    names = {
+        name: options.get(f"{name}_column") or default
+        for name, default in (
+            ("booking", "booking_id"),
+            ("package", "package"),
+            ("addon", "addon"),
+            ("month", "month"),
+            ("date", "booking_date"),
+        )
+    }
+    bookings = read_present(
+        options.get("bookings") or DEFAULT_BOOKINGS, [names["booking"], names["package"], names["month"], names["date"]]
+    )
+    addons = read_table(options.get("addons") or DEFAULT_ADDONS, [names["booking"], names["addon"]])
+    cooccurrence = build_cooccurrence(
+        bookings,
+        addons,
+        booking_column=names["booking"],
+        package_column=names["package"],
+        addon_column=names["addon"],
+        month_column=names["month"],
+        date_column=names["date"],
+    )
+    path = save(cooccurrence, options.get("out") or DEFAULT_PATH)
+    if options.get("csv"):
+        cooccurrence.to_frame().to_csv(long_csv_path(path), index=False)
+    logger.info(
+        "co-occurrence: %d months x %d packages x %d add-ons, %d non-zero, in %.2fs -> %s",
+        len(cooccurrence.months),
+        cooccurrence.n_packages,
+        len(cooccurrence.addons),
+        cooccurrence.matrix.nnz,
+        time.perf_counter() - started,
+        path,
+    )
+    return path
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Matrix-factorisation factors as contiguous float32 NumPy arrays.
+
+Surprise's ``predict()`` costs a Python call, two id lookups and a small dot
+product per (customer, item) pair.  :class:`Factors` pulls ``pu``, ``qi``,
+``bu``, ``bi`` and the global mean out of a trained SVD / SVD++ / NMF model
+once; scoring all items for a batch of customers is then one matrix
+multiply::
+
+    r_ui = mu + bu[u] + bi[i] + pu[u] . qi[i]      clipped to the rating scale
+
+which reproduces ``algo.predict(uid, iid).est`` to float32 precision,
+including the cold-customer case (``mu + bi`` for biased models, the global
+mean otherwise).  For SVD++ the implicit-feedback term is folded into the
+customer vectors at extraction time.  The items each customer rated in
+training are kept as a CSR pair (``seen_indptr``/``seen_indices``) so
+recommendations can exclude them without the Surprise trainset.
+
+Raw ids are resolved by binary search over a sorted copy of ``user_ids``
+rather than a dict, so memory-mapped factors (see
+:mod:`recommender.model_artifact`) need no per-process index.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+SUPPORTED = ("SVD", "SVDpp", "NMF", "NumbaSVD")
+
+
+@dataclass
+class Factors:
+    user_factors: np.ndarray  # float32 [users, k], C-contiguous
+    item_factors: np.ndarray  # float32 [items, k], C-contiguous
+    user_bias: np.ndarray  # float32 [users]
+    item_bias: np.ndarray  # float32 [items]
+    global_mean: float
+    biased: bool
+    rating_scale: Optional[Tuple[float, float]]  # None for implicit models: scores are not clipped
+    user_ids: np.ndarray  # raw ids (str) by inner id
+    item_ids: np.ndarray
+    seen_indptr: np.ndarray  # int64 [users + 1]
+    seen_indices: np.ndarray  # int32, inner item ids rated in training
+    sorted_user_ids: Optional[np.ndarray] = None  # user_ids sorted, for binary search
+    sorted_user_inner: Optional[np.ndarray] = None  # inner id of each sorted_user_ids entry
+
+    def __post_init__(self) -> None:
+        self._cold: Optional[np.ndarray] = None
+        if self.sorted_user_ids is None or self.sorted_user_inner is None:
+            order = np.argsort(self.user_ids, kind="stable")
+            self.sorted_user_ids = self.user_ids[order]
+            self.sorted_user_inner = order.astype(np.int64)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    def inner_uids(self, raw_uids: Sequence) -> np.ndarray:
+        """Inner ids of raw customer ids, ``-1`` for customers the model never saw."""
+        wanted = np.asarray([str(uid) for uid in raw_uids])
+        if not len(wanted) or not self.n_users:
+            return np.full(len(wanted), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.sorted_user_ids, wanted), self.n_users - 1)
+        return np.where(self.sorted_user_ids[pos] == wanted, self.sorted_user_inner[pos], -1).astype(np.int64)
+
+    def inner_uid(self, raw_uid) -> Optional[int]:
+        inner = int(self.inner_uids([raw_uid])[0])
+        return inner if inner >= 0 else None
+
+    def seen_items(self, inner_uid: int) -> np.ndarray:
+        return self.seen_indices[self.seen_indptr[inner_uid] : self.seen_indptr[inner_uid + 1]]
+
+    def seen_mask(self, inner_uids: np.ndarray) -> np.ndarray:
+        """Boolean ``[len(inner_uids), n_items]`` mask of items each customer already rated."""
+        mask = np.zeros((len(inner_uids), self.n_items), dtype=bool)
+        for row, u in enumerate(inner_uids):
+            mask[row, self.seen_items(int(u))] = True
+        return mask
+
+    def score_inner(self, inner_uids: Sequence[int] | np.ndarray) -> np.ndarray:
+        """``[len(inner_uids), n_items]`` scores for known customers."""
+        inner_uids = np.asarray(inner_uids, dtype=np.int64)
+        scores = self.user_factors[inner_uids] @ self.item_factors.T
+        if self.biased:
+            scores += self.item_bias
+            scores += (self.user_bias[inner_uids] + np.float32(self.global_mean))[:, None]
+        if self.rating_scale is None:
+            return scores
+        return np.clip(scores, *self.rating_scale, out=scores)
+
+    def cold_scores(self) -> np.ndarray:
+        """What ``predict`` returns for a customer the model never saw.
+
+        Implicit models (no rating scale) score cold customers with the mean
+        customer vector, which ranks items roughly by popularity.
+        """
+        if self.rating_scale is None:
+            mean_user = np.asarray(self.user_factors, dtype=np.float32).mean(axis=0)
+            return (self.item_factors @ mean_user).astype(np.float32)
+        if self.biased:
+            scores = self.item_bias + np.float32(self.global_mean)
+        else:
+            scores = np.full(self.n_items, self.global_mean, dtype=np.float32)
+        return np.clip(scores, *self.rating_scale).astype(np.float32)
+
+    def score(self, raw_uids: Sequence) -> np.ndarray:
+        """Scores of every item for each raw customer id (unknown ids get :meth:`cold_scores`)."""
+        inner = self.inner_uids(raw_uids)
+        out = np.empty((len(inner), self.n_items), dtype=np.float32)
+        known = inner >= 0
+        if known.any():
+            out[known] = self.score_inner(inner[known])
+        if not known.all():
+            if self._cold is None:
+                self._cold = self.cold_scores()
+            out[~known] = self._cold
+        return out
+
+    def iter_scores(self, batch_size: int = 1024) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield ``(inner_uids, scores)`` for all customers, ``batch_size`` at a time."""
+        for start in range(0, self.n_users, batch_size):
+            inner = np.arange(start, min(start + batch_size, self.n_users))
+            yield inner, self.score_inner(inner)
+
+
+def supports(algo) -> bool:
+    return type(algo).__name__ in SUPPORTED and hasattr(algo, "pu")
+
+
+def _f32(array) -> np.ndarray:
+    return np.ascontiguousarray(array, dtype=np.float32)
+
+
+def extract_factors(algo) -> Factors:
+    """Copy the factors of a trained SVD / SVD++ / NMF model into float32 arrays."""
+    if not supports(algo):
+        raise TypeError(f"cannot extract factors from {type(algo).__name__}; supported: {', '.join(SUPPORTED)}")
+    trainset = algo.trainset
+    pu = np.asarray(algo.pu, dtype=np.float64)
+    if type(algo).__name__ == "SVDpp":
+        # est = ... + qi . (pu + |I(u)|^-1/2 * sum_j yj): fold the implicit term in.
+        yj = np.asarray(algo.yj, dtype=np.float64)
+        pu = pu.copy()
+        for u in trainset.all_users():
+            rated = [j for j, _ in trainset.ur[u]]
+            if rated:
+                pu[u] += yj[rated].sum(axis=0) / np.sqrt(len(rated))
+    rated = [[i for i, _ in trainset.ur[u]] for u in trainset.all_users()]
+    indptr = np.zeros(trainset.n_users + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in rated], out=indptr[1:])
+    biased = bool(getattr(algo, "biased", True))
+    if biased:
+        bu, bi = algo.bu, algo.bi
+    else:
+        bu, bi = np.zeros(trainset.n_users), np.zeros(trainset.n_items)
+    return Factors(
+        user_factors=_f32(pu),
+        item_factors=_f32(algo.qi),
+        user_bias=_f32(bu),
+        item_bias=_f32(bi),
+        # NumbaSVD trained with sampled negatives keeps its own mean (positives plus negatives).
+        global_mean=float(getattr(algo, "global_mean", trainset.global_mean)),
+        biased=biased,
+        rating_scale=tuple(float(x) for x in trainset.rating_scale),
+        user_ids=np.array([str(trainset.to_raw_uid(u)) for u in trainset.all_users()]),
+        item_ids=np.array([str(trainset.to_raw_iid(i)) for i in trainset.all_items()]),
+        seen_indptr=indptr,
+        seen_indices=np.fromiter((i for r in rated for i in r), dtype=np.int32, count=int(indptr[-1])),
+    )
+
+
+def top_n_batch(scores: np.ndarray, n: int, seen: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top ``n`` of a score matrix, best first.
+
+    ``seen`` is an optional boolean mask of the same shape; masked items are
+    never returned.  Rows with fewer than ``n`` candidates are padded with
+    index ``-1``.
+    """
+    scores = np.array(scores, dtype=np.float32, copy=seen is not None)
+    if seen is not None:
+        scores[seen] = -np.inf
+    n = min(n, scores.shape[1])
+    rows = np.arange(scores.shape[0])[:, None]
+    best = np.argpartition(-scores, n - 1, axis=1)[:, :n] if n else np.empty((len(scores), 0), dtype=np.int64)
+    order = np.argsort(-scores[rows, best], axis=1, kind="stable")
+    best = best[rows, order]
+    values = scores[rows, best]
+    best = np.where(np.isfinite(values), best, -1).astype(np.int32)
+    return best, np.where(best >= 0, values, 0).astype(np.float32)
+
@@ -0,0 +1,222 @@
+"""Versioned, memory-mappable export of the recommender model.
+
+Unpickling ``surprise_model.pkl`` rebuilds the whole trainset in every worker
+process.  The artifact directory holds only what scoring needs, one ``.npy``
+file per array, so workers open it with ``np.load(mmap_mode="r")`` and share
+the pages through the OS page cache::
+
+    models/mf/
+        CURRENT                        # name of the live version
+        20261018T101500-3f9a2c1b/
+            meta.json                  # global mean, rating scale, source model digest, ...
+            user_factors.npy  item_factors.npy  user_bias.npy  item_bias.npy
+            user_ids.npy  item_ids.npy  sorted_user_ids.npy  sorted_user_inner.npy
+            seen_indptr.npy  seen_indices.npy
+
+A version directory is written under a temporary name and renamed into
+place, then ``CURRENT`` is swapped atomically, so readers never see a
+half-written artifact.
+
+Usage::
+
+    python -m recommender.model_artifact export --model recommender/models/surprise_model.pkl
+    python -m recommender.model_artifact show
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from recommender.factors import Factors, extract_factors
+from recommender.model_io import DEFAULT_MODEL, MODELS_DIR, file_digest, load_algo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_ROOT = MODELS_DIR / "mf"
+CURRENT_NAME = "CURRENT"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+SCALARS = ("global_mean", "biased", "rating_scale")
+ARRAYS = tuple(f.name for f in fields(Factors) if f.name not in SCALARS)
+
+
+@dataclass
+class Artifact:
+    version: str
+    path: Path
+    meta: dict
+    factors: Factors
+
+    @property
+    def model_digest(self) -> str:
+        return self.meta.get("model_digest", "")
+
+
+def new_version(model_digest: str = "") -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return f"{stamp}-{(model_digest or os.urandom(4).hex())[:8]}"
+
+
+def current_version(root: Path | str = DEFAULT_ARTIFACT_ROOT) -> Optional[str]:
+    pointer = Path(root) / CURRENT_NAME
+    try:
+        version = pointer.read_text().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def set_current(root: Path | str, version: str) -> None:
+    root = Path(root)
+    if not (root / version / META_NAME).exists():
+        raise FileNotFoundError(f"no artifact version {version!r} under {root}")
+    tmp = root / f".{CURRENT_NAME}.{os.getpid()}.tmp"
+    tmp.write_text(version + "\n")
+    os.replace(tmp, root / CURRENT_NAME)
+
+
+def list_versions(root: Path | str = DEFAULT_ARTIFACT_ROOT) -> List[str]:
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and (p / META_NAME).exists())
+
+
+def export_factors(
+    factors: Factors,
+    root: Path | str = DEFAULT_ARTIFACT_ROOT,
+    meta: Optional[dict] = None,
+    version: Optional[str] = None,
+    activate: bool = True,
+) -> Path:
+    """Write ``factors`` as a new version under ``root`` and (by default) make it current."""
+    root = Path(root)
+    meta = dict(meta or {})
+    version = version or new_version(meta.get("model_digest", ""))
+    target = root / version
+    if target.exists():
+        raise FileExistsError(f"artifact version {version!r} already exists")
+    staging = root / f".{version}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    for name in ARRAYS:
+        np.save(staging / f"{name}.npy", np.ascontiguousarray(getattr(factors, name)), allow_pickle=False)
+    meta.update(
+        format=FORMAT_VERSION,
+        version=version,
+        created_at=datetime.now(timezone.utc).isoformat(),
+        global_mean=factors.global_mean,
+        biased=factors.biased,
+        rating_scale=list(factors.rating_scale) if factors.rating_scale else None,
+        n_users=factors.n_users,
+        n_items=factors.n_items,
+        n_factors=int(factors.item_factors.shape[1]),
+    )
+    (staging / META_NAME).write_text(json.dumps(meta, indent=2, sort_keys=True))
+    os.replace(staging, target)
+    if activate:
+        set_current(root, version)
+    logger.info("exported model artifact %s (%d users, %d items)", target, factors.n_users, factors.n_items)
+    return target
+
+
+def export_model(
+    algo,
+    root: Path | str = DEFAULT_ARTIFACT_ROOT,
+    model_digest: str = "",
+    activate: bool = True,
+) -> Path:
+    """Export a trained Surprise factor model; call right after training."""
+    meta = {"algorithm": type(algo).__name__, "model_digest": model_digest}
+    return export_factors(extract_factors(algo), root, meta, activate=activate)
+
+
+def load_artifact(
+    root: Path | str = DEFAULT_ARTIFACT_ROOT,
+    version: Optional[str] = None,
+    mmap: bool = True,
+) -> Artifact:
+    """Open a version (default: ``CURRENT``); arrays are read-only memory maps when ``mmap``."""
+    root = Path(root)
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"no {CURRENT_NAME} artifact under {root}")
+    path = root / version
+    meta = json.loads((path / META_NAME).read_text())
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path} has artifact format {meta.get('format')}, expected {FORMAT_VERSION}")
+    mode = "r" if mmap else None
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mode, allow_pickle=False) for name in ARRAYS}
+    factors = Factors(
+        global_mean=float(meta["global_mean"]),
+        biased=bool(meta["biased"]),
+        rating_scale=tuple(meta["rating_scale"]) if meta["rating_scale"] else None,
+        **arrays,
+    )
+    return Artifact(version, path, meta, factors)
+
+
+def prune(root: Path | str = DEFAULT_ARTIFACT_ROOT, keep: int = 3) -> List[str]:
+    """Delete all but the newest ``keep`` versions, never the current one."""
+    current = current_version(root)
+    versions = list_versions(root)
+    doomed = [v for v in versions[: max(len(versions) - keep, 0)] if v != current]
+    for version in doomed:
+        shutil.rmtree(Path(root) / version)
+    return doomed
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Export or inspect memory-mapped model artifacts.")
+    parser.add_argument("action", choices=("export", "show"))
+    parser.add_argument("--model", default=str(DEFAULT_MODEL), help="Trained Surprise model to export.")
+    parser.add_argument("--root", default=str(DEFAULT_ARTIFACT_ROOT))
+    parser.add_argument("--keep", type=int, default=3, help="Versions kept after an export.")
+    parser.add_argument("--no-activate", action="store_true", help="Export without moving CURRENT.")
+    return parser
+
+
+def run_from_options(options: dict) -> Optional[Path]:
+    root = Path(options.get("root") or DEFAULT_ARTIFACT_ROOT)
+    if options["action"] == "export":
+        model = Path(options.get("model") or DEFAULT_MODEL)
+        started = time.perf_counter()
+        path = export_model(load_algo(model), root, file_digest(model), activate=not options.get("no_activate"))
+        removed = prune(root, options.get("keep") or 3)
+        logger.info("export took %.2fs; pruned %s", time.perf_counter() - started, removed or "nothing")
+        return path
+    current = current_version(root)
+    for version in list_versions(root):
+        meta = json.loads((root / version / META_NAME).read_text())
+        marker = "*" if version == current else " "
+        logger.info(
+            "%s %s  %s  %d users x %d items, k=%d",
+            marker,
+            version,
+            meta.get("algorithm", "?"),
+            meta["n_users"],
+            meta["n_items"],
+            meta["n_factors"],
+        )
+    return root / current if current else None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
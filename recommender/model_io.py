@@ -0,0 +1,40 @@
+"""Loading the trained Surprise model and identifying which model a file holds."""
+
+from __future__ import annotations
+
+import hashlib
+import pickle
+from pathlib import Path
+
+RECOMMENDER_DIR = Path(__file__).resolve().parent
+MODELS_DIR = RECOMMENDER_DIR / "models"
+ARTIFACTS_DIR = RECOMMENDER_DIR / "artifacts"
+DATA_DIR = RECOMMENDER_DIR / "data"
+RESULTS_DIR = RECOMMENDER_DIR / "results"
+DEFAULT_MODEL = MODELS_DIR / "surprise_model.pkl"
+
+
+def load_algo(path: Path | str = DEFAULT_MODEL):
+    """Return the algorithm stored at ``path``.
+
+    Accepts both ``surprise.dump.dump`` files (a dict with ``algo`` and
+    ``predictions``) and a plainly pickled algorithm.
+    """
+    with open(path, "rb") as fh:
+        obj = pickle.load(fh)
+    if isinstance(obj, dict) and "algo" in obj:
+        obj = obj["algo"]
+    elif isinstance(obj, tuple) and len(obj) == 2 and obj[1] is not None:
+        obj = obj[1]
+    if not hasattr(obj, "trainset"):
+        raise TypeError(f"{path} does not hold a trained Surprise algorithm (got {type(obj).__name__})")
+    return obj
+
+
+def file_digest(path: Path | str) -> str:
+    """sha256 of a model file, used to tie derived artifacts to their model."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,344 @@
+"""Month-partitioned, incremental popularity aggregates.
+
+``month_package_popularity.csv``, ``month_addon_popularity.csv`` and
+``user_monthly_summary.csv`` are all sums over one calendar month, so each
+month can be computed on its own and the published CSV is just the
+concatenation of the months::
+
+    recommender/artifacts/monthly/
+        manifest.json                       # month -> fingerprint of its bookings and add-ons
+        month_package_popularity/2024-05.csv
+        month_addon_popularity/2024-05.csv
+        user_monthly_summary/2024-05.csv
+        month_package_popularity.csv        # published: all months concatenated
+        month_addon_popularity.csv
+        user_monthly_summary.csv
+
+The combined CSVs are published next to the partitions, not over the files
+of the same name in ``recommender/artifacts/`` that the popularity builder
+writes and the service reads: their columns have not been checked against
+that builder yet.  ``--publish-dir recommender/artifacts`` replaces those
+files once they have.
+
+Every run fingerprints each month of ``merged_bookings.csv`` (plus its
+add-on rows) with an order-independent hash of the rows.  Only months whose
+fingerprint changed -- usually just the current one -- are aggregated again;
+the partitions of the other months are reused as they are.  Months before
+``--freeze-before`` are never rewritten: a change there is reported and left
+for an explicit ``--full`` rebuild.
+
+Usage::
+
+    python -m recommender.monthly_aggregates
+    python -m recommender.monthly_aggregates --freeze-before 2024-01 --full
+    python -m recommender.monthly_aggregates --publish-dir recommender/artifacts   # opt in to replacing them
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from recommender.cooccurrence import DEFAULT_ADDONS, DEFAULT_BOOKINGS, month_labels, same_id_dtype
+from recommender.model_io import ARTIFACTS_DIR
+from recommender.storage import columnar_path, read_present, read_table
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+PARTITIONS_DIR = "monthly"
+FORMAT_VERSION = 1
+
+
+@dataclass
+class Columns:
+    booking: str = "booking_id"
+    customer: str = "customer_id"
+    package: str = "package"
+    addon: str = "addon"
+    month: str = "month"
+    date: str = "booking_date"
+
+
+def package_popularity(bookings: pd.DataFrame, addons: pd.DataFrame) -> pd.DataFrame:
+    grouped = bookings.groupby(["month", "package"], sort=True, observed=True)
+    return grouped.agg(bookings=("booking", "nunique"), customers=("customer", "nunique")).reset_index()
+
+
+def addon_popularity(bookings: pd.DataFrame, addons: pd.DataFrame) -> pd.DataFrame:
+    grouped = addons.groupby(["month", "addon"], sort=True, observed=True)
+    return grouped.agg(bookings=("booking", "nunique")).reset_index()
+
+
+def user_summary(bookings: pd.DataFrame, addons: pd.DataFrame) -> pd.DataFrame:
+    summary = bookings.groupby(["month", "customer"], sort=True, observed=True).agg(
+        bookings=("booking", "nunique"), packages=("package", "nunique")
+    )
+    addon_counts = addons.groupby(["month", "customer"], sort=True, observed=True).size().rename("addons")
+    summary = summary.join(addon_counts, how="left").fillna({"addons": 0})
+    return summary.astype({"addons": "int64"}).reset_index().rename(columns={"customer": "customer_id"})
+
+
+# Published name -> aggregate of one month's (bookings, add-ons).
+AGGREGATES: Dict[str, Callable[[pd.DataFrame, pd.DataFrame], pd.DataFrame]] = {
+    "month_package_popularity": package_popularity,
+    "month_addon_popularity": addon_popularity,
+    "user_monthly_summary": user_summary,
+}
+
+
+def normalise(bookings: pd.DataFrame, addons: pd.DataFrame, columns: Columns = Columns()):
+    """Booking and add-on rows with canonical column names and a ``month`` on both.
+
+    Ids keep their dtype (cast to ``str`` only when the two files disagree)
+    and labels become categoricals, which keeps hashing and grouping cheap.
+    """
+    booking_ids, addon_booking_ids = bookings[columns.booking], addons[columns.booking]
+    if not same_id_dtype(booking_ids, addon_booking_ids):
+        booking_ids, addon_booking_ids = booking_ids.astype(str), addon_booking_ids.astype(str)
+    frame = pd.DataFrame(
+        {
+            "booking": booking_ids,
+            "customer": bookings[columns.customer],
+            "package": bookings[columns.package].astype("category"),
+            "month": month_labels(bookings, columns.month, columns.date),
+        }
+    ).dropna(subset=["month"])
+    extras = pd.DataFrame({"booking": addon_booking_ids, "addon": addons[columns.addon]}).dropna(subset=["addon"])
+    owners = frame.drop_duplicates("booking").set_index("booking")[["customer", "month"]]
+    extras = extras.join(owners, on="booking", how="inner").astype({"addon": "category"})
+    return frame, extras
+
+
+def _row_hashes(frame: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+def fingerprints(bookings: pd.DataFrame, addons: pd.DataFrame) -> Dict[str, str]:
+    """Order-independent fingerprint per month: row counts plus the wrapping sum of row hashes."""
+    out: Dict[str, str] = {}
+    parts = []
+    for frame in (bookings, addons):
+        codes, months = pd.factorize(frame["month"], sort=True)
+        sums = np.zeros(len(months), dtype=np.uint64)
+        np.add.at(sums, codes, _row_hashes(frame.drop(columns="month")))
+        counts = np.bincount(codes, minlength=len(months))
+        parts.append({m: (int(c), int(total)) for m, c, total in zip(months, counts, sums)})
+    for month in sorted(set(parts[0]) | set(parts[1])):
+        booking_part = parts[0].get(month, (0, 0))
+        addon_part = parts[1].get(month, (0, 0))
+        out[str(month)] = "{}:{:016x}-{}:{:016x}".format(*booking_part, *addon_part)
+    return out
+
+
+@dataclass
+class RefreshReport:
+    rebuilt: List[str] = field(default_factory=list)
+    reused: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    frozen_changed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+class MonthlyStore:
+    """Partition directory plus manifest; partitions are replaced atomically, one file each."""
+
+    def __init__(self, root: Path | str):
+        self.root = Path(root)
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / MANIFEST_NAME
+
+    def manifest(self) -> dict:
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except FileNotFoundError:
+            return {"format": FORMAT_VERSION, "months": {}}
+        if manifest.get("format") != FORMAT_VERSION:
+            logger.warning("%s has format %s; rebuilding all months", self.manifest_path, manifest.get("format"))
+            return {"format": FORMAT_VERSION, "months": {}}
+        return manifest
+
+    def write_manifest(self, manifest: dict) -> None:
+        tmp = self.manifest_path.with_name(f".{MANIFEST_NAME}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(tmp, self.manifest_path)
+
+    def partition(self, name: str, month: str) -> Path:
+        return self.root / name / f"{month}.csv"
+
+    def write(self, name: str, month: str, frame: pd.DataFrame) -> None:
+        path = self.partition(name, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        frame.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    def remove(self, month: str) -> None:
+        for name in AGGREGATES:
+            self.partition(name, month).unlink(missing_ok=True)
+
+
+def refresh(
+    bookings: pd.DataFrame,
+    addons: pd.DataFrame,
+    out_dir: Path | str = ARTIFACTS_DIR,
+    columns: Columns = Columns(),
+    freeze_before: Optional[str] = None,
+    full: bool = False,
+    publish_dir: Optional[Path | str] = None,
+) -> RefreshReport:
+    """Recompute the months whose bookings changed and republish the combined CSVs.
+
+    Partitions live under ``<out_dir>/monthly``; the combined CSVs go to
+    ``publish_dir``, by default that same directory.
+    """
+    started = time.perf_counter()
+    out_dir = Path(out_dir)
+    store = MonthlyStore(out_dir / PARTITIONS_DIR)
+    publish_dir = Path(publish_dir) if publish_dir is not None else store.root
+    if full:
+        shutil.rmtree(store.root, ignore_errors=True)
+    manifest = store.manifest()
+    known: Dict[str, dict] = manifest["months"]
+    frame, extras = normalise(bookings, addons, columns)
+    current = fingerprints(frame, extras)
+    report = RefreshReport()
+
+    def frozen(month: str) -> bool:
+        return not full and freeze_before is not None and month < freeze_before and month in known
+
+    changed = [m for m in current if known.get(m, {}).get("fingerprint") != current[m]]
+    report.frozen_changed = [m for m in changed if frozen(m)]
+    todo = [m for m in changed if not frozen(m)]
+    if report.frozen_changed:
+        logger.warning("bookings changed in frozen months %s; kept as published", report.frozen_changed)
+
+    by_month = dict(tuple(frame.groupby("month", sort=False))) if todo else {}
+    extras_by_month = dict(tuple(extras.groupby("month", sort=False))) if todo else {}
+    empty_extras = extras.iloc[:0]
+    for month in todo:
+        month_bookings = by_month.get(month, frame.iloc[:0])
+        month_extras = extras_by_month.get(month, empty_extras)
+        for name, aggregate in AGGREGATES.items():
+            store.write(name, month, aggregate(month_bookings, month_extras))
+        known[month] = {
+            "fingerprint": current[month],
+            "bookings": int(len(month_bookings)),
+            "built_at": datetime.now(timezone.utc).isoformat(),
+        }
+    report.rebuilt = todo
+    report.reused = [m for m in current if m not in todo]
+    for month in [m for m in known if m not in current and not frozen(m)]:
+        store.remove(month)
+        del known[month]
+        report.removed.append(month)
+
+    if todo or report.removed or full:
+        store.root.mkdir(parents=True, exist_ok=True)
+        store.write_manifest(manifest)
+        publish(store, sorted(known), publish_dir)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def publish(store: MonthlyStore, months: Sequence[str], out_dir: Optional[Path | str] = None) -> List[Path]:
+    """Concatenate the month partitions into the published ``<name>.csv`` files (atomic replace).
+
+    Partitions of one aggregate share a header, so they are joined as bytes
+    (header once) instead of being parsed and re-written.  ``out_dir``
+    defaults to the partition directory.
+    """
+    out_dir = Path(out_dir) if out_dir is not None else store.root
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name in AGGREGATES:
+        target = Path(out_dir) / f"{name}.csv"
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        header_written = False
+        with open(tmp, "wb") as out:
+            for month in months:
+                path = store.partition(name, month)
+                if not path.exists():
+                    continue
+                with open(path, "rb") as part:
+                    header = part.readline()
+                    if not header_written:
+                        out.write(header)
+                        header_written = True
+                    shutil.copyfileobj(part, out)
+        os.replace(tmp, target)
+        written.append(target)
+    return written
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Refresh the monthly popularity aggregates.")
+    defaults = Columns()
+    parser.add_argument("--bookings", default=str(DEFAULT_BOOKINGS))
+    parser.add_argument("--addons", default=str(DEFAULT_ADDONS))
+    parser.add_argument("--out-dir", default=str(ARTIFACTS_DIR))
+    for name in ("booking", "customer", "package", "addon", "month", "date"):
+        parser.add_argument(f"--{name}-column", default=getattr(defaults, name))
+    parser.add_argument("--freeze-before", default=None, metavar="YYYY-MM", help="Never rewrite earlier months.")
+    parser.add_argument("--full", action="store_true", help="Drop all partitions and rebuild every month.")
+    parser.add_argument(
+        "--publish-dir",
+        default=None,
+        help="Where the combined CSVs go (default: <out-dir>/monthly, leaving the builder's artifacts alone).",
+    )
+    return parser
+
+
+def run_from_options(options: dict) -> RefreshReport:
+    defaults = Columns()
+    columns = Columns(
+        **{name: options.get(f"{name}_column") or getattr(defaults, name) for name in defaults.__dataclass_fields__}
+    )
+    bookings = read_present(
+        options.get("bookings") or DEFAULT_BOOKINGS,
+        [columns.booking, columns.customer, columns.package, columns.month, columns.date],
+    )
+    addon_path = Path(options.get("addons") or DEFAULT_ADDONS)
+    if addon_path.exists() or columnar_path(addon_path) is not None:
+        addons = read_table(addon_path, [columns.booking, columns.addon])
+    else:
+        addons = pd.DataFrame(columns=[columns.booking, columns.addon])
+    report = refresh(
+        bookings,
+        addons,
+        options.get("out_dir") or ARTIFACTS_DIR,
+        columns,
+        freeze_before=options.get("freeze_before"),
+        full=bool(options.get("full")),
+        publish_dir=options.get("publish_dir"),
+    )
+    logger.info(
+        "monthly aggregates: rebuilt %s, reused %d months, removed %s in %.2fs",
+        report.rebuilt or "nothing",
+        len(report.reused),
+        report.removed or "nothing",
+        report.seconds,
+    )
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Negative sampling for the ratings used to train the recommender.
+
+Each customer gets ``ratio`` negatives per positive: items they never
+booked, written with ``negative_rating`` (0 by default).  Instead of looping
+over customers and candidate lists in Python, one compiled pass over the
+customers draws item ids in bulk and rejects positives and repeats against
+a per-item marker filled from the customer's sorted CSR row
+(:class:`PositiveIndex`).  Customers who booked most of the catalogue, where
+rejection would spin, take the rest by a partial shuffle of their free
+items.  The cost is proportional to the number of negatives drawn, not
+users x items.
+
+Items are drawn uniformly or by popularity (``count ** power``; ``power``
+0.75 is the usual word2vec-style damping).  A fixed ``seed`` reproduces the
+same negatives.
+
+Training does not need the materialised ``train_ratings_with_neg.csv``:
+:class:`NegativeSampler` keeps the positive index in memory and draws a fresh
+set of negatives per epoch (seeded by ``(seed, epoch)``), which
+:func:`recommender.sgd.fit_arrays` and ``NumbaSVD(negative_ratio=...)``
+consume directly.  The CLI below writes the CSV for debugging and for
+trainers that still read it.
+
+Usage::
+
+    python -m recommender.negative_sampling --ratio 4 --mode popularity --seed 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import numba
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender.ratings import TRAIN_RATINGS, TRAIN_RATINGS_WITH_NEG, load_ratings
+from recommender.storage import columns_of
+
+logger = logging.getLogger(__name__)
+
+MODES = ("uniform", "popularity")
+
+
+class PositiveIndex:
+    """Positives of a users x items CSR as sorted per-customer rows."""
+
+    def __init__(self, matrix: sparse.csr_matrix):
+        matrix = matrix.tocsr()
+        matrix.sort_indices()
+        self.n_users, self.n_items = matrix.shape
+        self.indptr = matrix.indptr.astype(np.int64)
+        self.indices = matrix.indices.astype(np.int64)
+        self.counts = np.diff(self.indptr)
+
+
+@numba.njit(cache=True)
+def _draw(indptr, indices, wanted, n_items, cdf, seed, out_users, out_items):  # pragma: no cover - compiled
+    np.random.seed(seed)
+    owner = np.full(n_items, -1, dtype=np.int64)
+    free = np.empty(n_items, dtype=np.int64)
+    pos = 0
+    for u in range(wanted.shape[0]):
+        need = wanted[u]
+        if need <= 0:
+            continue
+        for j in range(indptr[u], indptr[u + 1]):
+            owner[indices[j]] = u
+        tries = 0
+        limit = 4 * need + 32
+        while need > 0 and tries < limit:
+            tries += 1
+            if cdf.shape[0] == 0:
+                i = np.random.randint(0, n_items)
+            else:
+                i = min(np.searchsorted(cdf, np.random.random(), side="right"), n_items - 1)
+            if owner[i] != u:
+                owner[i] = u
+                out_users[pos] = u
+                out_items[pos] = i
+                pos += 1
+                need -= 1
+        if need > 0:
+            # Nearly everything is taken: shuffle the free items and take the rest uniformly.
+            n_free = 0
+            for i in range(n_items):
+                if owner[i] != u:
+                    free[n_free] = i
+                    n_free += 1
+            for k in range(min(need, n_free)):
+                j = k + np.random.randint(0, n_free - k)
+                free[k], free[j] = free[j], free[k]
+                out_users[pos] = u
+                out_items[pos] = free[k]
+                pos += 1
+    return pos
+
+
+def item_weights(matrix: sparse.csr_matrix, mode: str = "uniform", power: float = 1.0) -> Optional[np.ndarray]:
+    """Sampling probabilities per item, or ``None`` for uniform."""
+    if mode not in MODES:
+        raise ValueError(f"unknown sampling mode {mode!r}; expected one of {', '.join(MODES)}")
+    if mode == "uniform":
+        return None
+    counts = np.bincount(matrix.indices, minlength=matrix.shape[1]).astype(np.float64) ** power
+    return counts / counts.sum()
+
+
+def negatives_per_user(index: PositiveIndex, ratio: float) -> np.ndarray:
+    """``ratio`` negatives per positive, capped at the number of items the customer has not booked."""
+    return np.minimum(np.ceil(index.counts * ratio).astype(np.int64), index.n_items - index.counts)
+
+
+def sample_negatives(
+    index: PositiveIndex,
+    wanted: np.ndarray,
+    rng: np.random.Generator,
+    weights: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Draw ``wanted[u]`` distinct non-positive items for every user ``u``.
+
+    Returns ``(users, items)`` inner-id arrays grouped by user, exactly
+    ``wanted.sum()`` of them: customers whom rejection cannot fill take the
+    rest by the shuffle fallback.  ``wanted`` must not exceed the user's free
+    items (see :func:`negatives_per_user`).
+    """
+    wanted = np.asarray(wanted, dtype=np.int64)
+    over = np.flatnonzero(wanted > index.n_items - index.counts)
+    if len(over):
+        raise ValueError(f"{len(over)} users want more negatives than they have unbooked items (first: {over[0]})")
+    cdf = np.cumsum(weights) / np.sum(weights) if weights is not None else np.empty(0, dtype=np.float64)
+    total = int(wanted.sum())
+    users = np.empty(total, dtype=np.int32)
+    items = np.empty(total, dtype=np.int32)
+    seed = int(rng.integers(0, 2**32 - 1))
+    drawn = _draw(index.indptr, index.indices, wanted, index.n_items, cdf, seed, users, items)
+    if drawn != total:
+        raise RuntimeError(f"drew {drawn} of {total} negatives")
+    return users, items
+
+
+class NegativeSampler:
+    """Fresh negatives per epoch for a fixed set of positive inner-id pairs.
+
+    ``sample(epoch)`` returns ``(users, items)`` of the negatives for that
+    epoch; ``epoch(epoch)`` the positives followed by those negatives with
+    their ratings, ready for an SGD pass.  The same ``(seed, epoch)`` always
+    gives the same negatives; ``seed=None`` draws from fresh entropy.
+    """
+
+    def __init__(
+        self,
+        users: np.ndarray,
+        items: np.ndarray,
+        ratings: np.ndarray,
+        n_users: int,
+        n_items: int,
+        ratio: float = 4.0,
+        mode: str = "uniform",
+        power: float = 1.0,
+        seed: Optional[int] = 0,
+        negative_rating: float = 0.0,
+    ):
+        self.users = np.asarray(users, dtype=np.int32)
+        self.items = np.asarray(items, dtype=np.int32)
+        self.ratings = np.asarray(ratings, dtype=np.float64)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(self.users), dtype=np.float32), (self.users, self.items)), shape=(n_users, n_items)
+        )
+        matrix.sum_duplicates()
+        self.index = PositiveIndex(matrix)
+        self.weights = item_weights(matrix, mode, power)
+        self.wanted = negatives_per_user(self.index, ratio)
+        self.seed = seed
+        self.negative_rating = negative_rating
+        self.user_ids: Optional[np.ndarray] = None
+        self.item_ids: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_frame(cls, ratings: pd.DataFrame, **options) -> "NegativeSampler":
+        """Sampler over a ``user``/``item``/``rating`` frame; keeps the raw ids for :meth:`frame`."""
+        users, user_ids = pd.factorize(ratings["user"], sort=True)
+        items, item_ids = pd.factorize(ratings["item"], sort=True)
+        sampler = cls(users, items, ratings["rating"].to_numpy(), len(user_ids), len(item_ids), **options)
+        sampler.user_ids = np.asarray(user_ids, dtype=str)
+        sampler.item_ids = np.asarray(item_ids, dtype=str)
+        return sampler
+
+    @property
+    def negatives_per_epoch(self) -> int:
+        return int(self.wanted.sum())
+
+    def rng(self, epoch: int) -> np.random.Generator:
+        return np.random.default_rng(None if self.seed is None else [self.seed, epoch])
+
+    def sample(self, epoch: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        users, items = sample_negatives(self.index, self.wanted, self.rng(epoch), self.weights)
+        return users.astype(np.int32), items.astype(np.int32)
+
+    def epoch(self, epoch: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(users, items, ratings)``: the positives, then this epoch's negatives."""
+        users, items = self.sample(epoch)
+        return (
+            np.concatenate([self.users, users]),
+            np.concatenate([self.items, items]),
+            np.concatenate([self.ratings, np.full(len(users), self.negative_rating)]),
+        )
+
+    def epochs(self, n_epochs: int) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        for epoch in range(n_epochs):
+            yield self.epoch(epoch)
+
+    def frame(self, epoch: int = 0) -> pd.DataFrame:
+        """One epoch as a raw-id frame (what ``train_ratings_with_neg.csv`` holds)."""
+        if self.user_ids is None or self.item_ids is None:
+            raise ValueError("raw ids unknown; build the sampler with NegativeSampler.from_frame")
+        users, items, ratings = self.epoch(epoch)
+        return pd.DataFrame({"user": self.user_ids[users], "item": self.item_ids[items], "rating": ratings})
+
+
+def augment(
+    ratings: pd.DataFrame,
+    ratio: float = 4.0,
+    mode: str = "uniform",
+    power: float = 1.0,
+    seed: Optional[int] = 0,
+    negative_rating: float = 0.0,
+) -> pd.DataFrame:
+    """``ratings`` followed by the sampled negatives, as ``user``, ``item``, ``rating``.
+
+    Every (customer, item) pair present in ``ratings`` counts as a positive,
+    whatever its rating, so no sampled negative duplicates an existing row.
+    """
+    ratings = ratings[["user", "item", "rating"]]
+    sampler = NegativeSampler.from_frame(
+        ratings, ratio=ratio, mode=mode, power=power, seed=seed, negative_rating=negative_rating
+    )
+    users, items = sampler.sample(0)
+    negatives = pd.DataFrame(
+        {
+            "user": sampler.user_ids[users],
+            "item": sampler.item_ids[items],
+            "rating": np.full(len(users), negative_rating),
+        }
+    )
+    return pd.concat([ratings, negatives], ignore_index=True)
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(
+        description="Write a ratings CSV with sampled negatives (debugging; training samples them in memory)."
+    )
+    parser.add_argument("--data", default=str(TRAIN_RATINGS))
+    parser.add_argument("--columns", nargs=3, default=None, metavar=("USER", "ITEM", "RATING"))
+    parser.add_argument("--out", default=str(TRAIN_RATINGS_WITH_NEG))
+    parser.add_argument("--ratio", type=float, default=4.0, help="Negatives per positive rating.")
+    parser.add_argument("--mode", choices=MODES, default="uniform")
+    parser.add_argument("--power", type=float, default=1.0, help="Popularity exponent (popularity mode).")
+    parser.add_argument("--negative-rating", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def run_from_options(options: dict) -> Path:
+    data = options.get("data") or TRAIN_RATINGS
+    ratings = load_ratings(data, options.get("columns"))
+    started = time.perf_counter()
+    augmented = augment(
+        ratings,
+        ratio=options.get("ratio") or 4.0,
+        mode=options.get("mode") or "uniform",
+        power=options.get("power") or 1.0,
+        seed=options.get("seed"),
+        negative_rating=options.get("negative_rating") or 0.0,
+    )
+    logger.info(
+        "%d ratings -> %d rows (%s) in %.2fs",
+        len(ratings),
+        len(augmented),
+        options.get("mode") or "uniform",
+        time.perf_counter() - started,
+    )
+    out = Path(options.get("out") or TRAIN_RATINGS_WITH_NEG)
+    augmented.columns = options.get("columns") or columns_of(data)[:3]
+    augmented.to_csv(out, index=False)
+    return out
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Reading the ratings CSVs under ``recommender/data`` into frames and sparse matrices."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender.model_io import DATA_DIR
+from recommender.storage import columns_of, read_table
+
+BOOKING_RATINGS = DATA_DIR / "surprise_ratings_booking.csv"
+TRAIN_RATINGS = DATA_DIR / "train_ratings.csv"
+TEST_RATINGS = DATA_DIR / "test_ratings.csv"
+TRAIN_RATINGS_WITH_NEG = DATA_DIR / "train_ratings_with_neg.csv"
+
+
+def load_ratings(path: Path | str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """``(user, item, rating)`` frame; defaults to the first three columns.
+
+    Reads the columnar copy of ``path`` when there is a current one (see
+    :mod:`recommender.storage`) and only the three columns either way.
+    """
+    columns = list(columns) if columns else columns_of(path)[:3]
+    frame = read_table(path, columns).dropna()
+    frame.columns = ["user", "item", "rating"]
+    frame["user"] = frame["user"].astype(str)
+    frame["item"] = frame["item"].astype(str)
+    return frame
+
+
+def to_csr(
+    ratings: pd.DataFrame, positive_only: bool = True
+) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """users x items CSR of summed ratings, plus the raw user and item ids of its rows/columns.
+
+    Duplicate (user, item) pairs are summed.  With ``positive_only`` rows
+    with a rating <= 0 (sampled negatives) are dropped, since implicit
+    models treat every missing cell as a weak negative already.
+    """
+    if positive_only:
+        ratings = ratings[ratings["rating"] > 0]
+    users, user_ids = pd.factorize(ratings["user"], sort=True)
+    items, item_ids = pd.factorize(ratings["item"], sort=True)
+    matrix = sparse.csr_matrix(
+        (ratings["rating"].to_numpy(dtype=np.float32), (users, items)),
+        shape=(len(user_ids), len(item_ids)),
+        dtype=np.float32,
+    )
+    matrix.sum_duplicates()
+    matrix.sort_indices()
+    return matrix, np.asarray(user_ids, dtype=str), np.asarray(item_ids, dtype=str)
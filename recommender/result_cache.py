@@ -0,0 +1,169 @@
+"""Bounded cache of recommendation results.
+
+Entries are keyed by ``(model version, customer id, month, n)``.  The model
+version is the key of the live recommender snapshot (see
+:meth:`recommender.serving.RecommenderHolder.snapshot`), which changes when a
+new model artifact, top-N table or popularity artifact is published, so
+stale results are never served and simply age out.
+
+Two backends share one interface (``get_many``/``set_many``/``stats``):
+
+* :class:`LRUTTLCache` -- in-process, size-bounded LRU with a per-entry TTL;
+* :class:`DjangoCache` -- any alias from Django's ``CACHES`` (e.g. Redis or
+  memcached, shared by all workers); size and eviction are the cache
+  server's business, so only hits and misses are counted.
+
+``RECOMMENDER_CACHE`` selects the backend (``"local"``, a Django cache alias,
+or ``None`` to disable); ``RECOMMENDER_CACHE_SIZE`` and
+``RECOMMENDER_CACHE_TTL`` size it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence
+
+DEFAULT_SIZE = 10_000
+DEFAULT_TTL = 300.0
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    size: Optional[int] = None
+    maxsize: Optional[int] = None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class LRUTTLCache:
+    """Thread-safe LRU cache; entries also expire ``ttl`` seconds after they were set."""
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE, ttl: Optional[float] = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats(maxsize=maxsize)
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    self._stats.misses += 1
+                elif entry[1] is not None and entry[1] <= now:
+                    del self._data[key]
+                    self._stats.expirations += 1
+                    self._stats.misses += 1
+                else:
+                    self._data.move_to_end(key)
+                    self._stats.hits += 1
+                    found[key] = entry[0]
+        return found
+
+    def set_many(self, items: Dict[Hashable, Any]) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (value, expires)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**{**asdict(self._stats), "size": len(self._data)})
+
+
+class DjangoCache:
+    """Adapter over a Django cache alias; tuple keys are hashed into safe string keys."""
+
+    def __init__(self, alias: str = "default", ttl: Optional[float] = DEFAULT_TTL, prefix: str = "rec"):
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.prefix}:{hashlib.sha1(repr(key).encode()).hexdigest()}"
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        keys = list(keys)
+        names = {self._key(key): key for key in keys}
+        raw = self.cache.get_many(list(names))
+        with self._lock:
+            self._stats.hits += len(raw)
+            self._stats.misses += len(keys) - len(raw)
+        return {names[name]: value for name, value in raw.items()}
+
+    def set_many(self, items: Dict[Hashable, Any]) -> None:
+        self.cache.set_many({self._key(key): value for key, value in items.items()}, timeout=self.ttl)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**asdict(self._stats))
+
+
+def current_month() -> str:
+    return date.today().strftime("%Y-%m")
+
+
+class RecommendationCache:
+    """Cache-aside wrapper around ``recommend_many`` of a recommender snapshot."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def recommend_many(
+        self, recommender, model_version: str, customer_ids: Sequence, n: int, month: Optional[str] = None
+    ) -> Dict[str, List]:
+        month = month or current_month()
+        wanted = list(dict.fromkeys(str(c) for c in customer_ids))
+        keys = {customer_id: (model_version, customer_id, month, n) for customer_id in wanted}
+        found = self.backend.get_many(keys.values())
+        missing = [customer_id for customer_id in wanted if keys[customer_id] not in found]
+        if missing:
+            fresh = recommender.recommend_many(missing, n)
+            self.backend.set_many({keys[customer_id]: fresh[customer_id] for customer_id in missing})
+            found.update({keys[customer_id]: fresh[customer_id] for customer_id in missing})
+        return {customer_id: found[keys[customer_id]] for customer_id in wanted}
+
+    def stats(self) -> dict:
+        return self.backend.stats().as_dict()
+
+
+def build_cache(backend: Optional[str] = "local", size: int = DEFAULT_SIZE, ttl: Optional[float] = DEFAULT_TTL):
+    """Backend by name: ``"local"``, a Django cache alias, or ``None`` for no caching."""
+    if not backend:
+        return None
+    if backend == "local":
+        return RecommendationCache(LRUTTLCache(size, ttl))
+    return RecommendationCache(DjangoCache(backend, ttl))
@@ -0,0 +1,263 @@
+"""Process-wide recommender used by the API views, hot-reloaded on new models.
+
+The :class:`~recommender.topn.TopNRecommender` is created once per worker on
+first use.  Paths come from Django settings when configured
+(``RECOMMENDER_TOPN_TABLE``, ``RECOMMENDER_MODEL``,
+``RECOMMENDER_ARTIFACT_ROOT``, ``RECOMMENDER_MAX_AGE``) and default to the
+files under ``recommender/``.
+
+:class:`RecommenderHolder` polls the artifact ``CURRENT`` pointer (and the
+top-N table, pickle and popularity artifacts) every
+``RECOMMENDER_RELOAD_INTERVAL`` seconds.  When they change, a new
+recommender is built and warmed on a background thread while requests keep
+using the old one; the holder's reference is then replaced in one
+assignment (read-copy-update).  Each request reads the reference once, so
+in-flight requests finish on the model they started with and the old model
+is freed when the last one returns.
+
+:func:`top_addons` answers "add-ons usually booked with this package" from
+the sparse co-occurrence artifact (:mod:`recommender.cooccurrence`) with a
+single CSR row slice.
+
+:func:`recommend_many` goes through the result cache of
+:mod:`recommender.result_cache`, keyed by the snapshot's version, so a
+reload invalidates cached results without any explicit flush;
+:func:`recommend_batch` also returns the version of that same snapshot.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from recommender.cooccurrence import DEFAULT_PATH as DEFAULT_COOCCURRENCE
+from recommender.cooccurrence import load_cached as load_cooccurrence
+from recommender.model_artifact import DEFAULT_ARTIFACT_ROOT, current_version
+from recommender.model_io import ARTIFACTS_DIR, DEFAULT_MODEL
+from recommender.result_cache import DEFAULT_SIZE, DEFAULT_TTL, RecommendationCache, build_cache
+from recommender.topn import DEFAULT_TABLE, TopNRecommender
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELOAD_INTERVAL = 10.0
+POPULARITY_ARTIFACTS = ("month_*.csv", "*.npz")
+
+_lock = threading.Lock()
+_holder: Optional["RecommenderHolder"] = None
+_cache: Optional[RecommendationCache] = None
+_cache_built = False
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        if settings.configured:
+            return getattr(settings, name, default)
+    except ImportError:
+        pass
+    return default
+
+
+def build_recommender() -> TopNRecommender:
+    return TopNRecommender(
+        table_path=_setting("RECOMMENDER_TOPN_TABLE", DEFAULT_TABLE),
+        model_path=_setting("RECOMMENDER_MODEL", DEFAULT_MODEL),
+        max_age=_setting("RECOMMENDER_MAX_AGE", None),
+        artifact_root=_setting("RECOMMENDER_ARTIFACT_ROOT", DEFAULT_ARTIFACT_ROOT),
+    )
+
+
+def _stat(path: Path | str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def popularity_signature(directory: Path | str = ARTIFACTS_DIR) -> tuple:
+    """mtime/size of the published popularity and co-occurrence artifacts."""
+    directory = Path(directory)
+    paths = sorted({p for pattern in POPULARITY_ARTIFACTS for p in directory.glob(pattern)})
+    return tuple((p.name, _stat(p)) for p in paths)
+
+
+def model_signature() -> tuple:
+    """What the served recommender was built from; a change triggers a reload."""
+    root = _setting("RECOMMENDER_ARTIFACT_ROOT", DEFAULT_ARTIFACT_ROOT)
+    version = current_version(root) if root is not None else None
+    return (
+        version,
+        _stat(_setting("RECOMMENDER_TOPN_TABLE", DEFAULT_TABLE)),
+        None if version else _stat(_setting("RECOMMENDER_MODEL", DEFAULT_MODEL)),
+        popularity_signature(_setting("RECOMMENDER_ARTIFACTS_DIR", ARTIFACTS_DIR)),
+    )
+
+
+def warm(recommender: TopNRecommender) -> None:
+    """Fault in the factor pages and score once, so the first request after a swap is fast."""
+    factors = recommender.factors if recommender.artifact is not None else None
+    if factors is not None:
+        for array in (factors.item_factors, factors.item_bias, factors.user_factors, factors.user_bias):
+            float(np.asarray(array).sum())
+        if factors.n_users:
+            factors.score([factors.user_ids[0]])
+    if recommender.table is not None and len(recommender.table.user_ids):
+        recommender.table.lookup(recommender.table.user_ids[0])
+
+
+class RecommenderHolder:
+    """Hold the live recommender and swap in a warmed replacement when the model changes."""
+
+    def __init__(
+        self,
+        factory: Callable[[], TopNRecommender] = build_recommender,
+        signature: Callable[[], tuple] = model_signature,
+        interval: float = DEFAULT_RELOAD_INTERVAL,
+    ):
+        self.factory = factory
+        self.signature = signature
+        self.interval = interval
+        # (recommender, signature) swapped as one reference so readers never mix them.
+        self._state = (factory(), signature())
+        self._loading = threading.Lock()
+        self._failed: Optional[tuple] = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.version = self.current.artifact.version if self.current.artifact else None
+        self.reloads = 0
+
+    @property
+    def current(self) -> TopNRecommender:
+        return self._state[0]
+
+    def snapshot(self) -> Tuple[TopNRecommender, str]:
+        """The live recommender and a short key naming exactly what it was built from."""
+        recommender, signature = self._state
+        return recommender, hashlib.sha1(repr(signature).encode()).hexdigest()[:16]
+
+    def check(self, wait: bool = False) -> bool:
+        """Start a background reload if the model changed; ``True`` when one was started."""
+        signature = self.signature()
+        if signature == self._state[1] or signature == self._failed:
+            return False
+        if not self._loading.acquire(blocking=False):
+            return False
+        loader = threading.Thread(target=self._reload, args=(signature,), name="recommender-reload", daemon=True)
+        loader.start()
+        if wait:
+            loader.join()
+        return True
+
+    def _reload(self, signature: tuple) -> None:
+        started = time.perf_counter()
+        previous = self.version
+        try:
+            replacement = self.factory()
+            warm(replacement)
+            self._state = (replacement, signature)
+            self.version = replacement.artifact.version if replacement.artifact else None
+            self.reloads += 1
+        except Exception:
+            self._failed = signature
+            logger.exception("recommender reload failed; still serving %s", previous or "the previous model")
+            return
+        finally:
+            self._loading.release()
+        logger.info(
+            "recommender reloaded %s -> %s in %.2fs", previous, self.version, time.perf_counter() - started
+        )
+
+    def start(self) -> None:
+        """Poll for new models every ``interval`` seconds on a daemon thread."""
+        if self.interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="recommender-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("recommender model check failed")
+
+
+def get_holder() -> RecommenderHolder:
+    global _holder
+    if _holder is None:
+        with _lock:
+            if _holder is None:
+                holder = RecommenderHolder(interval=_setting("RECOMMENDER_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL))
+                holder.start()
+                _holder = holder
+    return _holder
+
+
+def get_recommender() -> TopNRecommender:
+    """The recommender to use for one request; read it once and keep the reference."""
+    return get_holder().current
+
+
+def get_cache() -> Optional[RecommendationCache]:
+    global _cache, _cache_built
+    if not _cache_built:
+        with _lock:
+            if not _cache_built:
+                _cache = build_cache(
+                    _setting("RECOMMENDER_CACHE", "local"),
+                    size=_setting("RECOMMENDER_CACHE_SIZE", DEFAULT_SIZE),
+                    ttl=_setting("RECOMMENDER_CACHE_TTL", DEFAULT_TTL),
+                )
+                _cache_built = True
+    return _cache
+
+
+def model_version(recommender: TopNRecommender) -> Optional[str]:
+    return recommender.artifact.version if recommender.artifact else None
+
+
+def recommend_batch(
+    customer_ids: Sequence, n: int, month: Optional[str] = None
+) -> Tuple[Optional[str], Dict[str, List]]:
+    """``(model version, recommendations)``, both from the one snapshot that did the scoring."""
+    recommender, key = get_holder().snapshot()
+    cache = get_cache()
+    if cache is None:
+        return model_version(recommender), recommender.recommend_many(customer_ids, n)
+    return model_version(recommender), cache.recommend_many(recommender, key, customer_ids, n, month)
+
+
+def recommend_many(customer_ids: Sequence, n: int, month: Optional[str] = None) -> Dict[str, List]:
+    """Recommendations for ``customer_ids`` from the live model, through the result cache."""
+    return recommend_batch(customer_ids, n, month)[1]
+
+
+def top_addons(package, k: int = 5, month: Optional[str] = None) -> List[Tuple[str, int]]:
+    """Add-ons most often booked with ``package``, from the sparse co-occurrence artifact.
+
+    The artifact path is ``RECOMMENDER_COOCCURRENCE``; it is reloaded when the
+    file changes.  Returns ``[]`` when no artifact has been built yet.
+    """
+    path = _setting("RECOMMENDER_COOCCURRENCE", DEFAULT_COOCCURRENCE)
+    try:
+        index = load_cooccurrence(path)
+    except FileNotFoundError:
+        return []
+    return index.top_addons(package, k, month)
+
+
+def cache_stats() -> Optional[dict]:
+    cache = get_cache()
+    return cache.stats() if cache is not None else None
@@ -0,0 +1,306 @@
+"""Columnar storage for ``recommender/data`` and ``recommender/artifacts``.
+
+Every stage used to re-parse the CSVs in full.  A table converted with
+:func:`convert` is stored next to its CSV as Parquet (or Feather) when
+pyarrow is installed and as a pandas pickle otherwise, with a schema sidecar::
+
+    recommender/data/merged_bookings.csv            # source / export format
+    recommender/data/merged_bookings.parquet        # typed, compressed, columnar
+    recommender/data/merged_bookings.schema.json    # columns, dtypes, rows, source stat
+
+:func:`read_table` takes the CSV path a stage already knows and returns the
+columnar copy when it is current (the sidecar records the CSV's size and
+mtime), reading only the requested ``columns``; otherwise it falls back to
+the CSV, still projected with ``usecols`` (and typed from the sidecar while
+it still describes that CSV).  CSV
+stays the interchange format: :func:`export_csv` writes any table back out.
+
+Dtypes are inferred once at conversion: integers are downcast, repeated
+strings become categoricals, so loads skip parsing and inference entirely.
+
+Only Parquet and Feather project on read.  The pickle fallback (no pyarrow)
+unpickles the whole frame and then selects ``columns``: it still skips CSV
+parsing and inference, but a projected load costs as much as a full one.
+
+Usage::
+
+    python -m recommender.storage convert --all
+    python -m recommender.storage convert recommender/data/merged_bookings.csv --format feather
+    python -m recommender.storage export recommender/data/merged_bookings.parquet --out /tmp/bookings.csv
+    python -m recommender.storage show
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from recommender.model_io import ARTIFACTS_DIR, DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAS_PYARROW = False
+
+PARQUET = ".parquet"
+FEATHER = ".feather"
+PICKLE = ".pkl"
+CSV = ".csv"
+SCHEMA_SUFFIX = ".schema.json"
+FORMATS = {"parquet": PARQUET, "feather": FEATHER, "pickle": PICKLE}
+READ_ORDER = (PARQUET, FEATHER, PICKLE)
+PROJECTING = (PARQUET, FEATHER)  # suffixes whose readers load only the requested columns
+CATEGORY_RATIO = 0.5  # strings with fewer distinct values than this share of rows become categoricals
+DEFAULT_DIRS = (DATA_DIR, ARTIFACTS_DIR)
+
+
+def default_format() -> str:
+    return "parquet" if HAS_PYARROW else "pickle"
+
+
+def stem_of(path: Path | str) -> Path:
+    path = Path(path)
+    if path.name.endswith(SCHEMA_SUFFIX):
+        return path.with_name(path.name[: -len(SCHEMA_SUFFIX)])
+    return path.with_suffix("") if path.suffix in (CSV, PARQUET, FEATHER, PICKLE) else path
+
+
+def schema_path(path: Path | str) -> Path:
+    stem = stem_of(path)
+    return stem.with_name(stem.name + SCHEMA_SUFFIX)
+
+
+def read_schema(path: Path | str) -> Optional[dict]:
+    try:
+        return json.loads(schema_path(path).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def infer_dtypes(frame: pd.DataFrame, overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Compact dtype per column: downcast integers, categoricals for repeated strings."""
+    dtypes: Dict[str, str] = {}
+    for name in frame.columns:
+        column = frame[name]
+        if pd.api.types.is_integer_dtype(column):
+            dtypes[name] = str(pd.to_numeric(column, downcast="integer").dtype)
+        elif pd.api.types.is_float_dtype(column) or pd.api.types.is_bool_dtype(column):
+            dtypes[name] = str(column.dtype)
+        elif column.dtype == object and len(column) and column.nunique() < CATEGORY_RATIO * len(column):
+            dtypes[name] = "category"
+        else:
+            dtypes[name] = str(column.dtype)
+    dtypes.update(overrides or {})
+    return dtypes
+
+
+def _source_stat(csv_path: Path) -> Optional[dict]:
+    try:
+        stat = csv_path.stat()
+    except OSError:
+        return None
+    return {"name": csv_path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_table(
+    frame: pd.DataFrame,
+    path: Path | str,
+    fmt: Optional[str] = None,
+    source: Optional[Path | str] = None,
+) -> Path:
+    """Write ``frame`` under the stem of ``path`` (atomic) plus its schema sidecar."""
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    if fmt in ("parquet", "feather") and not HAS_PYARROW:
+        logger.warning("pyarrow is not installed; writing %s as pickle", stem_of(path).name)
+        fmt = "pickle"
+    stem = stem_of(path)
+    stem.parent.mkdir(parents=True, exist_ok=True)
+    final = stem.with_suffix(FORMATS[fmt])
+    tmp = final.with_name(f".{final.name}.{os.getpid()}.tmp")
+    frame = frame.reset_index(drop=True)
+    if fmt == "parquet":
+        frame.to_parquet(tmp, index=False)
+    elif fmt == "feather":
+        frame.to_feather(tmp)
+    else:
+        frame.to_pickle(tmp)
+    os.replace(tmp, final)
+    for suffix in READ_ORDER:
+        if suffix != final.suffix:
+            stem.with_suffix(suffix).unlink(missing_ok=True)
+    schema = {
+        "format": fmt,
+        "file": final.name,
+        "rows": int(len(frame)),
+        "columns": [{"name": str(name), "dtype": str(dtype)} for name, dtype in frame.dtypes.items()],
+        "source": _source_stat(Path(source)) if source else None,
+    }
+    schema_tmp = schema_path(stem).with_name(f".{schema_path(stem).name}.{os.getpid()}.tmp")
+    schema_tmp.write_text(json.dumps(schema, indent=2))
+    os.replace(schema_tmp, schema_path(stem))
+    return final
+
+
+def convert(
+    csv_path: Path | str, fmt: Optional[str] = None, dtypes: Optional[Dict[str, str]] = None
+) -> Path:
+    """Parse ``csv_path`` once, type it and store the columnar copy next to it."""
+    csv_path = Path(csv_path)
+    frame = pd.read_csv(csv_path)
+    frame = frame.astype(infer_dtypes(frame, dtypes))
+    return write_table(frame, csv_path, fmt, source=csv_path)
+
+
+def _stale(candidate: Path, csv_path: Path, schema: Optional[dict]) -> bool:
+    """Whether ``csv_path`` changed after ``candidate`` was written from it."""
+    if not csv_path.exists():
+        return False
+    source = schema.get("source") if schema else None
+    if source is not None:
+        return _source_stat(csv_path) != source
+    # Written without a source (write_table(..., source=None)): all we have is the copy's own mtime.
+    return csv_path.stat().st_mtime_ns > candidate.stat().st_mtime_ns
+
+
+def columnar_path(path: Path | str) -> Optional[Path]:
+    """The stored columnar copy for ``path`` if it exists and is not older than its CSV."""
+    stem = stem_of(path)
+    schema = read_schema(stem)
+    for suffix in READ_ORDER:
+        candidate = stem.with_suffix(suffix)
+        if not candidate.exists() or (suffix != PICKLE and not HAS_PYARROW):
+            continue
+        csv_path = stem.with_suffix(CSV)
+        if _stale(candidate, csv_path, schema):
+            logger.info("%s is older than %s; reading the CSV", candidate.name, csv_path.name)
+            return None
+        return candidate
+    return None
+
+
+def columns_of(path: Path | str) -> List[str]:
+    """Column names without loading the data (sidecar, else the CSV header)."""
+    schema = read_schema(path)
+    if schema and columnar_path(path) is not None:
+        return [column["name"] for column in schema["columns"]]
+    return list(pd.read_csv(stem_of(path).with_suffix(CSV), nrows=0).columns)
+
+
+def read_table(path: Path | str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Load the table for ``path`` (a CSV path or stem), only ``columns`` if given.
+
+    Prefers the current columnar copy; falls back to the CSV, projected with
+    ``usecols`` and typed with the sidecar's dtypes when it is current.  A
+    pickle copy is read in full before ``columns`` are selected.
+    """
+    columns = list(columns) if columns is not None else None
+    stored = columnar_path(path)
+    if stored is not None:
+        if stored.suffix == PARQUET:
+            return pd.read_parquet(stored, columns=columns)
+        if stored.suffix == FEATHER:
+            return pd.read_feather(stored, columns=columns)
+        frame = pd.read_pickle(stored)
+        return frame[columns] if columns is not None else frame
+    csv_path = stem_of(path).with_suffix(CSV) if Path(path).suffix != CSV else Path(path)
+    schema = read_schema(path)
+    # A stale sidecar's downcast integers could overflow on the new rows; only trust it for the CSV it describes.
+    current = schema is not None and schema.get("source") is not None and schema["source"] == _source_stat(csv_path)
+    dtypes = {c["name"]: c["dtype"] for c in schema["columns"]} if current else None
+    if dtypes and columns is not None:
+        dtypes = {name: dtype for name, dtype in dtypes.items() if name in columns}
+    frame = pd.read_csv(csv_path, usecols=columns, dtype=dtypes)
+    return frame[columns] if columns is not None else frame
+
+
+def read_present(path: Path | str, columns: Sequence[str]) -> pd.DataFrame:
+    """:func:`read_table` of those ``columns`` the table has (optional columns such as ``month``)."""
+    available = set(columns_of(path))
+    return read_table(path, [name for name in dict.fromkeys(columns) if name in available])
+
+
+def export_csv(path: Path | str, out: Optional[Path | str] = None, columns: Optional[Sequence[str]] = None) -> Path:
+    """Write a stored table (or a projection of it) as CSV."""
+    out = Path(out) if out else stem_of(path).with_suffix(CSV)
+    frame = read_table(path, columns)
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    frame.to_csv(tmp, index=False)
+    os.replace(tmp, out)
+    return out
+
+
+def discover(directories: Sequence[Path | str] = DEFAULT_DIRS) -> List[Path]:
+    return sorted(p for d in directories if Path(d).is_dir() for p in Path(d).glob(f"*{CSV}"))
+
+
+def _parse_dtype(spec: str):
+    name, _, dtype = spec.partition("=")
+    if not dtype:
+        raise argparse.ArgumentTypeError(f"expected column=dtype, got {spec!r}")
+    return name, dtype
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Convert, export or list columnar recommender tables.")
+    parser.add_argument("action", choices=("convert", "export", "show"))
+    parser.add_argument("paths", nargs="*", help="CSV paths (convert) or a table path (export).")
+    parser.add_argument("--all", action="store_true", help="Convert every CSV under data/ and artifacts/.")
+    parser.add_argument("--format", choices=tuple(FORMATS), default=None, help="Default: parquet if available.")
+    parser.add_argument("--dtype", action="append", type=_parse_dtype, default=[], metavar="COLUMN=DTYPE")
+    parser.add_argument("--columns", nargs="+", default=None, help="Export only these columns.")
+    parser.add_argument("--out", default=None, help="Export target (default: the table's CSV path).")
+    return parser
+
+
+def run_from_options(options: dict) -> List[Path]:
+    action = options["action"]
+    paths = [Path(p) for p in options.get("paths") or []]
+    if action == "convert":
+        if options.get("all"):
+            paths = discover()
+        written = []
+        for csv_path in paths:
+            target = convert(csv_path, options.get("format"), dict(options.get("dtype") or []))
+            logger.info(
+                "%s (%d bytes) -> %s (%d bytes)",
+                csv_path.name,
+                csv_path.stat().st_size,
+                target.name,
+                target.stat().st_size,
+            )
+            written.append(target)
+        return written
+    if action == "export":
+        if len(paths) != 1:
+            raise SystemExit("export takes exactly one table path")
+        return [export_csv(paths[0], options.get("out"), options.get("columns"))]
+    for csv_path in paths or discover():
+        stored = columnar_path(csv_path)
+        schema = read_schema(csv_path) if stored else None
+        if schema:
+            logger.info("%-40s %-8s %8d rows  %s", stem_of(csv_path).name, schema["format"], schema["rows"],
+                        ", ".join(f"{c['name']}:{c['dtype']}" for c in schema["columns"]))
+        else:
+            logger.info("%-40s csv only", stem_of(csv_path).name)
+    return paths
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender.cooccurrence import build_cooccurrence, load, run_from_options, save
+
+
+def bookings_and_addons(seed=0, n_bookings=400):
+    rng = np.random.default_rng(seed)
+    bookings = pd.DataFrame(
+        {
+            "booking_id": np.arange(n_bookings),
+            "package": rng.choice(["Solo", "Duo", "Family", "Barkada"], n_bookings),
+            "booking_date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 200, n_bookings), unit="D"),
+        }
+    )
+    n_addons = 3 * n_bookings
+    addons = pd.DataFrame(
+        {
+            # Some rows point at bookings that do not exist; repeats and blanks are kept on purpose.
+            "booking_id": rng.integers(0, n_bookings + 20, n_addons),
+            "addon": rng.choice(["Frame", "Prints", "Extra Pax", "Costume", None], n_addons),
+        }
+    )
+    return bookings, addons
+
+
+def groupby_reference(bookings, addons):
+    """The long-form merge-and-count the sparse build replaced."""
+    months = bookings.assign(month=bookings["booking_date"].dt.strftime("%Y-%m"))[["booking_id", "package", "month"]]
+    pairs = months.drop_duplicates().merge(addons.dropna().drop_duplicates(), on="booking_id")
+    counts = pairs.groupby(["month", "package", "addon"]).size().rename("count").reset_index()
+    return counts.sort_values(
+        ["month", "package", "count", "addon"], ascending=[True, True, False, True], ignore_index=True
+    )
+
+
+class BuildCooccurrenceTests(unittest.TestCase):
+    def test_matches_groupby_reference(self):
+        bookings, addons = bookings_and_addons()
+        built = build_cooccurrence(bookings, addons).to_frame()
+        expected = groupby_reference(bookings, addons)
+        pd.testing.assert_frame_equal(built.astype({"count": "int64"}), expected, check_dtype=False)
+
+    def test_string_and_integer_booking_ids_are_matched(self):
+        bookings, addons = bookings_and_addons(seed=1)
+        as_str = addons.assign(booking_id=addons["booking_id"].astype(str))
+        self.assertEqual(
+            (build_cooccurrence(bookings, as_str).matrix != build_cooccurrence(bookings, addons).matrix).nnz, 0
+        )
+
+    def test_month_slices_and_totals_add_up(self):
+        built = build_cooccurrence(*bookings_and_addons(seed=2))
+        total = sum(built.month(month) for month in built.months)
+        self.assertEqual((sparse.csr_matrix(total) != built.totals()).nnz, 0)
+        package = built.packages[0]
+        expected = groupby_reference(*bookings_and_addons(seed=2)).query("package == @package")
+        overall = expected.groupby("addon")["count"].sum()
+        top = built.top_addons(package, k=2)
+        self.assertEqual([count for _, count in top], sorted(overall, reverse=True)[:2])
+
+    def test_save_and_load_round_trip(self):
+        built = build_cooccurrence(*bookings_and_addons(seed=3))
+        with tempfile.TemporaryDirectory() as scratch:
+            loaded = load(save(built, Path(scratch) / "cooccurrence.npz"))
+        self.assertEqual((loaded.matrix != built.matrix).nnz, 0)
+        for name in ("months", "packages", "addons"):
+            np.testing.assert_array_equal(getattr(loaded, name), getattr(built, name))
+
+
+class CommandLineTests(unittest.TestCase):
+    def test_csv_option_leaves_the_old_artifact_alone(self):
+        bookings, addons = bookings_and_addons(seed=4, n_bookings=50)
+        with tempfile.TemporaryDirectory() as scratch:
+            root = Path(scratch)
+            bookings.to_csv(root / "bookings.csv", index=False)
+            addons.to_csv(root / "addons.csv", index=False)
+            old = root / "month_package_addon_cooccurrence.csv"
+            old.write_text("package,addon,month,pair_count\n")
+            options = {"bookings": root / "bookings.csv", "addons": root / "addons.csv", "csv": True}
+            path = run_from_options({**options, "out": root / "month_package_addon_cooccurrence.npz"})
+
+            self.assertEqual(old.read_text(), "package,addon,month,pair_count\n")
+            long_form = pd.read_csv(root / "month_package_addon_cooccurrence_counts.csv")
+            self.assertEqual(list(long_form.columns), ["month", "package", "addon", "count"])
+            self.assertEqual(int(long_form["count"].sum()), int(load(path).matrix.sum()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from surprise import NMF, SVD, Dataset, Reader, SVDpp
+
+from recommender.factors import extract_factors, top_n_batch
+
+
+def trainset(seed=0, n_users=40, n_items=12, n_ratings=300):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(
+        {
+            "user": [f"C{u:03d}" for u in rng.integers(0, n_users, n_ratings)],
+            "item": [f"P{i:02d}" for i in rng.integers(0, n_items, n_ratings)],
+            "rating": rng.integers(1, 6, n_ratings).astype(float),
+        }
+    ).drop_duplicates(["user", "item"])
+    return Dataset.load_from_df(frame, Reader(rating_scale=(1, 5))).build_full_trainset()
+
+
+class FactorsScoreTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.trainset = trainset()
+
+    def assert_matches_predict(self, algo):
+        algo.fit(self.trainset)
+        factors = extract_factors(algo)
+        users = [self.trainset.to_raw_uid(u) for u in self.trainset.all_users()] + ["never-seen"]
+        items = factors.item_ids
+        expected = np.array([[algo.predict(uid, iid).est for iid in items] for uid in users])
+        np.testing.assert_allclose(factors.score(users), expected, rtol=0, atol=1e-4)
+
+    def test_svd(self):
+        self.assert_matches_predict(SVD(n_factors=8, n_epochs=10, random_state=0))
+
+    def test_unbiased_svd(self):
+        self.assert_matches_predict(SVD(n_factors=8, n_epochs=10, biased=False, random_state=0))
+
+    def test_svdpp_folds_the_implicit_term_into_the_customer_vectors(self):
+        self.assert_matches_predict(SVDpp(n_factors=4, n_epochs=5, random_state=0))
+
+    def test_nmf(self):
+        self.assert_matches_predict(NMF(n_factors=6, n_epochs=20, random_state=0))
+
+    def test_seen_items_are_the_training_ratings(self):
+        factors = extract_factors(SVD(n_factors=4, n_epochs=2, random_state=0).fit(self.trainset))
+        for u in self.trainset.all_users():
+            self.assertEqual(sorted(factors.seen_items(u)), sorted(i for i, _ in self.trainset.ur[u]))
+
+
+class TopNBatchTests(unittest.TestCase):
+    def test_best_first_excluding_seen_and_padding_short_rows(self):
+        scores = np.array([[0.1, 0.9, 0.5], [0.3, 0.2, 0.7]], dtype=np.float32)
+        seen = np.array([[False, True, False], [True, True, False]])
+        best, values = top_n_batch(scores, 2, seen)
+        np.testing.assert_array_equal(best, [[2, 0], [2, -1]])
+        np.testing.assert_allclose(values, [[0.5, 0.1], [0.7, 0.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from surprise import SVD, Dataset, Reader
+
+from recommender import incremental
+from recommender.model_artifact import current_version, export_model, list_versions, load_artifact
+
+
+def history(seed=0, n_users=40, n_items=15, n_ratings=400):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(
+        {
+            "user": [f"C{u:03d}" for u in rng.integers(0, n_users, n_ratings)],
+            "item": [f"P{i:02d}" for i in rng.integers(0, n_items, n_ratings)],
+            "rating": rng.integers(3, 6, n_ratings).astype(float),
+        }
+    )
+    return frame.drop_duplicates(["user", "item"], ignore_index=True)
+
+
+class WarmStartRunTests(unittest.TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = Path(scratch.name)
+        self.artifacts = self.root / "mf"
+        self.ratings = history()
+        trainset = Dataset.load_from_df(self.ratings, Reader(rating_scale=(1, 5))).build_full_trainset()
+        export_model(SVD(n_factors=4, n_epochs=10, random_state=0).fit(trainset), self.artifacts, "base")
+        self.base = current_version(self.artifacts)
+        self.write("train.csv", self.ratings)
+        self.write("test.csv", self.ratings.sample(frac=0.3, random_state=0))
+        # Existing customers rate unseen packages far below their history: training on it alone hurts them.
+        seen = set(zip(self.ratings["user"], self.ratings["item"]))
+        pairs = [(f"C{u:03d}", f"P{i:02d}") for u in range(40) for i in range(15)]
+        unseen = [pair for pair in pairs if pair not in seen]
+        self.delta = pd.DataFrame(unseen[:150], columns=["user", "item"]).assign(rating=1.0)
+        self.write("delta.csv", self.delta)
+        # The evaluator's split is absent unless a test sets it.
+        patcher = mock.patch.object(incremental, "TEST_RATINGS", self.root / "missing_test_ratings.csv")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, name, frame):
+        frame.to_csv(self.root / name, index=False)
+
+    def options(self, **extra):
+        return {"data": self.root / "train.csv", "root": self.artifacts, "test": self.root / "test.csv", **extra}
+
+    def harmful(self, **extra):
+        return self.options(delta=self.root / "delta.csv", replay=1, n_epochs=30, lr_all=0.05, **extra)
+
+    def test_no_new_ratings_exports_nothing(self):
+        path = incremental.run_from_options(self.options())
+        self.assertEqual(path, self.artifacts / self.base)
+        self.assertEqual(list_versions(self.artifacts), [self.base])
+        self.assertEqual(current_version(self.artifacts), self.base)
+
+    def test_empty_delta_returns_none(self):
+        factors = load_artifact(self.artifacts).factors
+        self.assertIsNone(incremental.warm_start(factors, self.ratings))
+
+    def test_regression_beyond_tolerance_keeps_current(self):
+        factors = load_artifact(self.artifacts).factors
+        params = incremental.WarmStartParams(n_epochs=30, replay=1, lr_all=0.05)
+        test = pd.read_csv(self.root / "test.csv", dtype={"user": str, "item": str})
+        result = incremental.warm_start(factors, self.ratings, params, self.delta, test)
+        self.assertGreater(result.new_rmse, result.old_rmse * (1 + params.tolerance))
+
+        self.assertIsNone(incremental.run_from_options(self.harmful()))
+        self.assertEqual(list_versions(self.artifacts), [self.base])
+        self.assertEqual(current_version(self.artifacts), self.base)
+
+    def test_force_publishes_despite_the_regression(self):
+        path = incremental.run_from_options(self.harmful(force=True))
+        self.assertNotEqual(path.name, self.base)
+        self.assertEqual(current_version(self.artifacts), path.name)
+        meta = load_artifact(self.artifacts).meta
+        self.assertEqual(meta["warm_start_from"], self.base)
+        self.assertGreater(meta["quality_check"]["new_rmse"], meta["quality_check"]["old_rmse"])
+
+    def test_defaults_to_the_evaluator_split(self):
+        split = self.root / "test_ratings.csv"
+        self.ratings.to_csv(split, index=False)
+        with mock.patch.object(incremental, "TEST_RATINGS", split):
+            path = incremental.run_from_options({**self.harmful(force=True), "test": None})
+        self.assertEqual(load_artifact(self.artifacts, path.name).meta["quality_check"]["test"], str(split))
+
+    def test_falls_back_to_a_delta_holdout_without_a_split(self):
+        with self.assertLogs(incremental.logger, "WARNING"):
+            path = incremental.run_from_options({**self.harmful(force=True), "test": None, "holdout": 0.3})
+        self.assertEqual(load_artifact(self.artifacts, path.name).meta["quality_check"]["test"], "delta holdout")
+
+
+class PassesTests(unittest.TestCase):
+    def result(self, old_rmse, new_rmse):
+        return incremental.WarmStartResult(None, 1, 0, 0, 0, old_rmse, new_rmse, 0.0, 0.0, 0.0)
+
+    def test_tolerance_is_relative(self):
+        self.assertTrue(self.result(1.0, 1.009).passes(0.01))
+        self.assertFalse(self.result(1.0, 1.02).passes(0.01))
+
+    def test_unmeasured_rmse_fails(self):
+        self.assertFalse(self.result(float("nan"), float("nan")).passes(0.01))
+        self.assertFalse(self.result(1.0, float("nan")).passes(0.01))
+
+
+if __name__ == "__main__":
+    unittest.main()
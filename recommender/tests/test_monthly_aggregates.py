@@ -0,0 +1,111 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from recommender.monthly_aggregates import AGGREGATES, PARTITIONS_DIR, refresh
+
+
+def bookings_and_addons(seed=0, n_bookings=300, start=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start, start + n_bookings)
+    bookings = pd.DataFrame(
+        {
+            "booking_id": ids,
+            "customer_id": [f"C{c:03d}" for c in rng.integers(0, 60, n_bookings)],
+            "package": rng.choice(["Solo", "Duo", "Family"], n_bookings),
+            "booking_date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 120, n_bookings), unit="D"),
+        }
+    )
+    addons = pd.DataFrame(
+        {
+            "booking_id": rng.choice(ids, 2 * n_bookings),
+            "addon": rng.choice(["Frame", "Prints", "Extra Pax"], 2 * n_bookings),
+        }
+    )
+    return bookings, addons
+
+
+def in_month(bookings, addons, month, seed):
+    """Extra bookings (and their add-ons) dated inside ``month``."""
+    more, more_addons = bookings_and_addons(seed=seed, n_bookings=20, start=int(bookings["booking_id"].max()) + 1)
+    more["booking_date"] = pd.Timestamp(f"{month}-15")
+    return pd.concat([bookings, more], ignore_index=True), pd.concat([addons, more_addons], ignore_index=True)
+
+
+class RefreshTests(unittest.TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = Path(scratch.name)
+        self.out = self.root / "incremental"
+        self.bookings, self.addons = bookings_and_addons()
+
+    def published(self, out_dir):
+        return {name: (Path(out_dir) / PARTITIONS_DIR / f"{name}.csv").read_text() for name in AGGREGATES}
+
+    def full_rebuild(self, bookings, addons):
+        out_dir = self.root / "full"
+        refresh(bookings, addons, out_dir, full=True)
+        return self.published(out_dir)
+
+    def test_first_run_builds_every_month(self):
+        report = refresh(self.bookings, self.addons, self.out)
+        self.assertEqual(report.rebuilt, ["2025-01", "2025-02", "2025-03", "2025-04"])
+        self.assertEqual(report.reused, [])
+
+    def test_rebuilds_only_the_changed_month_and_matches_a_full_rebuild(self):
+        refresh(self.bookings, self.addons, self.out)
+        bookings, addons = in_month(self.bookings, self.addons, "2025-03", seed=1)
+        report = refresh(bookings, addons, self.out)
+        self.assertEqual(report.rebuilt, ["2025-03"])
+        self.assertEqual(sorted(report.reused), ["2025-01", "2025-02", "2025-04"])
+        self.assertEqual(self.published(self.out), self.full_rebuild(bookings, addons))
+
+    def test_unchanged_input_rebuilds_nothing(self):
+        refresh(self.bookings, self.addons, self.out)
+        shuffled = self.bookings.sample(frac=1, random_state=0)
+        report = refresh(shuffled, self.addons.sample(frac=1, random_state=0), self.out)
+        self.assertEqual(report.rebuilt, [])
+
+    def test_freeze_before_keeps_earlier_months_as_published(self):
+        refresh(self.bookings, self.addons, self.out)
+        before = self.published(self.out)
+        bookings, addons = in_month(self.bookings, self.addons, "2025-01", seed=2)
+        bookings, addons = in_month(bookings, addons, "2025-04", seed=3)
+
+        report = refresh(bookings, addons, self.out, freeze_before="2025-03")
+        self.assertEqual(report.frozen_changed, ["2025-01"])
+        self.assertEqual(report.rebuilt, ["2025-04"])
+        after = pd.read_csv(self.out / PARTITIONS_DIR / "month_package_popularity.csv")
+        original = pd.read_csv(io.StringIO(before["month_package_popularity"]))
+        pd.testing.assert_frame_equal(after[after["month"] == "2025-01"], original[original["month"] == "2025-01"])
+
+        report = refresh(bookings, addons, self.out, freeze_before="2025-03", full=True)
+        self.assertEqual(report.frozen_changed, [])
+        self.assertEqual(self.published(self.out), self.full_rebuild(bookings, addons))
+
+    def test_builder_artifacts_are_only_replaced_on_request(self):
+        existing = self.out / "month_package_popularity.csv"
+        self.out.mkdir(parents=True)
+        existing.write_text("month,package,count\n")
+        refresh(self.bookings, self.addons, self.out)
+        self.assertEqual(existing.read_text(), "month,package,count\n")
+
+        expected = self.published(self.out)
+        refresh(self.bookings, self.addons, self.out, full=True, publish_dir=self.out)
+        self.assertEqual({name: (self.out / f"{name}.csv").read_text() for name in AGGREGATES}, expected)
+
+    def test_months_that_disappear_are_removed(self):
+        refresh(self.bookings, self.addons, self.out)
+        kept = self.bookings[self.bookings["booking_date"] < "2025-04-01"]
+        report = refresh(kept, self.addons, self.out)
+        self.assertEqual(report.removed, ["2025-04"])
+        self.assertEqual(self.published(self.out), self.full_rebuild(kept, self.addons))
+
+
+if __name__ == "__main__":
+    unittest.main()
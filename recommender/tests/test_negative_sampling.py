@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+from scipy import sparse
+
+from recommender.negative_sampling import (
+    NegativeSampler,
+    PositiveIndex,
+    item_weights,
+    negatives_per_user,
+    sample_negatives,
+)
+
+
+def dense_catalogue(n_users=50, n_items=40, seed=0):
+    """Positives where most customers booked nearly every item, plus one who booked all of them."""
+    rng = np.random.default_rng(seed)
+    booked = rng.random((n_users, n_items)) < np.linspace(0.2, 0.98, n_users)[:, None]
+    booked[-1] = True
+    booked[:, 0] = True  # one item everyone booked, so popularity weights are skewed
+    return sparse.csr_matrix(booked.astype(np.float32))
+
+
+class SampleNegativesTests(unittest.TestCase):
+    def check(self, matrix, weights):
+        index = PositiveIndex(matrix)
+        wanted = negatives_per_user(index, 4.0)
+        users, items = sample_negatives(index, wanted, np.random.default_rng(1), weights)
+        np.testing.assert_array_equal(np.bincount(users, minlength=index.n_users), wanted)
+        self.assertFalse(np.asarray(matrix[users, items]).any(), "a negative is a booked item")
+        keys = users.astype(np.int64) * index.n_items + items
+        self.assertEqual(len(np.unique(keys)), len(keys), "a negative was drawn twice")
+
+    def test_fills_customers_who_booked_most_of_the_catalogue(self):
+        self.check(dense_catalogue(), None)
+
+    def test_fills_them_under_popularity_weights(self):
+        matrix = dense_catalogue()
+        self.check(matrix, item_weights(matrix, "popularity", 0.75))
+
+    def test_rejects_more_negatives_than_unbooked_items(self):
+        index = PositiveIndex(dense_catalogue())
+        wanted = index.n_items - index.counts
+        wanted[0] += 1
+        with self.assertRaises(ValueError):
+            sample_negatives(index, wanted, np.random.default_rng(0))
+
+
+class NegativeSamplerTests(unittest.TestCase):
+    def setUp(self):
+        coo = dense_catalogue(seed=4).tocoo()
+        self.positives = set(zip(coo.row.tolist(), coo.col.tolist()))
+        self.sampler = NegativeSampler(
+            coo.row, coo.col, np.full(coo.nnz, 5.0), *coo.shape, ratio=2.0, mode="popularity", seed=11
+        )
+
+    def test_same_seed_and_epoch_reproduce(self):
+        sampler = self.sampler
+        shape = (sampler.index.n_users, sampler.index.n_items)
+        options = dict(ratio=2.0, mode="popularity", seed=11)
+        again = NegativeSampler(sampler.users, sampler.items, sampler.ratings, *shape, **options)
+        for epoch in (0, 3):
+            for left, right in zip(sampler.sample(epoch), again.sample(epoch)):
+                np.testing.assert_array_equal(left, right)
+
+    def test_epochs_draw_different_negatives(self):
+        first, second = self.sampler.sample(0), self.sampler.sample(1)
+        self.assertEqual(len(first[0]), len(second[0]))
+        self.assertFalse(np.array_equal(first[1], second[1]))
+
+    def test_every_epoch_is_valid(self):
+        for epoch in range(3):
+            users, items = self.sampler.sample(epoch)
+            np.testing.assert_array_equal(np.bincount(users, minlength=self.sampler.index.n_users), self.sampler.wanted)
+            self.assertFalse(self.positives & set(zip(users.tolist(), items.tolist())))
+            self.assertEqual(len(users), self.sampler.negatives_per_epoch)
+
+    def test_epoch_appends_negatives_after_the_positives(self):
+        users, items, ratings = self.sampler.epoch(2)
+        n = len(self.sampler.users)
+        np.testing.assert_array_equal(users[:n], self.sampler.users)
+        np.testing.assert_array_equal(ratings[:n], self.sampler.ratings)
+        self.assertTrue((ratings[n:] == self.sampler.negative_rating).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+import numpy as np
+from surprise import SVD, accuracy
+
+from recommender.negative_sampling import NegativeSampler
+from recommender.sgd import NumbaSVD, fit_arrays, trainset_arrays
+from recommender.tests.test_factors import trainset
+
+PARAMS = dict(n_factors=8, n_epochs=15, lr_all=0.01, reg_all=0.05)
+
+
+class NumbaSVDTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.trainset = trainset(seed=3, n_users=60, n_items=15, n_ratings=600)
+
+    def assert_same_parameters(self, **params):
+        reference = SVD(random_state=7, **PARAMS, **params).fit(self.trainset)
+        numba_svd = NumbaSVD(random_state=7, **PARAMS, **params).fit(self.trainset)
+        for name in ("pu", "qi", "bu", "bi"):
+            expected, actual = getattr(reference, name), getattr(numba_svd, name)
+            np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12, err_msg=name)
+        return reference, numba_svd
+
+    def test_reproduces_svd_with_the_same_seed(self):
+        reference, numba_svd = self.assert_same_parameters()
+        testset = self.trainset.build_testset()
+        self.assertAlmostEqual(
+            accuracy.rmse(numba_svd.test(testset), verbose=False),
+            accuracy.rmse(reference.test(testset), verbose=False),
+            places=12,
+        )
+
+    def test_reproduces_unbiased_svd(self):
+        self.assert_same_parameters(biased=False)
+
+    def test_hogwild_converges_like_serial(self):
+        testset = self.trainset.build_testset()
+        serial = accuracy.rmse(NumbaSVD(random_state=7, **PARAMS).fit(self.trainset).test(testset), verbose=False)
+        hogwild = NumbaSVD(random_state=7, hogwild=True, **PARAMS).fit(self.trainset)
+        self.assertLess(accuracy.rmse(hogwild.test(testset), verbose=False), serial * 1.05)
+
+    def test_warm_start_does_not_modify_its_init(self):
+        users, items, ratings = trainset_arrays(self.trainset)
+        shape = (self.trainset.n_users, self.trainset.n_items)
+        init = fit_arrays(users, items, ratings, *shape, n_factors=4, n_epochs=2, random_state=0)
+        before = init.user_factors.copy()
+        warm = fit_arrays(users, items, ratings, *shape, n_factors=4, n_epochs=2, init=init)
+        np.testing.assert_array_equal(init.user_factors, before)
+        self.assertFalse(np.array_equal(warm.user_factors, before))
+
+
+class NegativeTrainingTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.trainset = trainset(seed=5, n_users=50, n_items=20, n_ratings=400)
+        cls.arrays = trainset_arrays(cls.trainset)
+        cls.shape = (cls.trainset.n_users, cls.trainset.n_items)
+
+    def sampler(self, seed=0):
+        return NegativeSampler(*self.arrays, *self.shape, ratio=1.0, seed=seed, negative_rating=0.0)
+
+    def test_global_mean_counts_one_epoch_of_negatives(self):
+        sampler = self.sampler()
+        result = fit_arrays(*self.arrays, *self.shape, n_factors=4, n_epochs=1, random_state=0, negatives=sampler)
+        ratings = self.arrays[2]
+        expected = ratings.sum() / (len(ratings) + sampler.negatives_per_epoch)
+        self.assertAlmostEqual(result.global_mean, expected)
+        self.assertLess(result.global_mean, ratings.mean())
+
+    def test_negatives_change_the_fit_and_reproduce_with_the_seed(self):
+        options = dict(n_factors=4, n_epochs=3, random_state=0)
+        plain = fit_arrays(*self.arrays, *self.shape, **options)
+        first = fit_arrays(*self.arrays, *self.shape, negatives=self.sampler(), **options)
+        second = fit_arrays(*self.arrays, *self.shape, negatives=self.sampler(), **options)
+        other = fit_arrays(*self.arrays, *self.shape, negatives=self.sampler(seed=1), **options)
+        np.testing.assert_array_equal(first.user_factors, second.user_factors)
+        self.assertFalse(np.array_equal(first.user_factors, other.user_factors))
+        self.assertFalse(np.array_equal(first.item_bias, plain.item_bias))
+
+    def test_numba_svd_with_negatives_predicts_around_the_mixed_mean(self):
+        algo = NumbaSVD(n_factors=4, n_epochs=3, negative_ratio=1.0, random_state=0).fit(self.trainset)
+        self.assertLess(algo.global_mean, self.trainset.global_mean)
+        self.assertAlmostEqual(algo.predict("never-seen", "never-seen").est, algo.global_mean)
+
+    def test_random_state_instances_give_reproducible_negatives(self):
+        def fit(random_state):
+            return NumbaSVD(n_factors=4, n_epochs=3, negative_ratio=1.0, random_state=random_state).fit(self.trainset)
+
+        first = fit(np.random.RandomState(3))
+        second = fit(np.random.RandomState(3))
+        np.testing.assert_array_equal(first.pu, second.pu)
+        np.testing.assert_array_equal(first.bi, second.bi)
+
+
+if __name__ == "__main__":
+    unittest.main()
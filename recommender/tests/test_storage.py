@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from recommender import storage
+
+
+class ColumnarPathTests(unittest.TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.csv = Path(scratch.name) / "bookings.csv"
+        pd.DataFrame({"customer_id": ["C1", "C2"], "package": ["Solo", "Duo"]}).to_csv(self.csv, index=False)
+
+    def touch(self, path, seconds):
+        os.utime(path, ns=(seconds * 10**9, seconds * 10**9))
+
+    def test_copy_without_source_is_current_until_the_csv_changes(self):
+        stored = storage.write_table(pd.read_csv(self.csv), self.csv, "pickle")
+        self.assertIsNone(storage.read_schema(self.csv)["source"])
+        self.touch(self.csv, 1_000)
+        self.touch(stored, 2_000)
+        self.assertEqual(storage.columnar_path(self.csv), stored)
+
+        pd.DataFrame({"customer_id": ["C1", "C2", "C3"], "package": ["Solo", "Duo", "Solo"]}).to_csv(
+            self.csv, index=False
+        )
+        self.touch(self.csv, 3_000)
+        self.assertIsNone(storage.columnar_path(self.csv))
+        self.assertEqual(len(storage.read_table(self.csv)), 3)
+
+    def test_copy_with_source_tracks_the_csv_stat(self):
+        stored = storage.convert(self.csv, "pickle")
+        self.assertEqual(storage.columnar_path(self.csv), stored)
+        self.touch(self.csv, 1_000)  # older than the copy, but not the CSV it was made from
+        self.assertIsNone(storage.columnar_path(self.csv))
+
+    def test_projection_returns_only_the_requested_columns(self):
+        storage.convert(self.csv, "pickle")
+        self.assertEqual(list(storage.read_table(self.csv, ["package"]).columns), ["package"])
+
+
+if __name__ == "__main__":
+    unittest.main()
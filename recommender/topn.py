@@ -0,0 +1,368 @@
+"""Precomputed top-N recommendations for every known customer.
+
+Scoring every candidate through the pickled Surprise model at request time
+makes latency grow with the catalogue.  :func:`build_topn` scores all
+customers once, right after training, and stores the best ``n`` items per
+customer in ``artifacts/topn.npz``: a sorted customer-id array plus
+``int32`` item indices and ``float32`` scores, ``n`` per row.
+
+:class:`TopNRecommender` answers from that table with one dict lookup and
+only scores live when the customer is unknown to the table (cold), the table
+was built from a different model file or is older than ``max_age`` (stale),
+or more than ``n`` items are asked for.  Factor models (SVD, SVD++, NMF) are
+scored through :mod:`recommender.factors`, one matrix multiply per batch of
+customers, both for the build and for live scoring.
+
+Usage::
+
+    python -m recommender.topn --n 20
+    python manage.py build_topn --n 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from recommender.factors import Factors, extract_factors, supports, top_n_batch
+from recommender.model_artifact import DEFAULT_ARTIFACT_ROOT, Artifact, current_version, load_artifact
+from recommender.model_io import ARTIFACTS_DIR, DEFAULT_MODEL, file_digest, load_algo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLE = ARTIFACTS_DIR / "topn.npz"
+DEFAULT_N = 10
+
+Recommendation = Tuple[str, float]
+
+
+def score_user(algo, inner_uid) -> np.ndarray:
+    """Estimated rating of every trainset item for one user, clipped like ``predict``."""
+    from surprise import PredictionImpossible
+
+    trainset = algo.trainset
+    scores = np.empty(trainset.n_items, dtype=np.float32)
+    default = algo.default_prediction()
+    for inner_iid in range(trainset.n_items):
+        try:
+            est = algo.estimate(inner_uid, inner_iid)
+            scores[inner_iid] = est[0] if isinstance(est, tuple) else est
+        except PredictionImpossible:
+            scores[inner_iid] = default
+    low, high = trainset.rating_scale
+    return np.clip(scores, low, high, out=scores)
+
+
+def seen_items(trainset, inner_uid: int) -> np.ndarray:
+    return np.fromiter((iid for iid, _ in trainset.ur[inner_uid]), dtype=np.int64)
+
+
+def top_indices(scores: np.ndarray, n: int, exclude: Optional[np.ndarray] = None) -> np.ndarray:
+    """Indices of the ``n`` highest scores, best first; excluded items never appear."""
+    scores = np.asarray(scores, dtype=np.float32)
+    if exclude is not None and len(exclude):
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+    n = min(n, len(scores))
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, n - 1)[:n]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    return best[np.isfinite(scores[best])]
+
+
+@dataclass
+class TopNTable:
+    user_ids: np.ndarray  # str, one row per customer
+    item_ids: np.ndarray  # str, the candidate catalogue
+    items: np.ndarray  # int32 [users, n] indices into item_ids, -1 = no item
+    scores: np.ndarray  # float32 [users, n]
+    model_digest: str = ""
+    built_at: float = field(default_factory=time.time)
+    _rows: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rows = {uid: row for row, uid in enumerate(self.user_ids.tolist())}
+
+    @property
+    def n(self) -> int:
+        return self.items.shape[1]
+
+    def __contains__(self, customer_id) -> bool:
+        return str(customer_id) in self._rows
+
+    def lookup(self, customer_id, n: Optional[int] = None) -> Optional[List[Recommendation]]:
+        row = self._rows.get(str(customer_id))
+        if row is None:
+            return None
+        items, scores = self.items[row, : n or self.n], self.scores[row, : n or self.n]
+        keep = items >= 0
+        return list(zip(self.item_ids[items[keep]].tolist(), scores[keep].tolist()))
+
+    def is_stale(self, model_digest: Optional[str] = None, max_age: Optional[float] = None) -> bool:
+        if model_digest is not None and model_digest != self.model_digest:
+            return True
+        return max_age is not None and time.time() - self.built_at > max_age
+
+    def save(self, path: Path | str = DEFAULT_TABLE) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(
+                fh,
+                user_ids=self.user_ids,
+                item_ids=self.item_ids,
+                items=self.items,
+                scores=self.scores,
+                model_digest=np.array(self.model_digest),
+                built_at=np.array(self.built_at),
+            )
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path | str = DEFAULT_TABLE) -> "TopNTable":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                user_ids=data["user_ids"],
+                item_ids=data["item_ids"],
+                items=data["items"],
+                scores=data["scores"],
+                model_digest=str(data["model_digest"]),
+                built_at=float(data["built_at"]),
+            )
+
+
+def build_topn(
+    model, n: int = DEFAULT_N, exclude_seen: bool = True, model_digest: str = "", batch_size: int = 1024
+) -> TopNTable:
+    """Score every known customer against every item and keep the best ``n``.
+
+    ``model`` is a trained Surprise algorithm or :class:`Factors` (e.g. a
+    loaded artifact).  Factor models are scored ``batch_size`` customers per
+    matrix multiply; other algorithms fall back to one ``estimate`` call per
+    pair.
+    """
+    started = time.perf_counter()
+    factors = model if isinstance(model, Factors) else extract_factors(model) if supports(model) else None
+    if factors is not None:
+        user_ids, item_ids = np.asarray(factors.user_ids), np.asarray(factors.item_ids)
+        items = np.full((factors.n_users, n), -1, dtype=np.int32)
+        scores = np.zeros((factors.n_users, n), dtype=np.float32)
+        for inner, batch in factors.iter_scores(batch_size):
+            best, values = top_n_batch(batch, n, factors.seen_mask(inner) if exclude_seen else None)
+            items[inner, : best.shape[1]] = best
+            scores[inner, : best.shape[1]] = values
+    else:
+        trainset = model.trainset
+        user_ids = np.array([str(trainset.to_raw_uid(u)) for u in trainset.all_users()])
+        item_ids = np.array([str(trainset.to_raw_iid(i)) for i in trainset.all_items()])
+        items = np.full((trainset.n_users, n), -1, dtype=np.int32)
+        scores = np.zeros((trainset.n_users, n), dtype=np.float32)
+        for inner_uid in trainset.all_users():
+            user_scores = score_user(model, inner_uid)
+            best = top_indices(user_scores, n, seen_items(trainset, inner_uid) if exclude_seen else None)
+            items[inner_uid, : len(best)] = best
+            scores[inner_uid, : len(best)] = user_scores[best]
+
+    order = np.argsort(user_ids, kind="stable")
+    logger.info(
+        "top-%d for %d customers x %d items in %.2fs",
+        n,
+        len(user_ids),
+        len(item_ids),
+        time.perf_counter() - started,
+    )
+    return TopNTable(user_ids[order], item_ids, items[order], scores[order], model_digest)
+
+
+class TopNRecommender:
+    """Serve recommendations from the precomputed table, scoring live only when needed.
+
+    Live scoring uses the current memory-mapped model artifact (see
+    :mod:`recommender.model_artifact`) when one exists; only otherwise is
+    the pickled model loaded, lazily, on the first request that needs it.
+    :meth:`mark_stale` flags customers whose rows no longer reflect their
+    history (e.g. after a new booking) until the next rebuild.
+    """
+
+    def __init__(
+        self,
+        table_path: Path | str = DEFAULT_TABLE,
+        model_path: Path | str = DEFAULT_MODEL,
+        max_age: Optional[float] = None,
+        exclude_seen: bool = True,
+        artifact_root: Optional[Path | str] = DEFAULT_ARTIFACT_ROOT,
+    ):
+        self.table_path = Path(table_path)
+        self.model_path = Path(model_path)
+        self.max_age = max_age
+        self.exclude_seen = exclude_seen
+        self._algo = None
+        self._factors: Optional[Factors] = None
+        self._lock = threading.Lock()
+        self._stale_users: set = set()
+        self.artifact: Optional[Artifact] = None
+        if artifact_root is not None and current_version(artifact_root):
+            self.artifact = load_artifact(artifact_root)
+            self._factors = self.artifact.factors
+        self.table: Optional[TopNTable] = None
+        if self.table_path.exists():
+            table = TopNTable.load(self.table_path)
+            if table.is_stale(self.model_digest):
+                logger.warning("%s was built from another model; scoring live", self.table_path.name)
+            else:
+                self.table = table
+
+    @property
+    def model_digest(self) -> Optional[str]:
+        if self.artifact is not None:
+            return self.artifact.model_digest
+        return file_digest(self.model_path) if self.model_path.exists() else None
+
+    @property
+    def algo(self):
+        if self._algo is None:
+            with self._lock:
+                if self._algo is None:
+                    self._algo = load_algo(self.model_path)
+        return self._algo
+
+    @property
+    def factors(self) -> Optional[Factors]:
+        """float32 factors of the model, or ``None`` when it is not a factor model."""
+        if self._factors is None and supports(self.algo):
+            with self._lock:
+                if self._factors is None:
+                    self._factors = extract_factors(self.algo)
+        return self._factors
+
+    def score(self, customer_ids: Sequence) -> np.ndarray:
+        """``[len(customer_ids), n_items]`` predicted ratings, columns in trainset item order."""
+        factors = self.factors
+        if factors is not None:
+            return factors.score(customer_ids)
+        trainset = self.algo.trainset
+        rows = []
+        for customer_id in customer_ids:
+            try:
+                inner_uid = trainset.to_inner_uid(customer_id)
+            except ValueError:
+                inner_uid = "UKN__" + str(customer_id)
+            rows.append(score_user(self.algo, inner_uid))
+        return np.vstack(rows) if rows else np.empty((0, trainset.n_items), dtype=np.float32)
+
+    def mark_stale(self, customer_ids: Iterable) -> None:
+        self._stale_users.update(str(c) for c in customer_ids)
+
+    def _from_table(self, customer_id, n: int) -> Optional[List[Recommendation]]:
+        table = self.table
+        if (
+            table is None
+            or n > table.n
+            or str(customer_id) in self._stale_users
+            or table.is_stale(max_age=self.max_age)
+        ):
+            return None
+        return table.lookup(customer_id, n)
+
+    def recommend(self, customer_id, n: int = DEFAULT_N) -> List[Recommendation]:
+        hit = self._from_table(customer_id, n)
+        return hit if hit is not None else self.live(customer_id, n)
+
+    def recommend_many(self, customer_ids: Sequence, n: int = DEFAULT_N) -> Dict[str, List[Recommendation]]:
+        """Recommendations for many customers: table lookups plus one scoring pass for the rest."""
+        wanted = list(dict.fromkeys(str(c) for c in customer_ids))
+        results: Dict[str, List[Recommendation]] = {}
+        misses = []
+        for customer_id in wanted:
+            hit = self._from_table(customer_id, n)
+            if hit is None:
+                misses.append(customer_id)
+            else:
+                results[customer_id] = hit
+        if not misses:
+            return results
+        factors = self.factors
+        if factors is None:
+            results.update((customer_id, self.live(customer_id, n)) for customer_id in misses)
+            return {customer_id: results[customer_id] for customer_id in wanted}
+
+        inner = factors.inner_uids(misses)
+        seen = np.zeros((len(misses), factors.n_items), dtype=bool)
+        if self.exclude_seen:
+            known = np.flatnonzero(inner >= 0)
+            seen[known] = factors.seen_mask(inner[known])
+        best, values = top_n_batch(factors.score(misses), n, seen)
+        for row, customer_id in enumerate(misses):
+            keep = best[row] >= 0
+            results[customer_id] = list(zip(factors.item_ids[best[row][keep]].tolist(), values[row][keep].tolist()))
+        return {customer_id: results[customer_id] for customer_id in wanted}
+
+    def live(self, customer_id, n: int = DEFAULT_N) -> List[Recommendation]:
+        """Score every item for ``customer_id`` now (cold customers get the item-bias ranking)."""
+        scores = self.score([customer_id])[0]
+        factors = self.factors
+        if factors is not None:
+            inner_uid = factors.inner_uid(customer_id)
+            exclude = factors.seen_items(inner_uid) if self.exclude_seen and inner_uid is not None else None
+            best = top_indices(scores, n, exclude)
+            return list(zip(factors.item_ids[best].tolist(), scores[best].tolist()))
+        trainset = self.algo.trainset
+        try:
+            inner_uid = trainset.to_inner_uid(customer_id)
+        except ValueError:
+            inner_uid = None
+        exclude = seen_items(trainset, inner_uid) if self.exclude_seen and inner_uid is not None else None
+        best = top_indices(scores, n, exclude)
+        return [(str(trainset.to_raw_iid(int(i))), float(scores[i])) for i in best]
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Precompute top-N recommendations per customer.")
+    parser.add_argument("--n", type=int, default=DEFAULT_N, help="Recommendations kept per customer.")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL))
+    parser.add_argument(
+        "--artifact-root",
+        default=None,
+        help="Score from the current memory-mapped artifact under this directory instead of the pickle.",
+    )
+    parser.add_argument("--out", default=str(DEFAULT_TABLE))
+    parser.add_argument("--include-seen", action="store_true", help="Keep items the customer already booked.")
+    return parser
+
+
+def run_from_options(options: dict) -> TopNTable:
+    if options.get("artifact_root"):
+        artifact = load_artifact(options["artifact_root"])
+        model, digest = artifact.factors, artifact.model_digest
+    else:
+        path = Path(options.get("model") or DEFAULT_MODEL)
+        model, digest = load_algo(path), file_digest(path)
+    table = build_topn(
+        model,
+        n=options.get("n") or DEFAULT_N,
+        exclude_seen=not options.get("include_seen"),
+        model_digest=digest,
+    )
+    path = table.save(options.get("out") or DEFAULT_TABLE)
+    logger.info("wrote %s (%d customers)", path, len(table.user_ids))
+    return table
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Parallel grid / random search over Surprise SVD hyperparameters.
+
+The ratings CSV is parsed once and split into ``k`` folds up front; the
+prebuilt ``(trainset, testset)`` pairs are dumped to one joblib file that each
+worker loads a single time and keeps for every task it runs.  Tasks are
+(parameter combination, fold) pairs fanned out over a joblib process pool,
+so all cores stay busy even when there are fewer combinations than cores.
+
+Results (mean/std RMSE and MAE over folds, fit time) are ranked by RMSE and
+written to ``recommender/results/svd_search_<timestamp>.csv`` with the best
+parameters next to it as JSON.
+
+Usage::
+
+    python -m recommender.tuning --mode grid --jobs 8
+    python -m recommender.tuning --mode random --n-iter 40 --param lr_all=0.001:0.02 --param n_factors=50,100,200
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from recommender.model_io import RESULTS_DIR
+from recommender.ratings import TRAIN_RATINGS_WITH_NEG, load_ratings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATINGS = TRAIN_RATINGS_WITH_NEG
+DEFAULT_GRID: Dict[str, Any] = {
+    "n_factors": [50, 100, 150],
+    "n_epochs": [20, 40],
+    "lr_all": [0.002, 0.005, 0.01],
+    "reg_all": [0.02, 0.05, 0.1],
+}
+
+METRIC_COLUMNS = ("rank", "rmse", "rmse_std", "mae", "mae_std", "fit_seconds", "folds")
+
+_folds_cache: Dict[str, list] = {}
+
+
+def build_folds(
+    ratings: pd.DataFrame, n_folds: int = 3, seed: int = 0, rating_scale: Optional[Tuple[float, float]] = None
+) -> list:
+    from surprise import Dataset, Reader
+    from surprise.model_selection import KFold
+
+    scale = rating_scale or (float(ratings["rating"].min()), float(ratings["rating"].max()))
+    data = Dataset.load_from_df(ratings, Reader(rating_scale=scale))
+    return list(KFold(n_splits=n_folds, random_state=seed, shuffle=True).split(data))
+
+
+def _folds(path: str) -> list:
+    # Loaded once per worker process and reused by every task it runs.
+    folds = _folds_cache.get(path)
+    if folds is None:
+        import joblib
+
+        folds = _folds_cache[path] = joblib.load(path)
+    return folds
+
+
+def evaluate(params: Dict[str, Any], folds_path: str, fold: int, seed: int = 0) -> Dict[str, Any]:
+    from surprise import SVD, accuracy
+
+    trainset, testset = _folds(folds_path)[fold]
+    started = time.perf_counter()
+    algo = SVD(random_state=seed, **params).fit(trainset)
+    fit_seconds = time.perf_counter() - started
+    predictions = algo.test(testset)
+    return {
+        **params,
+        "fold": fold,
+        "rmse": accuracy.rmse(predictions, verbose=False),
+        "mae": accuracy.mae(predictions, verbose=False),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def grid_candidates(grid: Dict[str, Any]) -> List[Dict[str, Any]]:
+    values = {name: v if isinstance(v, list) else [v] for name, v in grid.items()}
+    return [dict(zip(values, combo)) for combo in itertools.product(*values.values())]
+
+
+def random_candidates(space: Dict[str, Any], n_iter: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Sample ``n_iter`` distinct combinations.
+
+    Lists are sampled uniformly; ``(low, high)`` tuples of ints uniformly,
+    of floats log-uniformly (learning rates and regularisation span decades).
+    """
+    rng = random.Random(seed)
+
+    def draw(spec):
+        if isinstance(spec, tuple):
+            low, high = spec
+            if isinstance(low, int) and isinstance(high, int):
+                return rng.randint(low, high)
+            return float(f"{10 ** rng.uniform(math.log10(low), math.log10(high)):.3g}")
+        return rng.choice(spec) if isinstance(spec, list) else spec
+
+    seen, out = set(), []
+    for _ in range(n_iter * 20):
+        combo = {name: draw(spec) for name, spec in space.items()}
+        key = tuple(sorted(combo.items()))
+        if key not in seen:
+            seen.add(key)
+            out.append(combo)
+        if len(out) == n_iter:
+            break
+    return out
+
+
+def rank(rows: List[Dict[str, Any]], params: Sequence[str]) -> pd.DataFrame:
+    frame = pd.DataFrame(rows)
+    summary = (
+        frame.groupby(list(params), dropna=False)
+        .agg(
+            rmse=("rmse", "mean"),
+            rmse_std=("rmse", "std"),
+            mae=("mae", "mean"),
+            mae_std=("mae", "std"),
+            fit_seconds=("fit_seconds", "mean"),
+            folds=("fold", "count"),
+        )
+        .reset_index()
+        .sort_values(["rmse", "mae"], kind="stable")
+        .reset_index(drop=True)
+    )
+    summary.insert(0, "rank", summary.index + 1)
+    return summary
+
+
+def search(
+    candidates: List[Dict[str, Any]],
+    ratings: pd.DataFrame,
+    n_folds: int = 3,
+    n_jobs: int = -1,
+    seed: int = 0,
+    rating_scale: Optional[Tuple[float, float]] = None,
+) -> pd.DataFrame:
+    """Evaluate every candidate on every fold in parallel; ranked summary, best first."""
+    import joblib
+
+    started = time.perf_counter()
+    folds = build_folds(ratings, n_folds, seed, rating_scale)
+    with tempfile.TemporaryDirectory(prefix="svd-search-") as tmp:
+        folds_path = os.path.join(tmp, "folds.joblib")
+        joblib.dump(folds, folds_path)
+        tasks = [(params, fold) for params in candidates for fold in range(n_folds)]
+        logger.info("%d candidates x %d folds = %d fits on %s workers", len(candidates), n_folds, len(tasks), n_jobs)
+        rows = joblib.Parallel(n_jobs=n_jobs, verbose=5 if logger.isEnabledFor(logging.DEBUG) else 0)(
+            joblib.delayed(evaluate)(params, folds_path, fold, seed) for params, fold in tasks
+        )
+    summary = rank(rows, list(candidates[0]))
+    logger.info("search finished in %.1fs", time.perf_counter() - started)
+    return summary
+
+
+def write_results(summary: pd.DataFrame, results_dir: Path | str = RESULTS_DIR, meta: Optional[dict] = None) -> Path:
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    target = results_dir / f"svd_search_{stamp}.csv"
+    summary.to_csv(target, index=False)
+    best = best_row(summary)
+    params = {k: v for k, v in best.items() if k not in METRIC_COLUMNS}
+    payload = {"best_params": params, "rmse": best["rmse"], "mae": best["mae"], **(meta or {})}
+    target.with_suffix(".best.json").write_text(json.dumps(payload, indent=2, default=str))
+    return target
+
+
+def best_row(summary: pd.DataFrame) -> Dict[str, Any]:
+    # Column by column so integer parameters stay ints (iloc on a mixed row upcasts to float).
+    return {name: summary[name].iloc[0].item() for name in summary.columns}
+
+
+def _parse_value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_param(spec: str) -> Tuple[str, Any]:
+    """``name=a,b,c`` -> list; ``name=low:high`` -> range for random search."""
+    name, _, values = spec.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected name=values, got {spec!r}")
+    if ":" in values:
+        low, high = (_parse_value(v) for v in values.split(":", 1))
+        return name, (low, high)
+    return name, [_parse_value(v) for v in values.split(",")]
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Parallel SVD hyperparameter search.")
+    parser.add_argument("--mode", choices=("grid", "random"), default="grid")
+    parser.add_argument("--n-iter", type=int, default=20, help="Combinations sampled in random mode.")
+    parser.add_argument("--param", action="append", type=parse_param, default=[], metavar="NAME=VALUES")
+    parser.add_argument("--data", default=str(DEFAULT_RATINGS))
+    parser.add_argument("--columns", nargs=3, default=None, metavar=("USER", "ITEM", "RATING"))
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=-1, help="Worker processes (-1 = all cores).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results-dir", default=str(RESULTS_DIR))
+    return parser
+
+
+def run_from_options(options: dict) -> Tuple[pd.DataFrame, Path]:
+    space = dict(DEFAULT_GRID)
+    space.update(dict(options.get("param") or []))
+    seed = options.get("seed") or 0
+    if options.get("mode") == "random":
+        candidates = random_candidates(space, options.get("n_iter") or 20, seed)
+    else:
+        if any(isinstance(v, tuple) for v in space.values()):
+            raise ValueError("low:high ranges are only valid with --mode random")
+        candidates = grid_candidates(space)
+    ratings = load_ratings(options.get("data") or DEFAULT_RATINGS, options.get("columns"))
+    summary = search(candidates, ratings, options.get("folds") or 3, options.get("jobs") or -1, seed)
+    path = write_results(
+        summary,
+        options.get("results_dir") or RESULTS_DIR,
+        {"mode": options.get("mode"), "folds": options.get("folds"), "data": str(options.get("data"))},
+    )
+    logger.info("best: %s", best_row(summary))
+    logger.info("wrote %s", path)
+    return summary, path
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run_from_options(vars(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()